@@ -0,0 +1,69 @@
+"""
+Authentication that loads signed-in users from the cache rather than the database.
+
+Each user's record is cached next to the sessions (in SESSION_CACHE_ALIAS), tagged
+with the user's version when it was loaded. Saving or deleting a user changes the
+version, so the next request of every session loads the record again. A password
+change then no longer matches the hash kept in the user's other sessions, and
+Django logs them out, just as it does without the cache.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from recipes.fragments import new_version
+
+USER_KEY = "accounts:user:%s"
+USER_VERSION_KEY = "accounts:user:version:%s"
+
+
+def user_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def bump_user_version(user_id):
+    user_cache().set(USER_VERSION_KEY % user_id, new_version(), timeout=None)
+
+
+def start_user_version(cache, user_id):
+    key = USER_VERSION_KEY % user_id
+    cache.add(key, new_version(), timeout=None)
+    return cache.get(key)
+
+
+def cache_user(user, version=None):
+    """ Cache the user's record, as of version if it has been read already. """
+    cache = user_cache()
+    if version is None:
+        version = cache.get(USER_VERSION_KEY % user.pk)
+        if version is None:
+            version = start_user_version(cache, user.pk)
+    cache.set(USER_KEY % user.pk, (version, user), settings.SESSION_COOKIE_AGE)
+
+
+class CachedModelBackend(ModelBackend):
+    """ ModelBackend whose get_user(), run for every request, reads the cache. """
+
+    def get_user(self, user_id):
+        cache = user_cache()
+        version_key, user_key = USER_VERSION_KEY % user_id, USER_KEY % user_id
+        found = cache.get_many([version_key, user_key])
+        version = found.get(version_key)
+        if version is not None and found.get(user_key, (None,))[0] == version:
+            user = found[user_key][1]
+        else:
+            if version is None:
+                version = start_user_version(cache, user_id)
+            # The version was read first, so a save from here on makes the record
+            # stale. Read the primary, which replicas may lag behind.
+            UserModel = get_user_model()
+            try:
+                user = UserModel._default_manager.using(DEFAULT_DB_ALIAS).get(
+                    pk=user_id
+                )
+            except UserModel.DoesNotExist:
+                return None
+            cache_user(user, version)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_auto_20210227_1426'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='email',
+            field=models.EmailField(blank=True, db_index=True, max_length=254, verbose_name='email address'),
+        ),
+    ]
@@ -1,8 +1,11 @@
 import recipes.models
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
 
 class User(AbstractUser):
+    # Indexed because sign up checks that an email address isn't taken
+    email = models.EmailField(_("email address"), blank=True, db_index=True)
     # Use string argument for Recipe model to prevent circular import error
     favorite_recipes = models.ManyToManyField("recipes.Recipe")
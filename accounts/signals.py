@@ -0,0 +1,22 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import bump_user_version, cache_user
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, using, **kwargs):
+    """ Have every session load the user again, as it's now and once committed. """
+    bump_user_version(instance.pk)
+    # A request may cache the old record before the change is committed
+    transaction.on_commit(lambda: bump_user_version(instance.pk), using=using)
+
+
+@receiver(user_logged_in)
+def user_logged_in_cache(sender, request, user, **kwargs):
+    # After update_last_login has saved it, so the first page needn't load it
+    cache_user(user)
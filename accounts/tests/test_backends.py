@@ -0,0 +1,95 @@
+from accounts.backends import CachedModelBackend
+from accounts.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class CachedUserTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+
+    def other_session(self):
+        client = Client()
+        client.login(username="testuser1", password="1X<ISRUkw+tuK")
+        return client
+
+    def assertSignedIn(self, client, signed_in=True):
+        response = client.get(reverse("my-recipes"))
+        self.assertEqual(response.status_code, 200 if signed_in else 302)
+
+    def test_signed_in_pages_need_no_auth_queries(self):
+        self.client.get(reverse("index"))
+        # The layout is cached, and so are the session and the user
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("index"))
+        self.assertEqual(response.context["user"], self.user)
+
+    def test_user_loaded_once_after_change(self):
+        backend = CachedModelBackend()
+        User.objects.filter(pk=self.user.pk).update(first_name="Ada")
+        # Updates bypass the signals, so the cached record is still used
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk).first_name, "")
+        User.objects.get(pk=self.user.pk).save()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk).first_name, "Ada")
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk).first_name, "Ada")
+
+    def test_sessions_from_model_backend_stay_signed_in(self):
+        # Sessions signed in before CachedModelBackend name ModelBackend
+        client = Client()
+        client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        self.assertSignedIn(client)
+
+    def test_missing_user(self):
+        self.assertIsNone(CachedModelBackend().get_user(0))
+
+    def test_password_change_signs_out_other_sessions(self):
+        other = self.other_session()
+        response = self.client.post(
+            reverse("password_change"),
+            {
+                "old_password": "1X<ISRUkw+tuK",
+                "new_password1": "2X<ISRUkw+tuK",
+                "new_password2": "2X<ISRUkw+tuK",
+            },
+        )
+        self.assertRedirects(
+            response, reverse("password_change_done"), fetch_redirect_response=False
+        )
+        self.assertSignedIn(self.client)
+        self.assertSignedIn(other, False)
+
+    def test_logout_ends_session(self):
+        other = self.other_session()
+        cookie = self.client.cookies["sessionid"].value
+        self.client.get(reverse("logout"))
+        self.assertSignedIn(self.client, False)
+        # Neither the cache nor the database still has the session
+        self.client.cookies["sessionid"] = cookie
+        self.assertSignedIn(self.client, False)
+        self.assertSignedIn(other)
+
+    def test_deactivated_user_signed_out(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertSignedIn(self.client, False)
+
+    def test_deleted_user_signed_out(self):
+        User.objects.get(pk=self.user.pk).delete()
+        self.assertSignedIn(self.client, False)
@@ -0,0 +1,48 @@
+from accounts.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from recipes.tests.test_query_plans import QueryPlanTestMixin
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class AccountsQueryPlanTest(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(20):
+            User.objects.create_user(
+                username="testuser%d" % number,
+                email="test%d@example.com" % number,
+                password="1X<ISRUkw+tuK",
+            )
+
+    def test_signup(self):
+        # Checks that both the username and the email address are free
+        self.assertIndexed(
+            "post",
+            reverse("signup"),
+            {
+                "username": "newuser",
+                "email": "new@example.com",
+                "password1": "1X<ISRUkw+tuK",
+                "password2": "1X<ISRUkw+tuK",
+            },
+        )
+
+    def test_taken_email(self):
+        self.assertIndexed(
+            "post",
+            reverse("signup"),
+            {
+                "username": "newuser",
+                "email": "test3@example.com",
+                "password1": "1X<ISRUkw+tuK",
+                "password2": "1X<ISRUkw+tuK",
+            },
+        )
+        self.assertFalse(User.objects.filter(username="newuser").exists())
+
+    def test_user_detail(self):
+        self.client.login(username="testuser3", password="1X<ISRUkw+tuK")
+        self.assertIndexed("get", reverse("user-detail", args=["testuser3"]))
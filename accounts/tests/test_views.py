@@ -22,7 +22,12 @@ class SignUpViewTest(TestCase):
                 "email": "test@viewstests.com",
             },
         )
-        self.assertRedirects(response, "/accounts/login/")
+        # New users are signed in and shown their account
+        self.assertRedirects(
+            response,
+            reverse("user-detail", args=["testuser1"]),
+            fetch_redirect_response=False,
+        )
 
     def test_view_uses_correct_template(self):
         response = self.client.get(reverse("signup"))
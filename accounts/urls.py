@@ -3,7 +3,7 @@ from django.urls import path
 
 from accounts.forms import CustomPasswordResetForm, CustomSetPasswordForm, LoginForm
 
-from .views import SignUpView, UserDetailView
+from .views import PasswordResetView, SignUpView, UserDetailView
 
 urlpatterns = [
     path("signup/", SignUpView.as_view(), name="signup"),
@@ -14,7 +14,7 @@ urlpatterns = [
     ),
     path(
         "password_reset/",
-        views.PasswordResetView.as_view(form_class=CustomPasswordResetForm),
+        PasswordResetView.as_view(form_class=CustomPasswordResetForm),
         name="password_reset",
     ),
     path(
@@ -1,4 +1,4 @@
-from django.contrib.auth import authenticate, login
+from django.contrib.auth import authenticate, login, views
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
 from django.http import HttpResponseRedirect
@@ -7,6 +7,7 @@ from django.urls import reverse_lazy
 from django.views import generic
 
 from accounts.models import User
+from recipes.threadpool import ThreadPoolMixin
 
 from .forms import LoginForm, SignUpForm
 
@@ -41,3 +42,7 @@ class UserDetailView(LoginRequiredMixin, generic.DetailView):
     def get_object(self):
         # Get the authenticated user
         return User.objects.get(username=self.request.user)
+
+
+class PasswordResetView(ThreadPoolMixin, views.PasswordResetView):
+    """ Password reset view that sends its email from the thread pool under ASGI. """
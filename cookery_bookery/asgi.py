@@ -0,0 +1,20 @@
+"""
+ASGI config for cookery_bookery project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Run it with an ASGI server, for example
+``gunicorn cookery_bookery.asgi -k uvicorn.workers.UvicornWorker``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cookery_bookery.settings")
+# Serve the read-heavy views from the event loop (see recipes/threadpool.py)
+os.environ.setdefault("DJANGO_ASYNC_VIEWS", "True")
+
+application = get_asgi_application()
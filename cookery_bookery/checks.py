@@ -0,0 +1,81 @@
+"""
+The deployment check of production settings.
+
+Debug-only behaviour costs memory and time on every request, and shows internals
+to visitors, so with PRODUCTION set, manage.py check --deploy reports any of it
+rather than leaving it to be noticed later.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Caches that each process keeps to itself, or that keep nothing
+PROCESS_CACHES = {
+    "django.core.cache.backends.dummy.DummyCache",
+    "django.core.cache.backends.locmem.LocMemCache",
+}
+# Shared caches whose incr() reads and writes the value in two steps, so that
+# counters kept in them, like the changed recipes feed's, lose updates
+NON_ATOMIC_CACHES = {
+    "django.core.cache.backends.db.DatabaseCache",
+    "django.core.cache.backends.filebased.FileBasedCache",
+}
+MEMCACHED_CACHES = {
+    "django.core.cache.backends.memcached.MemcachedCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+}
+
+
+def is_cached_loader(loader):
+    # Loaders are given as dotted paths, or (path, loader arguments) tuples
+    path = loader[0] if isinstance(loader, (list, tuple)) else loader
+    return path == "django.template.loaders.cached.Loader"
+
+
+def debug_behaviour():
+    """ Return a description of each debug-only setting in use. """
+    problems = []
+    if settings.DEBUG:
+        problems.append(
+            "DEBUG is on, so every SQL query is kept in memory and error pages "
+            "show settings and source code."
+        )
+    if settings.DEBUG_PROPAGATE_EXCEPTIONS:
+        problems.append("DEBUG_PROPAGATE_EXCEPTIONS is on.")
+    for template in settings.TEMPLATES:
+        options = template.get("OPTIONS", {})
+        if options.get("debug"):
+            problems.append("The %s templates are in debug mode." % template["BACKEND"])
+        # Without loaders, Django uses the cached loader when debug is off
+        loaders = options.get("loaders")
+        if loaders is not None and not any(map(is_cached_loader, loaders)):
+            problems.append(
+                "The %s templates aren't loaded with the cached loader, so they're "
+                "read and compiled on every render." % template["BACKEND"]
+            )
+    for alias, cache in settings.CACHES.items():
+        if cache["BACKEND"] in PROCESS_CACHES:
+            problems.append(
+                "The %s cache isn't shared between workers, so they disagree about "
+                "what has changed. Set MEMCACHE_SERVERS." % alias
+            )
+        elif cache["BACKEND"] in NON_ATOMIC_CACHES:
+            problems.append(
+                "The %s cache's incr() isn't atomic, so published recipe changes "
+                "are lost. Use memcached." % alias
+            )
+        elif cache["BACKEND"] in MEMCACHED_CACHES and not cache.get("LOCATION"):
+            problems.append(
+                "The %s cache has no memcached servers. Set MEMCACHE_SERVERS."
+                % alias
+            )
+    return problems
+
+
+@register(deploy=True)
+def check_production_settings(app_configs=None, **kwargs):
+    """ Warn of each debug-only setting in use, if PRODUCTION is set. """
+    if not settings.PRODUCTION:
+        return []
+    return [
+        Warning(problem, id="cookery_bookery.W001") for problem in debug_behaviour()
+    ]
@@ -0,0 +1,91 @@
+"""
+Database backends that share a bounded pool of connections per process.
+
+Django otherwise opens a connection for every thread and, with CONN_MAX_AGE,
+keeps it open for the thread's lifetime. Here opening a connection checks one
+out of the pool and closing it, which Django does at the end of each request
+when CONN_MAX_AGE is 0, releases it. Configure the pool with a POOL dictionary
+in the database's settings:
+
+    "POOL": {
+        "MAX_SIZE": 4,  # Connections per process
+        "TIMEOUT": 10,  # Seconds to wait for a free connection
+        "MAX_AGE": 300,  # Seconds before a connection is replaced
+        "PING_AFTER": 30,  # Seconds idle before a connection is checked first
+    }
+"""
+import functools
+import threading
+
+from ..pool import ConnectionPool, PoolTimeout
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def ping(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT 1")
+    finally:
+        cursor.close()
+
+
+def reset(connection):
+    # Don't hand on an open transaction. Rolling back is free when there is none.
+    connection.rollback()
+    return True
+
+
+def pool_stats():
+    """ Return {(alias, database name): stats} for every pool in this process. """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {key[:2]: pool.stats() for key, pool in pools.items()}
+
+
+def close_pools(alias):
+    """ Close the idle connections in the pools of a database alias. """
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[0] == alias]
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """ Mixin for a DatabaseWrapper, taking its connections from a pool. """
+
+    def get_pool(self, conn_params):
+        # Creating a test database connects to another database under the same
+        # alias, so each set of parameters gets its own pool
+        key = (
+            self.alias,
+            self.settings_dict["NAME"],
+            repr(sorted(conn_params.items())),
+        )
+        with _pools_lock:
+            if key not in _pools:
+                options = self.settings_dict.get("POOL", {})
+                _pools[key] = ConnectionPool(
+                    max_size=options.get("MAX_SIZE", 4),
+                    timeout=options.get("TIMEOUT", 10),
+                    max_age=options.get("MAX_AGE", 300),
+                    ping_after=options.get("PING_AFTER", 30),
+                    ping=ping,
+                    reset=reset,
+                    name=self.alias,
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connect = functools.partial(super().get_new_connection, conn_params)
+        try:
+            return self.pool.acquire(connect)
+        except PoolTimeout as e:
+            # Raised as the driver's error, so Django wraps it as OperationalError
+            raise self.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is not None:
+            self.pool.release(self.connection)
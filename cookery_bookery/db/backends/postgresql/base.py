@@ -0,0 +1,16 @@
+from django.db.backends.postgresql import base, creation
+
+from ..pooled import PooledDatabaseWrapperMixin, close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Postgres won't drop a database that pooled connections are still using
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """ The PostgreSQL backend, sharing a pool of connections per process. """
+
+    creation_class = DatabaseCreation
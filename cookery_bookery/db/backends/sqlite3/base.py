@@ -0,0 +1,10 @@
+from django.db.backends.sqlite3 import base
+
+from ..pooled import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    The SQLite backend, sharing a pool of connections per process. Pooling saves
+    little with SQLite. It stands in for a server to test the pool against.
+    """
@@ -0,0 +1,211 @@
+"""
+A bounded pool of DB-API connections, shared by the threads of a process.
+
+Connections are checked out, used for a while and released back. A checkout
+waits for a free connection when all of them are in use, up to a timeout.
+Connections older than max_age are replaced. Ones idle for longer than
+ping_after are pinged first, and replaced if that fails. Nothing here is
+specific to a database, so the pool can be tested with sqlite3.
+"""
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger("cookery_bookery.db.pool")
+
+
+class PoolTimeout(Exception):
+    """ No connection was released in time for a checkout. """
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        max_size=4,
+        timeout=10.0,
+        max_age=None,
+        ping_after=None,
+        ping=None,
+        reset=None,
+        name="pool",
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.ping_after = ping_after
+        self.ping = ping
+        self.reset = reset
+        self.name = name
+        self.lock = threading.Lock()
+        self.released = threading.Condition(self.lock)
+        self._start()
+
+    def _start(self):
+        self.pid = os.getpid()
+        # (connection, created at, released at), most recently released last
+        self.idle = []
+        # id(connection): created at
+        self.in_use = {}
+        # Connections open or being opened, idle and in use
+        self.size = 0
+        self.waiting = 0
+        self.counts = dict.fromkeys(
+            (
+                "checkouts",
+                "created",
+                "recycled",
+                "ping_failures",
+                "discarded",
+                "timeouts",
+            ),
+            0,
+        )
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _check_process(self):
+        # A forked child shares its parent's sockets, so must neither use nor
+        # close the connections it inherited
+        if os.getpid() != self.pid:
+            self._start()
+
+    def acquire(self, connect):
+        """
+        Check out a connection, calling connect() to open a new one when the pool
+        has room. Raise PoolTimeout if none is free within the timeout.
+        """
+        start = time.monotonic()
+        with self.lock:
+            self._check_process()
+            entry = self._wait_for_slot(start + self.timeout)
+            waited = time.monotonic() - start
+            self.counts["checkouts"] += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+        # Pinging and connecting talk to the server, so happen outside the lock
+        connection, created = self._validate(*entry) if entry else (None, None)
+        if connection is None:
+            try:
+                created = time.monotonic()
+                connection = connect()
+            except BaseException:
+                with self.lock:
+                    self.size -= 1
+                    self.released.notify()
+                raise
+            self._count("created")
+        with self.lock:
+            self.in_use[id(connection)] = created
+        return connection
+
+    def _wait_for_slot(self, deadline):
+        # Return an idle entry, or None once a slot for a new connection is taken
+        self.waiting += 1
+        try:
+            while True:
+                if self.idle:
+                    return self.idle.pop()
+                if self.size < self.max_size:
+                    self.size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counts["timeouts"] += 1
+                    logger.warning(
+                        "No %s connection was free within %.1f seconds: %s",
+                        self.name,
+                        self.timeout,
+                        self._stats(),
+                    )
+                    raise PoolTimeout(
+                        "No %s connection was free within %.1f seconds."
+                        % (self.name, self.timeout)
+                    )
+                self.released.wait(remaining)
+        finally:
+            self.waiting -= 1
+
+    def _validate(self, connection, created, released):
+        # Return the idle connection and when it was created, or (None, None) if
+        # it had to be closed
+        now = time.monotonic()
+        if self.max_age is not None and now - created > self.max_age:
+            self._close(connection)
+            self._count("recycled")
+            return None, None
+        if (
+            self.ping is not None
+            and self.ping_after is not None
+            and now - released >= self.ping_after
+        ):
+            try:
+                self.ping(connection)
+            except Exception:
+                logger.info("A %s connection failed its ping.", self.name)
+                self._close(connection)
+                self._count("ping_failures")
+                return None, None
+        return connection, created
+
+    def _count(self, event):
+        with self.lock:
+            self.counts[event] += 1
+
+    def release(self, connection):
+        """ Return a checked out connection, closing it if it can't be reused. """
+        with self.lock:
+            self._check_process()
+            created = self.in_use.pop(id(connection), None)
+        if created is None:
+            # Checked out before a fork, or from another pool
+            return
+        try:
+            reusable = self.reset is None or self.reset(connection)
+        except Exception:
+            reusable = False
+        now = time.monotonic()
+        if self.max_age is not None and now - created > self.max_age:
+            reusable = False
+        if not reusable:
+            self._close(connection)
+        with self.lock:
+            if reusable:
+                self.idle.append((connection, created, now))
+            else:
+                self.size -= 1
+                self.counts["discarded"] += 1
+            self.released.notify()
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """ Close the idle connections, leaving those in use alone. """
+        with self.lock:
+            self._check_process()
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for connection, created, released in idle:
+            self._close(connection)
+
+    def _stats(self):
+        return {
+            "max_size": self.max_size,
+            "size": self.size,
+            "idle": len(self.idle),
+            "in_use": len(self.in_use),
+            "waiting": self.waiting,
+            **self.counts,
+            "wait_ms_total": round(self.wait_total * 1000, 1),
+            "wait_ms_max": round(self.wait_max * 1000, 1),
+        }
+
+    def stats(self):
+        """ Return the pool's size, how it is used and counts of what happened. """
+        with self.lock:
+            return self._stats()
@@ -0,0 +1,89 @@
+"""
+Reading from replicas, with each client reading its own writes.
+
+During a request, PrimaryReplicaRouter sends reads to one of the aliases in
+REPLICA_DATABASES and writes to the primary, default. Replicas lag behind the
+primary, so once a request writes, the rest of it reads from the primary, and
+ReplicaPinMiddleware has the client's next requests do the same for
+REPLICA_PIN_SECONDS. Reads inside a transaction on the primary stay there too.
+
+Outside requests, in management commands for example, everything goes to the
+primary. So does DatabaseCache, whose entries are read back as soon as any
+request writes them, and whose writes are no sign of the client's own.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# The app label of the model DatabaseCache routes its table with
+CACHE_APP_LABEL = "django_cache"
+
+
+class ReplicaState:
+    """ Where the reads of one request go. """
+
+    def __init__(self, pinned):
+        # Reading from the primary
+        self.pinned = pinned
+        self.wrote = False
+        replicas = settings.REPLICA_DATABASES
+        self.replica = random.choice(replicas) if replicas else None
+
+
+# The state of the request being handled. The object itself is shared with the
+# copies of the context its work runs in on other threads, so writes there pin it.
+current_state = ContextVar("replica_state", default=None)
+
+
+def start_request(pinned):
+    """ Route reads to a replica until the request writes, unless pinned. """
+    return current_state.set(ReplicaState(pinned))
+
+
+def finish_request(token):
+    """ Stop routing the request's reads, returning its ReplicaState. """
+    state = current_state.get()
+    current_state.reset(token)
+    return state
+
+
+class PrimaryReplicaRouter:
+    """ Database router sending reads to replicas, as described above. """
+
+    def db_for_read(self, model, **hints):
+        if not settings.REPLICA_DATABASES:
+            return None
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        state = current_state.get()
+        if state is None:
+            return DEFAULT_DB_ALIAS
+        if state.pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        if not settings.REPLICA_DATABASES:
+            return None
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        state = current_state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        # Even for objects read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .db import replicas
+
+logger = logging.getLogger("cookery_bookery.timing")
+
+# The timer of the request being handled. Context variables follow a request onto
+# the threads its queries run on, which a per-connection wrapper would not.
+current_timer = ContextVar("current_timer", default=None)
+
+
+class RequestTimer:
+    """ The timings of a single request, gathered as it is handled. """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view = None
+        self.render = None
+        self.view_start = None
+        self.render_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute wrapper, so it sees every query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.queries += 1
+
+    def rendered(self, response):
+        self.render = time.perf_counter() - self.render_start
+
+
+def timed_execute(execute, sql, params, many, context):
+    """ Database execute wrapper that times queries for the current request. """
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_timed_execute(connection, **kwargs):
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
+
+
+# Each thread has its own connections, so wrap them as they are opened
+connection_created.connect(install_timed_execute)
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware that times each routed request and reports the number of queries,
+    time spent in the database, in the view and rendering its template, and the
+    total, both in a Server-Timing header and in a log line. It only reads the
+    clock a few times per request and query, so it is cheap enough to leave on.
+
+    Views returning a TemplateResponse (all the generic views) are rendered after
+    they return, so rendering is timed separately. Views that render their own
+    templates count it as view time.
+
+    Under ASGI it runs on the event loop, and queries are counted on whichever
+    thread the view sends them from.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function, as Django's own
+            # middleware does, and keep the hooks off the thread of sync views
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        # Connections opened before this middleware was loaded
+        for connection in connections.all():
+            install_timed_execute(connection)
+        timer = request._timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.report(request, response, timer)
+
+    async def __acall__(self, request):
+        timer = request._timer = RequestTimer()
+        token = current_timer.set(timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.report(request, response, timer)
+
+    def report(self, request, response, timer):
+        total = time.perf_counter() - timer.start
+
+        match = request.resolver_match
+        if match is None or not match.url_name:
+            return response
+        if timer.view is None and timer.view_start is not None:
+            # Not a TemplateResponse, so everything happened in the view
+            timer.view = total - (timer.view_start - timer.start)
+        metrics = [
+            ("db", timer.db, "%d queries" % timer.queries),
+            ("view", timer.view, None),
+            ("render", timer.render, None),
+            ("total", total, None),
+        ]
+        response["Server-Timing"] = ", ".join(
+            "%s;dur=%.1f" % (name, seconds * 1000)
+            + (';desc="%s"' % description if description else "")
+            for name, seconds, description in metrics
+            if seconds is not None
+        )
+        logger.info(
+            "route=%s method=%s status=%d queries=%d db_ms=%.1f view_ms=%.1f "
+            "render_ms=%.1f total_ms=%.1f",
+            match.view_name,
+            request.method,
+            response.status_code,
+            timer.queries,
+            timer.db * 1000,
+            (timer.view or 0) * 1000,
+            (timer.render or 0) * 1000,
+            total * 1000,
+            extra={
+                "route": match.view_name,
+                "method": request.method,
+                "status": response.status_code,
+                "queries": timer.queries,
+                "db_ms": timer.db * 1000,
+                "view_ms": (timer.view or 0) * 1000,
+                "render_ms": (timer.render or 0) * 1000,
+                "total_ms": total * 1000,
+            },
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timer.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timer = request._timer
+        timer.render_start = time.perf_counter()
+        timer.view = timer.render_start - timer.view_start
+        response.add_post_render_callback(timer.rendered)
+        return response
+
+    # The instance attributes shadow the sync hooks in an async stack
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        ServerTimingMiddleware.process_view(
+            self, request, view_func, view_args, view_kwargs
+        )
+
+    async def aprocess_template_response(self, request, response):
+        return ServerTimingMiddleware.process_template_response(self, request, response)
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise's middleware, able to run in an async stack. Finding a static file
+    is a dictionary lookup, so it is done on the event loop rather than on the
+    single thread Django runs sync middleware and views on.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Middleware that lets PrimaryReplicaRouter send a request's reads to a replica,
+    unless the client wrote within the last REPLICA_PIN_SECONDS. A request that
+    writes sets a cookie saying until when its client reads from the primary.
+    It must come before any middleware that writes, such as sessions.
+    """
+
+    sync_capable = True
+    async_capable = True
+    cookie_name = "read_primary_until"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = replicas.start_request(self.is_pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            state = replicas.finish_request(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        token = replicas.start_request(self.is_pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            state = replicas.finish_request(token)
+        return self.pin(response, state)
+
+    def is_pinned(self, request):
+        try:
+            return float(request.COOKIES[self.cookie_name]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+    def pin(self, response, state):
+        if state.wrote and settings.REPLICA_DATABASES:
+            response.set_cookie(
+                self.cookie_name,
+                "%d" % (time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,136 @@
+"""
+Django settings for running cookery_bookery in production.
+
+Everything not set here comes from settings.py. Debug is off unless
+DJANGO_DEBUG=True, which manage.py check --deploy then warns of (see checks.py),
+templates are compiled once per process, the cache is memcached at the servers
+in MEMCACHE_SERVERS, shared by every worker, and errors are logged rather than
+only mailed to ADMINS.
+"""
+
+import os
+
+import dj_database_url
+
+from .settings import *  # noqa: F401,F403
+
+PRODUCTION = True
+
+DEBUG = os.environ.get("DJANGO_DEBUG", "") == "True"
+
+
+def pooled(database):
+    """
+    Share a bounded pool of a Postgres database's connections between each
+    process's threads, rather than keeping one open per thread (see
+    cookery_bookery/db/backends/pooled.py).
+    """
+    if database["ENGINE"] in (
+        "django.db.backends.postgresql",
+        "django.db.backends.postgresql_psycopg2",
+    ):
+        database.update(
+            {
+                "ENGINE": "cookery_bookery.db.backends.postgresql",
+                # Connections go back to the pool at the end of every request
+                "CONN_MAX_AGE": 0,
+                "POOL": {
+                    "MAX_SIZE": int(os.environ.get("DATABASE_POOL_SIZE", "4")),
+                    "TIMEOUT": 10,
+                    "MAX_AGE": 300,
+                    "PING_AFTER": 30,
+                },
+            }
+        )
+    return database
+
+
+pooled(DATABASES["default"])
+
+# Read replicas of the primary, from a comma-separated list of database URLs
+REPLICA_DATABASES = []
+replica_urls = os.environ.get("DATABASE_REPLICA_URLS", "").split(",")
+for number, url in enumerate(filter(None, map(str.strip, replica_urls)), 1):
+    alias = "replica%d" % number
+    DATABASES[alias] = pooled(dj_database_url.parse(url))
+    # Tests read the primary's test database through replica aliases
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    REPLICA_DATABASES.append(alias)
+
+# Keep compiled templates, rather than reading and compiling them on every render
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "DIRS": [os.path.join(BASE_DIR, "templates")],
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
+        },
+    },
+]
+
+# Favorite versions, the home page layout, rendered fragments, sessions and the
+# feed of changed recipes must be the same for every worker and dyno, so keep them
+# in memcached, at MEMCACHE_SERVERS: a comma-separated list of host:port addresses,
+# like "10.0.0.1:11211,10.0.0.2:11211". The feed's generation is counted with
+# incr(), which memcached does atomically and the database cache doesn't.
+memcache_servers = list(
+    filter(None, map(str.strip, os.environ.get("MEMCACHE_SERVERS", "").split(",")))
+)
+if memcache_servers:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+            "LOCATION": memcache_servers,
+            "TIMEOUT": RECIPE_FRAGMENT_TIMEOUT,
+        }
+    }
+else:
+    # Still start, with a cache of each process's own, which is only right for a
+    # single worker and which check --deploy warns of
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": RECIPE_FRAGMENT_TIMEOUT,
+        }
+    }
+# Sessions and signed-in users are read on every request, so keep them there too
+SESSION_CACHE_ALIAS = "default"
+
+# Log to the console, which Heroku collects and timestamps. Without a handler of
+# its own, Django only mails errors to ADMINS when DEBUG is off.
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "plain": {"format": "%(levelname)s %(name)s %(message)s"},
+    },
+    "handlers": {
+        "console": {"class": "logging.StreamHandler", "formatter": "plain"},
+    },
+    "root": {"handlers": ["console"], "level": "WARNING"},
+    "loggers": {
+        "django": {
+            "handlers": ["console"],
+            "level": os.environ.get("DJANGO_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+        "cookery_bookery.timing": {
+            "handlers": ["console"],
+            "level": os.environ.get("REQUEST_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
@@ -26,6 +26,10 @@ SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'cg#p$g+j9tax!#a3cup@1$8obt2_+&
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DJANGO_DEBUG', '') != 'False'
 
+# Set by production_settings.py, whose settings refuse to start with DEBUG or
+# other debug-only behaviour (see cookery_bookery/checks.py)
+PRODUCTION = False
+
 ALLOWED_HOSTS = ['cookerybookery.herokuapp.com']
 
 
@@ -47,8 +51,13 @@ AUTH_USER_MODEL = "accounts.User"
 
 
 MIDDLEWARE = [
+    # First, so that its total covers the rest of the middleware too
+    "cookery_bookery.middleware.ServerTimingMiddleware",
+    # Before anything that writes, so that writing pins the client to the primary
+    "cookery_bookery.middleware.ReplicaPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, made able to run in an async stack
+    "cookery_bookery.middleware.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -127,6 +136,15 @@ LOGIN_REDIRECT_URL = "/"
 # Use accounts app as home for login url
 LOGIN_URL = "/accounts/login/"
 
+# Keep sessions in the cache as well as the database, and signed-in users in the
+# cache, so that authenticating a request needn't query the database
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+# (ModelBackend stays listed so sessions signed in through it stay signed in)
+AUTHENTICATION_BACKENDS = [
+    "accounts.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 # Allow for password reset emails
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -142,6 +160,13 @@ import dj_database_url
 db_from_env = dj_database_url.config(conn_max_age=500)
 DATABASES['default'].update(db_from_env)
 
+# Database aliases that requests read from, and for how many seconds a client
+# that wrote reads from the primary instead (see cookery_bookery/db/replicas.py)
+REPLICA_DATABASES = []
+REPLICA_PIN_SECONDS = 10
+
+DATABASE_ROUTERS = ["cookery_bookery.db.replicas.PrimaryReplicaRouter"]
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
@@ -154,3 +179,41 @@ STATIC_URL = '/static/'
 # Simplified static file serving.
 # https://warehouse.python.org/project/whitenoise/
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Directory holding the full-text recipe search index (see recipes/search.py)
+SEARCH_INDEX_DIR = BASE_DIR / "search_index"
+
+# Maximum number of ranked results a recipe search returns
+SEARCH_RESULT_LIMIT = 100
+
+# Seconds that rendered recipe cards, detail bodies and the home page layout stay
+# in the cache
+RECIPE_FRAGMENT_TIMEOUT = 24 * 60 * 60
+
+# Have a detail page that finds the similar recipes index missing, or unable to
+# catch up, build a new one on a background thread (see recipes/similar.py)
+SIMILAR_RECIPES_BACKGROUND_BUILD = True
+
+# Serve the read-heavy views, and password resets, as async views that run their
+# blocking work in a thread pool. asgi.py turns this on.
+ASYNC_VIEWS = os.environ.get("DJANGO_ASYNC_VIEWS", "") == "True"
+
+# Threads in that pool, each of which may hold a database connection
+ASYNC_VIEW_THREADS = int(os.environ.get("DJANGO_ASYNC_VIEW_THREADS", "8"))
+
+# Log the timings ServerTimingMiddleware takes of each request, one line per request
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "cookery_bookery.timing": {
+            "handlers": ["console"],
+            "level": os.environ.get("REQUEST_TIMING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        }
+    },
+}
+
+# Runs the tests with the timing log turned down to WARNING
+TEST_RUNNER = "cookery_bookery.test_runner.TestRunner"
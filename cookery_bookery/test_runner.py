@@ -0,0 +1,35 @@
+"""
+Test runner that keeps the request timing log out of the test output, and the
+similar recipes index from being built on threads that can't see the data of a
+TestCase's open transaction.
+"""
+import logging
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+TEST_LOG_LEVELS = {"cookery_bookery.timing": logging.WARNING}
+TEST_SETTINGS = {"SIMILAR_RECIPES_BACKGROUND_BUILD": False}
+
+
+class TestRunner(DiscoverRunner):
+    """ DiscoverRunner that sets TEST_LOG_LEVELS and TEST_SETTINGS for the tests. """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.saved_settings = {}
+        for name, value in TEST_SETTINGS.items():
+            self.saved_settings[name] = getattr(settings, name)
+            setattr(settings, name, value)
+        self.saved_log_levels = {}
+        for name, level in TEST_LOG_LEVELS.items():
+            logger = logging.getLogger(name)
+            self.saved_log_levels[name] = logger.level
+            logger.setLevel(level)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, level in self.saved_log_levels.items():
+            logging.getLogger(name).setLevel(level)
+        for name, value in self.saved_settings.items():
+            setattr(settings, name, value)
+        super().teardown_test_environment(**kwargs)
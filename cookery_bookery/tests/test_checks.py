@@ -0,0 +1,88 @@
+from django.core.checks import Warning, run_checks
+from django.test import SimpleTestCase, override_settings
+
+from cookery_bookery import production_settings
+from cookery_bookery.checks import check_production_settings, debug_behaviour
+
+MEMCACHED = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.memcached.MemcachedCache",
+        "LOCATION": ["127.0.0.1:11211"],
+    }
+}
+PRODUCTION = {
+    "PRODUCTION": True,
+    "DEBUG": production_settings.DEBUG,
+    "TEMPLATES": production_settings.TEMPLATES,
+    "CACHES": MEMCACHED,
+}
+
+
+class ProductionSettingsTest(SimpleTestCase):
+    def test_production_settings_pass(self):
+        self.assertFalse(production_settings.DEBUG)
+        with override_settings(**PRODUCTION):
+            self.assertEqual(debug_behaviour(), [])
+            self.assertEqual(check_production_settings(), [])
+
+    def test_warns_of_debug_behaviour(self):
+        uncached = [
+            {**production_settings.TEMPLATES[0], "OPTIONS": {"debug": True}},
+            {
+                **production_settings.TEMPLATES[0],
+                "OPTIONS": {
+                    "loaders": ["django.template.loaders.filesystem.Loader"]
+                },
+            },
+        ]
+        locmem = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        with override_settings(
+            **{**PRODUCTION, "DEBUG": True, "TEMPLATES": uncached, "CACHES": locmem}
+        ):
+            self.assertEqual(len(debug_behaviour()), 4)
+            warnings = check_production_settings()
+        self.assertEqual(len(warnings), 4)
+        self.assertIsInstance(warnings[0], Warning)
+        self.assertEqual(warnings[0].id, "cookery_bookery.W001")
+        self.assertIn("DEBUG is on", warnings[0].msg)
+
+    def test_warns_of_caches_without_atomic_incr(self):
+        database = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "django_cache",
+            }
+        }
+        with override_settings(**{**PRODUCTION, "CACHES": database}):
+            [warning] = check_production_settings()
+        self.assertIn("isn't atomic", warning.msg)
+
+    def test_warns_of_memcached_without_servers(self):
+        memcached = {"default": {**MEMCACHED["default"], "LOCATION": []}}
+        with override_settings(**{**PRODUCTION, "CACHES": memcached}):
+            [warning] = check_production_settings()
+        self.assertIn("MEMCACHE_SERVERS", warning.msg)
+
+    def test_starts_without_memcache_servers(self):
+        # MEMCACHE_SERVERS isn't set here, so each process keeps a cache of its own
+        self.assertEqual(
+            production_settings.CACHES["default"]["BACKEND"],
+            "django.core.cache.backends.locmem.LocMemCache",
+        )
+        with override_settings(**{**PRODUCTION, "CACHES": production_settings.CACHES}):
+            [warning] = check_production_settings()
+        self.assertIn("MEMCACHE_SERVERS", warning.msg)
+
+    def test_only_in_production(self):
+        with override_settings(DEBUG=True):
+            self.assertEqual(check_production_settings(), [])
+
+    def test_only_checked_for_deployment(self):
+        with override_settings(**{**PRODUCTION, "DEBUG": True}):
+            self.assertEqual(run_checks(), [])
+            self.assertIn(
+                "cookery_bookery.W001",
+                [message.id for message in run_checks(include_deployment_checks=True)],
+            )
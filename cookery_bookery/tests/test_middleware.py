@@ -0,0 +1,60 @@
+import re
+
+from accounts.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from recipes.models import Recipe
+
+TIMING_RE = re.compile(r'^db;dur=[\d.]+;desc="(\d+) queries", view;dur=[\d.]+')
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ServerTimingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        cls.recipe = Recipe.objects.create(
+            name="Pizza", description="Cheesy.", servings=8, author=cls.user
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_header(self):
+        response = self.client.get(reverse("recipe-detail", args=[self.recipe.id]))
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, TIMING_RE)
+        # Recipe, ingredients and instructions
+        self.assertEqual(TIMING_RE.match(timing).group(1), "3")
+        self.assertIn("render;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+    def test_view_without_template_response(self):
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+        response = self.client.post(
+            reverse("favorites"),
+            {"recipe": self.recipe.id},
+            HTTP_ACCEPT="application/json",
+        )
+        self.assertRegex(response["Server-Timing"], TIMING_RE)
+        self.assertNotIn("render", response["Server-Timing"])
+
+    def test_log_line(self):
+        with self.assertLogs("cookery_bookery.timing", "INFO") as logs:
+            self.client.get(reverse("all-recipes"))
+        record = logs.records[0]
+        self.assertEqual(record.route, "all-recipes")
+        self.assertEqual(record.status, 200)
+        # Only the page, as the validators come from the cache
+        self.assertEqual(record.queries, 1)
+        self.assertIn("route=all-recipes method=GET status=200", record.getMessage())
+
+    def test_unrouted_requests_are_not_timed(self):
+        response = self.client.get("/no-such-page/")
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(response.has_header("Server-Timing"))
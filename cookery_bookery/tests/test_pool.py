@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import dj_database_url
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from cookery_bookery.db.backends.pooled import close_pools, ping, pool_stats, reset
+from cookery_bookery.db.pool import ConnectionPool, PoolTimeout
+
+
+def connect():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def pool(self, **kwargs):
+        return ConnectionPool(ping=ping, reset=reset, **kwargs)
+
+    def test_reuses_connections(self):
+        pool = self.pool()
+        first = pool.acquire(connect)
+        pool.release(first)
+        self.assertIs(pool.acquire(connect), first)
+        stats = pool.stats()
+        self.assertEqual(stats["checkouts"], 2)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["in_use"], 1)
+
+    def test_bounded(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+        connection = pool.acquire(connect)
+        with self.assertLogs("cookery_bookery.db.pool", "WARNING"):
+            with self.assertRaises(PoolTimeout):
+                pool.acquire(connect)
+        self.assertEqual(pool.stats()["timeouts"], 1)
+
+        # A waiting checkout gets the connection when it is released
+        threading.Timer(0.05, pool.release, [connection]).start()
+        pool.timeout = 5
+        self.assertIs(pool.acquire(connect), connection)
+        self.assertGreater(pool.stats()["wait_ms_max"], 0)
+
+    def test_failed_connect_frees_slot(self):
+        pool = self.pool(max_size=1, timeout=0.05)
+
+        def fail():
+            raise sqlite3.OperationalError("Can't connect.")
+
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.acquire(fail)
+        self.assertEqual(pool.stats()["size"], 0)
+        pool.acquire(connect)
+
+    def test_recycles_old_connections(self):
+        pool = self.pool(max_age=60)
+        first = pool.acquire(connect)
+        pool.release(first)
+        pool.max_age = 0
+        second = pool.acquire(connect)
+        self.assertIsNot(second, first)
+        pool.release(second)
+        # Too old to go back into the pool
+        self.assertEqual(pool.stats()["idle"], 0)
+        self.assertEqual(pool.stats()["recycled"], 1)
+        self.assertEqual(pool.stats()["discarded"], 1)
+
+    def test_pings_idle_connections(self):
+        pool = self.pool(ping_after=0)
+        first = pool.acquire(connect)
+        pool.release(first)
+        # As if the server had dropped it
+        first.close()
+        second = pool.acquire(connect)
+        self.assertIsNot(second, first)
+        second.execute("SELECT 1")
+        self.assertEqual(pool.stats()["ping_failures"], 1)
+
+    def test_rolls_back_on_release(self):
+        pool = self.pool()
+        connection = pool.acquire(connect)
+        connection.execute("CREATE TABLE t (id INTEGER)")
+        connection.execute("INSERT INTO t VALUES (1)")
+        self.assertTrue(connection.in_transaction)
+        pool.release(connection)
+        self.assertFalse(connection.in_transaction)
+
+    def test_forgets_connections_after_fork(self):
+        pool = self.pool()
+        pool.release(pool.acquire(connect))
+        # As if this were a child of the process that made the pool
+        pool.pid = -1
+        pool.acquire(connect)
+        self.assertEqual(pool.stats()["created"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+
+class PooledBackendTest(SimpleTestCase):
+    """
+    Runs against SQLite, or against the Postgres database at
+    POOL_TEST_DATABASE_URL if that is set.
+    """
+
+    def setUp(self):
+        url = os.environ.get("POOL_TEST_DATABASE_URL")
+        if url:
+            database = dj_database_url.parse(url)
+            database["ENGINE"] = "cookery_bookery.db.backends.postgresql"
+        else:
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            database = {
+                "ENGINE": "cookery_bookery.db.backends.sqlite3",
+                "NAME": os.path.join(directory.name, "pooled.db"),
+            }
+        database["POOL"] = {"MAX_SIZE": 2, "TIMEOUT": 0.2}
+        self.connections = ConnectionHandler({"default": {}, "pooled": database})
+        self.addCleanup(close_pools, "pooled")
+
+    def test_close_releases_to_pool(self):
+        connection = self.connections["pooled"]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        raw = connection.connection
+        connection.close()
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw)
+        connection.close()
+        [stats] = [
+            stats for key, stats in pool_stats().items() if key[0] == "pooled"
+        ]
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_threads_share_bounded_pool(self):
+        held = threading.Event()
+        done = threading.Event()
+        errors = []
+
+        def hold():
+            connection = self.connections["pooled"]
+            connection.ensure_connection()
+            held.set()
+            done.wait(5)
+            connection.close()
+
+        threads = [threading.Thread(target=hold) for _ in range(2)]
+        for thread in threads:
+            held.clear()
+            thread.start()
+            held.wait(5)
+
+        def checkout():
+            try:
+                self.connections["pooled"].ensure_connection()
+            except OperationalError as e:
+                errors.append(e)
+
+        # Both connections are in use, so a third thread times out
+        start = time.monotonic()
+        with self.assertLogs("cookery_bookery.db.pool", "WARNING"):
+            thread = threading.Thread(target=checkout)
+            thread.start()
+            thread.join()
+        done.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import tempfile
+
+from accounts.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from recipes.models import Recipe
+from recipes.tests.test_search import SearchIndexTestMixin
+
+from cookery_bookery.db import replicas
+from cookery_bookery.middleware import ReplicaPinMiddleware
+
+
+@override_settings(
+    REPLICA_DATABASES=["replica"],
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class ReplicaRoutingTest(SearchIndexTestMixin, TransactionTestCase):
+    """
+    The test database stands in for the primary, and a SQLite file copied from it
+    at the start of each test for a replica that never catches up.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Added after the test runner set up its databases, which it leaves alone
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.databases["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.path.join(cls.directory.name, "replica.db"),
+        }
+        connections.ensure_defaults("replica")
+        connections.prepare_test_settings("replica")
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.databases["replica"]
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        self.recipe = Recipe.objects.create(name="Pizza", servings=2)
+        self.client.force_login(self.user)
+        self.copy_to_replica()
+
+    def copy_to_replica(self):
+        connections["replica"].close()
+        primary = connections[DEFAULT_DB_ALIAS]
+        primary.ensure_connection()
+        replica = sqlite3.connect(connections["replica"].settings_dict["NAME"])
+        primary.connection.backup(replica)
+        replica.close()
+
+    def test_requests_read_from_replica(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        recipe = Recipe.objects.create(name="Not replicated yet", servings=2)
+        url = reverse("recipe-detail", args=[recipe.id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_writes_pin_client_to_primary(self):
+        response = self.client.post(
+            reverse("create-recipe"),
+            {"name": "Soup", "description": "Hot.", "servings": 4},
+            follow=True,
+        )
+        # The rest of the request, and the client's next ones, read what it wrote
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(ReplicaPinMiddleware.cookie_name, self.client.cookies)
+        self.assertEqual(Recipe.objects.get(name="Soup").author, self.user)
+
+        url = response.redirect_chain[-1][0]
+        del self.client.cookies[ReplicaPinMiddleware.cookie_name]
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_reads_only_go_to_replicas_in_requests(self):
+        self.assertEqual(router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+        token = replicas.start_request(pinned=False)
+        try:
+            self.assertEqual(router.db_for_read(Recipe), "replica")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+        finally:
+            state = replicas.finish_request(token)
+        self.assertTrue(state.wrote)
+        self.assertFalse(router.allow_migrate("replica", "recipes"))
+
+    def test_database_cache_stays_on_primary(self):
+        database_cache = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                "LOCATION": "replica_test_cache",
+            }
+        }
+        with self.settings(CACHES=database_cache):
+            call_command("createcachetable", verbosity=0)
+            self.addCleanup(self.drop_cache_table)
+            self.copy_to_replica()
+            cache.set("greeting", "hello")
+            token = replicas.start_request(pinned=False)
+            try:
+                # Not the empty copy on the replica
+                self.assertEqual(cache.get("greeting"), "hello")
+                cache.set("greeting", "hi")
+                self.assertEqual(router.db_for_read(Recipe), "replica")
+            finally:
+                state = replicas.finish_request(token)
+            self.assertFalse(state.wrote)
+
+            # Signed-in requests cache their sessions, without being pinned
+            url = reverse("recipe-detail", args=[self.recipe.id])
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertNotIn(ReplicaPinMiddleware.cookie_name, self.client.cookies)
+
+    def drop_cache_table(self):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute("DROP TABLE replica_test_cache")
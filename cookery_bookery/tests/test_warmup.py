@@ -0,0 +1,40 @@
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+from django.urls import get_resolver
+from recipes import similar
+
+from cookery_bookery import warmup
+
+
+class WarmUpTest(SimpleTestCase):
+    # warm_up() builds the similar recipes index
+    databases = {"default"}
+
+    def test_imports_app_modules(self):
+        self.assertGreater(warmup.import_app_modules(), 0)
+        self.assertIn("recipes.api", sys.modules)
+        self.assertIn("accounts.forms", sys.modules)
+
+    def test_compiles_url_patterns(self):
+        names = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        self.assertGreaterEqual(warmup.compile_url_patterns(), len(names))
+
+    def test_compiles_project_templates(self):
+        templates = [
+            path
+            for directory in ("templates", "recipes/templates")
+            for path in (settings.BASE_DIR / directory).rglob("*.html")
+        ]
+        # Only the project's own templates, not the admin's
+        self.assertEqual(warmup.compile_templates(), len(templates))
+
+    def test_warm_up(self):
+        self.addCleanup(setattr, similar, "_index", None)
+        similar._index = None
+        timings = warmup.warm_up()
+        self.assertEqual(
+            list(timings), ["imports", "urls", "templates", "translations", "similar"]
+        )
+        self.assertIsNotNone(similar._index)
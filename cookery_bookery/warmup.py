@@ -0,0 +1,105 @@
+"""
+Warming up a process that workers are forked from.
+
+Django imports views, builds its URL resolvers, compiles templates and loads
+translations lazily, so each worker otherwise pays for them on its first
+requests. Doing them once in gunicorn's master process (see gunicorn.conf.py)
+has workers start ready to serve, sharing that memory with the master until
+they write to it. The similar recipes index is built here too, rather than on
+a background thread of every worker once they start serving.
+"""
+import importlib
+import pkgutil
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+
+from recipes import similar
+
+# Modules never used to serve requests
+SKIPPED_PACKAGES = {"management", "migrations", "tests"}
+
+
+def is_local(path):
+    """ Return whether path is part of this project, rather than a library. """
+    path = Path(path).resolve()
+    return path == settings.BASE_DIR or settings.BASE_DIR in path.parents
+
+
+def import_app_modules():
+    """ Import every module of the project's apps, returning how many. """
+    count = 0
+    for app_config in apps.get_app_configs():
+        if not is_local(app_config.path):
+            continue
+        for module in pkgutil.walk_packages(
+            [app_config.path], app_config.name + ".", onerror=lambda name: None
+        ):
+            if SKIPPED_PACKAGES.intersection(module.name.split(".")):
+                continue
+            importlib.import_module(module.name)
+            count += 1
+    return count
+
+
+def compile_url_patterns(resolver=None):
+    """ Build the URL resolvers and compile every pattern, returning how many. """
+    if resolver is None:
+        resolver = get_resolver()
+    # Reversing needs the lookup tables, which resolve() builds lazily too
+    resolver.reverse_dict
+    count = 0
+    for pattern in resolver.url_patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            count += compile_url_patterns(pattern)
+        else:
+            count += 1
+    return count
+
+
+def compile_templates():
+    """
+    Compile every template in the project's template directories, returning how
+    many. Compiled templates are only kept by the cached template loader, which
+    Django uses when DEBUG is off.
+    """
+    count = 0
+    for engine in engines.all():
+        for directory in map(Path, engine.template_dirs):
+            if not is_local(directory):
+                continue
+            for path in sorted(directory.rglob("*.html")):
+                engine.get_template(path.relative_to(directory).as_posix())
+                count += 1
+    return count
+
+
+def load_translations():
+    translation.activate(settings.LANGUAGE_CODE)
+    translation.deactivate()
+
+
+def warm_up():
+    """ Do the work of a first request up front, returning {step: seconds}. """
+    timings = {}
+    for name, step in (
+        ("imports", import_app_modules),
+        ("urls", compile_url_patterns),
+        ("templates", compile_templates),
+        ("translations", load_translations),
+        ("similar", similar.get_index),
+    ):
+        start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - start
+    # Forked workers mustn't share the master's database connections
+    connections.close_all()
+    return timings
+
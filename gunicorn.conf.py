@@ -0,0 +1,109 @@
+"""
+Gunicorn settings, used by the Procfile.
+
+The app is loaded and warmed up once, in the master process, and the workers are
+forked from it, so they start ready to serve and share the master's memory.
+Set GUNICORN_WARM_UP=False to start the workers cold, for comparison, each
+building its own similar recipes index in the background once a detail page asks
+for it. Each worker logs how long after forking it served its first request, and
+its memory.
+
+The master also starts build_search_index --every in a process of its own, which
+builds this host's search index once the server is up and rebuilds it whenever
+SEARCH_INDEX_MIN_DELTA recipes have changed.
+"""
+import gc
+import os
+import subprocess
+import sys
+import time
+
+WARM_UP = os.environ.get("GUNICORN_WARM_UP", "True") == "True"
+SEARCH_INDEX_EVERY = int(os.environ.get("SEARCH_INDEX_EVERY", "300"))
+SEARCH_INDEX_MIN_DELTA = int(os.environ.get("SEARCH_INDEX_MIN_DELTA", "100"))
+
+preload_app = WARM_UP
+
+
+def memory_usage():
+    """
+    Return the resident memory of this process, and how much of it isn't shared
+    with other processes, in KB. Only where there is /proc.
+    """
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name == "Rss":
+                    usage["rss_kb"] = int(value.split()[0])
+                elif name.startswith("Private_"):
+                    private = usage.get("private_kb", 0)
+                    usage["private_kb"] = private + int(value.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def when_ready(server):
+    if WARM_UP:
+        # The app is loaded by now, and the workers not yet forked
+        from cookery_bookery.warmup import warm_up
+
+        timings = warm_up()
+        server.log.info(
+            "Warmed up in %.0f ms (%s)",
+            sum(timings.values()) * 1000,
+            ", ".join(
+                "%s %.0f ms" % (name, seconds * 1000)
+                for name, seconds in timings.items()
+            ),
+        )
+        # Leave the objects made so far out of garbage collection, which would
+        # otherwise write to them and copy their pages into every worker
+        gc.collect()
+        gc.freeze()
+    server.log.info("Master memory: %s", memory_usage())
+    manage = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manage.py")
+    server.search_indexer = subprocess.Popen(
+        [
+            sys.executable,
+            manage,
+            "build_search_index",
+            "--every",
+            str(SEARCH_INDEX_EVERY),
+            "--min-delta",
+            str(SEARCH_INDEX_MIN_DELTA),
+        ]
+    )
+
+
+def on_exit(server):
+    indexer = getattr(server, "search_indexer", None)
+    if indexer is not None:
+        indexer.terminate()
+        indexer.wait()
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+    worker.served_first_request = False
+
+
+def post_request(worker, req, environ, resp):
+    if worker.served_first_request:
+        return
+    worker.served_first_request = True
+    worker.log.info(
+        "Worker %d served its first request %.0f ms after forking. Memory: %s",
+        worker.pid,
+        (time.perf_counter() - worker.forked_at) * 1000,
+        memory_usage(),
+    )
+
+
+def worker_exit(server, worker):
+    from cookery_bookery.db.backends.pooled import pool_stats
+
+    for (alias, name), stats in pool_stats().items():
+        worker.log.info("Worker %d %s database pool: %s", worker.pid, alias, stats)
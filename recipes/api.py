@@ -0,0 +1,175 @@
+"""
+A read-only JSON API for recipes.
+
+Recipes are read with values() and serialized straight from the rows, so no
+models, forms or templates are involved. Clients choose what they get with:
+
+* ?fields=id,name,... to pick recipe fields (see FIELDS)
+* ?include=ingredients,instructions to add a recipe's children
+
+Lists are paged with the same opaque cursors as the HTML recipe list.
+"""
+from collections import defaultdict
+
+from django.core.paginator import InvalidPage
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.views import generic
+
+from .models import Ingredient, Instruction, Recipe
+from .pagination import KeysetPaginator
+
+# API field -> Recipe column
+FIELDS = {
+    "id": "id",
+    "name": "name",
+    "description": "description",
+    "servings": "servings",
+    "nota_bene": "nota_bene",
+    "author": "author__username",
+    "updated_at": "updated_at",
+    "url": "id",
+}
+LIST_FIELDS = ("id", "name", "description", "servings", "author", "url")
+DETAIL_FIELDS = tuple(FIELDS)
+
+# Child collection -> (model, columns)
+INCLUDES = {
+    "ingredients": (
+        Ingredient,
+        ("name", "amount", "preparation", "quantity", "quantity_max", "unit"),
+    ),
+    "instructions": (Instruction, ("step_number", "description")),
+}
+INCLUDE_ORDERING = {"ingredients": "id", "instructions": "step_number"}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def api_error(message, status):
+    return JsonResponse({"error": message}, status=status)
+
+
+def parse_list(value, allowed, name):
+    values = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in values if item not in allowed]
+    if unknown:
+        raise BadRequest(
+            "Unknown %s: %s. Choose from %s."
+            % (name, ", ".join(unknown), ", ".join(allowed))
+        )
+    return values
+
+
+def load_children(include, recipe_ids):
+    """ Return {recipe id: [child dicts]} for one of the INCLUDES collections. """
+    model, columns = INCLUDES[include]
+    rows = (
+        model.objects.filter(recipe_id__in=recipe_ids)
+        .order_by("recipe_id", INCLUDE_ORDERING[include])
+        .values_list("recipe_id", *columns)
+    )
+    children = defaultdict(list)
+    for recipe_id, *values in rows:
+        children[recipe_id].append(dict(zip(columns, values)))
+    return children
+
+
+class RecipeAPIMixin:
+    """ Custom mixin that parses ?fields= and ?include= and serializes recipes. """
+
+    default_fields = LIST_FIELDS
+    default_includes = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.fields = self.get_fields()
+            self.includes = self.get_includes()
+            return super().dispatch(request, *args, **kwargs)
+        except BadRequest as e:
+            return api_error(str(e), 400)
+        except Http404 as e:
+            return api_error(str(e) or "Not found.", 404)
+
+    def get_fields(self):
+        if "fields" not in self.request.GET:
+            return list(self.default_fields)
+        return parse_list(self.request.GET["fields"], FIELDS, "fields")
+
+    def get_includes(self):
+        if "include" not in self.request.GET:
+            return list(self.default_includes)
+        return parse_list(self.request.GET["include"], INCLUDES, "include")
+
+    def get_queryset(self):
+        # The pagination key is always loaded, whether or not it is asked for
+        columns = {"id", "name", *(FIELDS[field] for field in self.fields)}
+        return Recipe.objects.values(*columns)
+
+    def serialize(self, rows):
+        ids = [row["id"] for row in rows]
+        children = {include: load_children(include, ids) for include in self.includes}
+        results = []
+        for row in rows:
+            result = {}
+            for field in self.fields:
+                if field == "url":
+                    result[field] = self.request.build_absolute_uri(
+                        reverse("api-recipe-detail", args=[row["id"]])
+                    )
+                else:
+                    result[field] = row[FIELDS[field]]
+            for include in self.includes:
+                result[include] = children[include].get(row["id"], [])
+            results.append(result)
+        return results
+
+
+class RecipeListAPIView(RecipeAPIMixin, generic.View):
+    """ API view listing recipes in name order, a page at a time. """
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            raise BadRequest("limit must be a whole number.")
+        return max(1, min(limit, MAX_LIMIT))
+
+    def page_url(self, cursor):
+        if cursor is None:
+            return None
+        query = self.request.GET.copy()
+        query["cursor"] = cursor
+        return self.request.build_absolute_uri("?" + query.urlencode())
+
+    def get(self, request, *args, **kwargs):
+        paginator = KeysetPaginator(self.get_queryset(), self.get_limit())
+        try:
+            page = paginator.page(request.GET.get("cursor"))
+        except InvalidPage as e:
+            raise BadRequest(str(e))
+        return JsonResponse(
+            {
+                "results": self.serialize(page.object_list),
+                "next": self.page_url(page.next_cursor),
+                "previous": self.page_url(page.previous_cursor),
+            }
+        )
+
+
+class RecipeDetailAPIView(RecipeAPIMixin, generic.View):
+    """ API view for a single recipe, by default with all of its contents. """
+
+    default_fields = DETAIL_FIELDS
+    default_includes = tuple(INCLUDES)
+
+    def get(self, request, *args, **kwargs):
+        row = self.get_queryset().filter(pk=kwargs["pk"]).first()
+        if row is None:
+            raise Http404("No recipe with id %d." % kwargs["pk"])
+        return JsonResponse(self.serialize([row])[0])
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class RecipesConfig(AppConfig):
     name = "recipes"
+
+    def ready(self):
+        # Connect the signal handlers that keep derived recipe data up to date
+        from . import signals
+
+        # Register the check of production settings with check --deploy
+        from cookery_bookery import checks  # noqa: F401
@@ -0,0 +1,325 @@
+"""
+In-process benchmarks of every named route against a synthetic catalogue.
+
+Catalogues are generated from a seed, so the same size and seed always give
+the same recipes, ingredients, authors and favorites. Rows are written with
+bulk inserts and explicit ids, into a database that contains nothing else.
+"""
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth.hashers import make_password
+from django.db import router, transaction
+from django.test import Client
+from django.urls import reverse
+
+import accounts.urls
+from accounts.models import User
+
+from . import urls
+from .catalogue import refresh_derived_data
+from .models import Ingredient, Instruction, Recipe
+
+SIZES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+
+# Latency changes smaller than this are put down to noise
+MIN_CHANGE_MS = 1.0
+
+PASSWORD = "bench-password"
+
+# Ingredients in rough order of how often recipes use them
+INGREDIENTS = (
+    "salt",
+    "olive oil",
+    "garlic",
+    "onion",
+    "butter",
+    "black pepper",
+    "sugar",
+    "flour",
+    "egg",
+    "water",
+    "milk",
+    "lemon",
+    "tomato",
+    "parsley",
+    "carrot",
+    "chicken breast",
+    "rice",
+    "parmesan",
+    "cumin",
+    "ginger",
+    "soy sauce",
+    "basil",
+    "potato",
+    "honey",
+    "paprika",
+    "cream",
+    "celery",
+    "thyme",
+    "beef mince",
+    "chickpeas",
+    "coriander",
+    "spinach",
+    "mushroom",
+    "cinnamon",
+    "yoghurt",
+    "lime",
+    "chilli",
+    "pasta",
+    "bacon",
+    "vanilla extract",
+)
+# Zipf-like weights, so a few ingredients turn up in most recipes
+INGREDIENT_WEIGHTS = [1 / rank for rank in range(1, len(INGREDIENTS) + 1)]
+AMOUNTS = ("1", "2", "1/2", "1 1/2", "3", "1/4", "2-3", "4", "100", "250")
+UNITS = ("", "cup", "cups", "tbsp", "tsp", "g", "ml", "cloves", "pinch", "large")
+PREPARATIONS = (None, None, None, "finely chopped", "minced", "sliced", "melted")
+DISHES = ("soup", "stew", "salad", "pie", "curry", "bake", "roast", "tart", "pasta")
+ADJECTIVES = ("Quick", "Spicy", "Smoky", "Creamy", "Rustic", "Easy", "Sunday")
+STEPS = (
+    "Preheat the oven.",
+    "Chop everything finely.",
+    "Fry gently until soft.",
+    "Stir in the rest of the ingredients.",
+    "Simmer for twenty minutes.",
+    "Season to taste.",
+    "Bake until golden.",
+    "Leave to rest before serving.",
+)
+
+
+def seed_catalogue(size, seed=1, batch_size=5000, progress=None):
+    """
+    Fill an empty database with size recipes, one author for every ten recipes,
+    and favorites concentrated on a few popular recipes. Return the users.
+    """
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    user_count = max(10, size // 10)
+    users = [
+        # User 1 runs the benchmarks, including the staff-only export
+        User(id=number, username="cook%d" % number, password=password)
+        for number in range(1, user_count + 1)
+    ]
+    users[0].is_staff = True
+    User.objects.bulk_create(users, batch_size=batch_size)
+
+    # Each user favorites a few recipes, mostly the popular low-numbered ones
+    through = User.favorite_recipes.through
+    favorite_counts = [0] * (size + 1)
+    favorites = []
+    for user in users:
+        recipe_ids = {
+            1 + int(size * rng.random() ** 3) for _ in range(rng.randint(0, 20))
+        }
+        for recipe_id in recipe_ids:
+            favorite_counts[recipe_id] += 1
+            favorites.append(through(user_id=user.id, recipe_id=recipe_id))
+
+    using = router.db_for_write(Recipe)
+    for start in range(1, size + 1, batch_size):
+        recipes, ingredients, instructions = [], [], []
+        for recipe_id in range(start, min(start + batch_size, size + 1)):
+            recipes.append(
+                Recipe(
+                    id=recipe_id,
+                    name="%s %s %s"
+                    % (
+                        rng.choice(ADJECTIVES),
+                        rng.choice(INGREDIENTS).capitalize(),
+                        rng.choice(DISHES),
+                    ),
+                    description="A synthetic recipe for benchmarking.",
+                    servings=rng.randint(1, 8),
+                    # Recipe 1 belongs to user 1, who benchmarks the author pages
+                    author_id=(recipe_id - 1) % user_count + 1,
+                    favorite_count=favorite_counts[recipe_id],
+                )
+            )
+            names = rng.choices(INGREDIENTS, INGREDIENT_WEIGHTS, k=rng.randint(4, 14))
+            for name in sorted(set(names)):
+                amount = "%s %s" % (rng.choice(AMOUNTS), rng.choice(UNITS))
+                ingredient = Ingredient(
+                    recipe_id=recipe_id,
+                    name=name,
+                    amount=amount.strip(),
+                    preparation=rng.choice(PREPARATIONS),
+                )
+                ingredient.populate_quantity()
+                ingredients.append(ingredient)
+            for step_number in range(1, rng.randint(3, 9) + 1):
+                instructions.append(
+                    Instruction(
+                        recipe_id=recipe_id,
+                        step_number=step_number,
+                        description=rng.choice(STEPS),
+                    )
+                )
+        with transaction.atomic(using=using):
+            Recipe.objects.bulk_create(recipes)
+            Ingredient.objects.bulk_create(ingredients)
+            Instruction.objects.bulk_create(instructions)
+        if progress:
+            progress(min(start + batch_size - 1, size))
+
+    through.objects.bulk_create(favorites, batch_size=batch_size)
+    refresh_derived_data()
+    return users
+
+
+class Route:
+    """ A named route and how to request it. """
+
+    def __init__(self, name, args=(), query="", method="get", data=None, runs=None):
+        self.name = name
+        self.args = args
+        self.query = query
+        self.method = method
+        self.data = data
+        # Fixed number of runs, for routes too heavy to repeat
+        self.runs = runs
+
+    def url(self):
+        url = reverse(self.name, args=self.args)
+        return "%s?%s" % (url, self.query) if self.query else url
+
+
+def named_routes():
+    """ Return the names of every route of the recipes and accounts apps. """
+    patterns = urls.urlpatterns + accounts.urls.urlpatterns
+    return {pattern.name for pattern in patterns if pattern.name}
+
+
+def routes():
+    """ Return a Route for every named route of the recipes and accounts apps. """
+    recipe = Recipe.objects.get(pk=1)
+    ingredient = recipe.ingredient_set.order_by("id").first()
+    instruction = recipe.instruction_set.order_by("step_number").first()
+    next_url = "next=" + recipe.get_absolute_url()
+    return [
+        Route("index"),
+        Route("all-recipes"),
+        Route("recipe-detail", [recipe.id]),
+        Route("my-recipes"),
+        Route("my-favorites"),
+        Route("most-favorited"),
+        Route("search", query="q=garlic+soup"),
+        Route("what-can-i-cook", query="ingredients=salt,garlic,onion,egg,flour"),
+        Route("export-recipes", runs=1),
+        Route("api-recipe-list", query="include=ingredients"),
+        Route("api-recipe-detail", [recipe.id]),
+        Route(
+            "favorites",
+            method="post",
+            data={"recipe": recipe.id, "next": recipe.get_absolute_url()},
+        ),
+        Route("create-recipe"),
+        Route("create-full-recipe"),
+        Route("add-ingredient", [recipe.id]),
+        Route("add-instruction", [recipe.id]),
+        Route("update-recipe", [recipe.id], next_url),
+        Route("update-ingredient", [ingredient.id], next_url),
+        Route("update-instruction", [instruction.id], next_url),
+        Route("delete-recipe", [recipe.id], next_url),
+        Route("delete-ingredient", [ingredient.id], next_url),
+        Route("delete-instruction", [instruction.id], next_url),
+        Route("signup"),
+        Route("user-detail", ["cook1"]),
+        Route("login"),
+        Route("password_reset"),
+        Route("password_reset_confirm", ["MQ", "0-0"]),
+    ]
+
+
+def queries_from_header(response):
+    """ Read the query count ServerTimingMiddleware reports, if it is installed. """
+    for metric in response.get("Server-Timing", "").split(","):
+        name, *params = metric.strip().split(";")
+        if name == "db":
+            for param in params:
+                if param.startswith("desc="):
+                    return int(param[len('desc="') :].split()[0])
+    return None
+
+
+def request(client, route):
+    response = getattr(client, route.method)(route.url(), route.data)
+    if response.streaming:
+        # Streamed responses do their work as they are read
+        for chunk in response.streaming_content:
+            pass
+    return response
+
+
+def bench_route(client, route, runs, warmup=5):
+    """ Time runs requests of route, after a few to warm up caches. """
+    runs = route.runs or runs
+    for _ in range(min(warmup, runs)):
+        request(client, route)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = request(client, route)
+        timings.append(time.perf_counter() - start)
+
+    # Tracing allocations slows everything down, so measure memory separately
+    tracemalloc.start()
+    request(client, route)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    if runs > 1:
+        quantiles = statistics.quantiles(timings, n=100)
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+    else:
+        p50 = p95 = p99 = timings[0]
+    return {
+        "status": response.status_code,
+        "runs": runs,
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "queries": queries_from_header(response),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run(runs, progress=None):
+    """ Benchmark every route as user 1, returning {route name: result}. """
+    client = Client()
+    client.login(username="cook1", password=PASSWORD)
+    results = {}
+    for route in routes():
+        results[route.name] = bench_route(client, route, runs)
+        if progress:
+            progress(route.name, results[route.name])
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of (route, metric, baseline, result) regressions: latency or
+    peak memory up by more than threshold (a fraction), or any extra queries.
+    Routes missing from the baseline are skipped.
+    """
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "peak_kb"):
+            change = result[metric] - before[metric]
+            if change <= before[metric] * threshold:
+                continue
+            if metric.endswith("_ms") and change < MIN_CHANGE_MS:
+                continue
+            regressions.append((name, metric, before[metric], result[metric]))
+        if None not in (result["queries"], before["queries"]):
+            if result["queries"] > before["queries"]:
+                regressions.append(
+                    (name, "queries", before["queries"], result["queries"])
+                )
+    return regressions
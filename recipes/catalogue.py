@@ -0,0 +1,271 @@
+"""
+The recipe catalogue as JSON lines, one recipe with its children per line:
+
+    {"name": "Pizza", "description": "...", "servings": 8, "nota_bene": null,
+     "author": "username", "ingredients": [{"name": "flour", "amount": "2 cups",
+     "preparation": null}], "instructions": [{"step_number": 1,
+     "description": "..."}]}
+
+Instructions may also be given as plain strings, numbered in order. Catalogues
+can also be exported as CSV, one row per recipe, for reading in a spreadsheet.
+"""
+import csv
+import json
+import tempfile
+
+from django.db import connections, router, transaction
+from django.db.models import Prefetch
+
+from accounts.models import User
+
+from . import changes, fragments, home, search
+from .models import Ingredient, Instruction, Recipe
+from .signals import content_hooks_disabled
+
+
+class InvalidRecipe(ValueError):
+    pass
+
+
+def text(data, model, key, required=True):
+    """ Return the string data[key], checked against the model field's limits. """
+    value = data.get(key)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str) or (required and not value.strip()):
+        raise InvalidRecipe("%r must be a non-empty string" % key)
+    max_length = model._meta.get_field(key).max_length
+    if max_length and len(value) > max_length:
+        raise InvalidRecipe("%r must be at most %d characters" % (key, max_length))
+    return value
+
+
+def entries(data, key):
+    values = data.get(key) or []
+    if not isinstance(values, list):
+        raise InvalidRecipe("%r must be a list" % key)
+    return values
+
+
+def recipe_from_dict(data, authors):
+    """
+    Return unsaved (recipe, ingredients, instructions) from a catalogue entry,
+    looking authors up by username in the authors dict.
+    """
+    if not isinstance(data, dict):
+        raise InvalidRecipe("Each line must be a JSON object")
+    servings = data.get("servings")
+    if not isinstance(servings, int) or servings < 1:
+        raise InvalidRecipe("'servings' must be a positive whole number")
+    recipe = Recipe(
+        name=text(data, Recipe, "name"),
+        description=text(data, Recipe, "description"),
+        servings=servings,
+        nota_bene=text(data, Recipe, "nota_bene", required=False),
+        author_id=authors.get(data.get("author")),
+    )
+
+    ingredients = []
+    for entry in entries(data, "ingredients"):
+        if not isinstance(entry, dict):
+            raise InvalidRecipe("Ingredients must be JSON objects")
+        ingredient = Ingredient(
+            name=text(entry, Ingredient, "name"),
+            amount=text(entry, Ingredient, "amount"),
+            preparation=text(entry, Ingredient, "preparation", required=False),
+        )
+        ingredient.populate_quantity()
+        ingredients.append(ingredient)
+
+    instructions = []
+    step_numbers = set()
+    for number, entry in enumerate(entries(data, "instructions"), 1):
+        if isinstance(entry, str):
+            entry = {"step_number": number, "description": entry}
+        elif not isinstance(entry, dict):
+            raise InvalidRecipe("Instructions must be strings or JSON objects")
+        step_number = entry.get("step_number", number)
+        if not isinstance(step_number, int) or step_number < 1:
+            raise InvalidRecipe("'step_number' must be a positive whole number")
+        if step_number in step_numbers:
+            raise InvalidRecipe("duplicate 'step_number' %d" % step_number)
+        step_numbers.add(step_number)
+        description = text(entry, Instruction, "description")
+        instructions.append(
+            Instruction(step_number=step_number, description=description)
+        )
+    return recipe, ingredients, instructions
+
+
+def author_ids(lines):
+    """ Return a {username: user id} dict for the authors of catalogue entries. """
+    usernames = {data.get("author") for data in lines if isinstance(data, dict)}
+    usernames.discard(None)
+    users = User.objects.filter(username__in=usernames)
+    return dict(users.values_list("username", "id"))
+
+
+def save_recipes(batch):
+    """ Insert (recipe, ingredients, instructions) tuples in a few bulk queries. """
+    recipes = [recipe for recipe, ingredients, instructions in batch]
+    connection = connections[router.db_for_write(Recipe)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+    else:
+        # Without the new ids the children can't point at their recipes
+        with content_hooks_disabled():
+            for recipe in recipes:
+                recipe.save()
+
+    ingredients, instructions = [], []
+    for recipe, recipe_ingredients, recipe_instructions in batch:
+        for child in (*recipe_ingredients, *recipe_instructions):
+            child.recipe = recipe
+        ingredients.extend(recipe_ingredients)
+        instructions.extend(recipe_instructions)
+    Ingredient.objects.bulk_create(ingredients)
+    Instruction.objects.bulk_create(instructions)
+
+
+def import_batch(lines):
+    """ Save (line number, catalogue entry) pairs in one transaction. """
+    authors = author_ids([data for number, data in lines])
+    batch = []
+    for number, data in lines:
+        try:
+            batch.append(recipe_from_dict(data, authors))
+        except InvalidRecipe as e:
+            raise InvalidRecipe("Line %d: %s" % (number, e))
+    with transaction.atomic(using=router.db_for_write(Recipe)):
+        save_recipes(batch)
+    return len(batch)
+
+
+def refresh_derived_data():
+    """ Bring everything derived from recipes up to date after a bulk write. """
+    home.invalidate()
+    fragments.bump_catalogue_version()
+    search.get_index().rebuild()
+    changes.publish_all()
+
+
+# Columns of the CSV export
+CSV_HEADER = (
+    "id",
+    "name",
+    "description",
+    "servings",
+    "nota_bene",
+    "author",
+    "ingredients",
+    "instructions",
+)
+
+
+def iter_recipes(chunk_size=1000):
+    """
+    Yield every recipe with its author, ingredients and instructions loaded,
+    reading a chunk of recipes and their children at a time.
+    """
+    recipes = (
+        Recipe.objects.select_related("author")
+        .prefetch_related(
+            Prefetch("ingredient_set", queryset=Ingredient.objects.order_by("id")),
+            Prefetch(
+                "instruction_set", queryset=Instruction.objects.order_by("step_number")
+            ),
+        )
+        .order_by("id")
+    )
+    last_id = 0
+    while True:
+        # Seek past the previous chunk, so every chunk costs the same
+        chunk = list(recipes.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
+
+def recipe_to_dict(recipe):
+    """ Return a catalogue entry for a recipe with its children loaded. """
+    return {
+        "name": recipe.name,
+        "description": recipe.description,
+        "servings": recipe.servings,
+        "nota_bene": recipe.nota_bene,
+        "author": recipe.author.username if recipe.author else None,
+        "ingredients": [
+            {
+                "name": ingredient.name,
+                "amount": ingredient.amount,
+                "preparation": ingredient.preparation,
+            }
+            for ingredient in recipe.ingredient_set.all()
+        ],
+        "instructions": [
+            {
+                "step_number": instruction.step_number,
+                "description": instruction.description,
+            }
+            for instruction in recipe.instruction_set.all()
+        ],
+    }
+
+
+def ndjson_lines(recipes):
+    for recipe in recipes:
+        yield json.dumps(recipe_to_dict(recipe)) + "\n"
+
+
+class Echo:
+    """ A file-like object that hands back what is written to it. """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(recipes):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for recipe in recipes:
+        ingredients = recipe.ingredient_set.all()
+        instructions = recipe.instruction_set.all()
+        yield writer.writerow(
+            (
+                recipe.id,
+                recipe.name,
+                recipe.description,
+                recipe.servings,
+                recipe.nota_bene or "",
+                recipe.author.username if recipe.author else "",
+                "\n".join(str(ingredient) for ingredient in ingredients),
+                "\n".join(
+                    "%d. %s" % (instruction.step_number, instruction.description)
+                    for instruction in instructions
+                ),
+            )
+        )
+
+
+# Bytes of an export kept in memory before spool_export() writes them to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+def spool_export(lines):
+    """
+    Write every recipe with the lines generator to a temporary file, and return
+    the file at its start.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for line in lines(iter_recipes()):
+        spool.write(line.encode())
+    spool.seek(0)
+    return spool
+
+
+# Export format -> (line generator, content type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson", "jsonl"),
+    "csv": (csv_lines, "text/csv", "csv"),
+}
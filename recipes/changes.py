@@ -0,0 +1,73 @@
+"""
+A feed of changed recipe ids shared between processes through Django's cache.
+
+Each process keeps its own in-memory indexes, but a recipe can be edited through
+any worker. Writers publish the recipe id under a new generation number and readers
+catch up by refreshing just the recipes published since the generation they last
+saw, falling back to a full rebuild when the feed has been evicted or has moved on
+too far.
+"""
+import random
+
+from django.core.cache import cache
+
+GENERATION_KEY = "recipes:changes:generation"
+ENTRY_KEY = "recipes:changes:%d"
+# Entries older than this are rebuilt from scratch rather than replayed
+MAX_REPLAY = 1000
+ENTRY_TIMEOUT = 24 * 60 * 60
+
+
+def start_feed():
+    # Start a new feed at a random point so that generations remembered from an
+    # evicted feed can't be mistaken for ones in this feed
+    cache.add(GENERATION_KEY, random.getrandbits(40) * MAX_REPLAY, timeout=None)
+
+
+def current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Otherwise readers would rebuild on every call until something changes
+        start_feed()
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def publish(recipe_id):
+    """ Record that the recipe changed and return the new generation. """
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        start_feed()
+        generation = cache.incr(GENERATION_KEY)
+    cache.set(ENTRY_KEY % generation, recipe_id, timeout=ENTRY_TIMEOUT)
+    return generation
+
+
+def publish_all():
+    """ Make every process rebuild its indexes from scratch. """
+    # Readers rebuild rather than replay when the feed has moved on this far
+    try:
+        cache.incr(GENERATION_KEY, MAX_REPLAY + 1)
+    except ValueError:
+        # With no feed, readers already rebuild
+        pass
+
+
+def changes_since(generation):
+    """
+    Return (current generation, ids of the recipes changed since generation), where
+    the ids are None if they can't be told and the caller needs to rebuild.
+    """
+    current = current_generation()
+    if current is None or generation is None:
+        return current, None
+    if current == generation:
+        return current, set()
+    if not 0 < current - generation <= MAX_REPLAY:
+        return current, None
+    keys = [ENTRY_KEY % n for n in range(generation + 1, current + 1)]
+    entries = cache.get_many(keys)
+    if len(entries) != len(keys):
+        return current, None
+    return current, set(entries.values())
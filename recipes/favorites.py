@@ -0,0 +1,185 @@
+from collections import Counter
+
+from accounts.models import User
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import m2m_changed
+
+from .fragments import new_version
+from .models import Recipe
+
+# Recipe columns rendered by the recipe cards in the list templates
+CARD_FIELDS = ("name", "description", "author__username")
+
+FAVORITES_VERSION_KEY = "recipes:favorites:version:%d"
+
+
+def favorite_ids(user, recipe_ids):
+    """ Return the set of recipe ids (out of recipe_ids) the user has favorited. """
+    if not user.is_authenticated or not recipe_ids:
+        return set()
+    # Query the favorites through table directly so only the matching ids are loaded
+    favorites = User.favorite_recipes.through.objects.filter(
+        user_id=user.pk, recipe_id__in=recipe_ids
+    )
+    return set(favorites.values_list("recipe_id", flat=True))
+
+
+def favorite_states(user, recipe_ids):
+    """ Return {recipe id: favorited} for those of recipe_ids that exist. """
+    favorites = User.favorite_recipes.through.objects.filter(
+        user_id=user.pk, recipe_id=OuterRef("pk")
+    )
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).order_by()
+    return dict(recipes.values_list("pk", Exists(favorites)))
+
+
+def lock_favorites(user, using):
+    """
+    Lock the user's row until the transaction ends, so their favorites can't
+    change between reading which would change and writing them.
+    """
+    # Two concurrent requests otherwise both count a favorite neither, or only
+    # one, of them wrote
+    users = User.objects.using(using).select_for_update().filter(pk=user.pk)
+    list(users.values_list("pk", flat=True))
+
+
+def write_favorites(user, changed, add, using):
+    """ Add or remove the changed recipe ids with one write to the through table. """
+    through = User.favorite_recipes.through
+    # Send the signals the related manager would, for whoever listens to them
+    signal = dict(
+        sender=through,
+        instance=user,
+        reverse=False,
+        model=Recipe,
+        pk_set=changed,
+        using=using,
+    )
+    m2m_changed.send(action="pre_add" if add else "pre_remove", **signal)
+    if add:
+        through.objects.using(using).bulk_create(
+            [through(user_id=user.pk, recipe_id=pk) for pk in changed],
+            ignore_conflicts=True,
+        )
+    else:
+        favorites = through.objects.using(using).filter(user_id=user.pk)
+        favorites.filter(recipe_id__in=changed).delete()
+    m2m_changed.send(action="post_add" if add else "post_remove", **signal)
+
+
+def change_favorites(user, recipe_ids, add):
+    """
+    Add the recipes to (or remove them from) the user's favorites, ignoring ids
+    of recipes that don't exist. Return the set of ids that changed.
+    """
+    using = router.db_for_write(User.favorite_recipes.through)
+    with transaction.atomic(using=using):
+        lock_favorites(user, using)
+        states = favorite_states(user, recipe_ids)
+        changed = {pk for pk, favorited in states.items() if favorited != add}
+        if changed:
+            write_favorites(user, changed, add, using)
+    return changed
+
+
+def toggle_favorite(user, recipe_id):
+    """ Flip whether the user has favorited the recipe and return the new state. """
+    using = router.db_for_write(User.favorite_recipes.through)
+    with transaction.atomic(using=using):
+        lock_favorites(user, using)
+        states = favorite_states(user, [recipe_id])
+        if recipe_id not in states:
+            raise Recipe.DoesNotExist("No recipe with id %d." % recipe_id)
+        favorited = not states[recipe_id]
+        write_favorites(user, {recipe_id}, favorited, using)
+    return favorited
+
+
+def favorite_pairs(instance, reverse, pk_set):
+    """
+    Return the (user id, recipe id) favorites that exist out of those an
+    m2m_changed signal refers to (all of the instance's when pk_set is None).
+    """
+    favorites = User.favorite_recipes.through.objects.order_by()
+    if reverse:
+        favorites = favorites.filter(recipe_id=instance.pk)
+        if pk_set is not None:
+            favorites = favorites.filter(user_id__in=pk_set)
+    else:
+        favorites = favorites.filter(user_id=instance.pk)
+        if pk_set is not None:
+            favorites = favorites.filter(recipe_id__in=pk_set)
+    return list(favorites.values_list("user_id", "recipe_id"))
+
+
+def adjust_favorite_counts(pairs, sign):
+    """ Add (sign=1) or take away (sign=-1) (user id, recipe id) favorites. """
+    per_recipe = Counter(recipe_id for user_id, recipe_id in pairs)
+    # One update per distinct change, so usually a single query
+    recipes_by_change = {}
+    for recipe_id, count in per_recipe.items():
+        recipes_by_change.setdefault(count, []).append(recipe_id)
+    for count, recipe_ids in recipes_by_change.items():
+        if sign > 0:
+            value = F("favorite_count") + count
+        else:
+            value = Greatest(F("favorite_count") - count, 0)
+        Recipe.objects.filter(pk__in=recipe_ids).update(favorite_count=value)
+
+
+def reconcile_favorite_counts(recipe_ids):
+    """
+    Recount the favorites of the recipes from the through table, correcting
+    any that have drifted. Return the number corrected.
+    """
+    favorites = (
+        User.favorite_recipes.through.objects.filter(recipe_id=OuterRef("pk"))
+        .order_by()
+        .values("recipe_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    actual = Coalesce(Subquery(favorites), 0)
+    recipes = Recipe.objects.filter(pk__in=recipe_ids).order_by()
+    wrong = recipes.annotate(actual=actual).exclude(favorite_count=F("actual"))
+    wrong_ids = list(wrong.values_list("pk", flat=True))
+    if wrong_ids:
+        # Recount in the update itself, in case favorites changed in between
+        Recipe.objects.filter(pk__in=wrong_ids).update(favorite_count=actual)
+    return len(wrong_ids)
+
+
+def favorites_version(user):
+    """ Return a token that changes whenever the user's favorites change. """
+    key = FAVORITES_VERSION_KEY % user.pk
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_favorites_version(user_id):
+    cache.set(FAVORITES_VERSION_KEY % user_id, new_version(), timeout=None)
+
+
+class FavoritesContextMixin:
+    """ Custom mixin that flags which displayed recipes the user has favorited. """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.request.user.is_authenticated:
+            # List views display a page of recipes, detail views a single recipe
+            if "object_list" in context:
+                recipes = context["object_list"]
+            else:
+                recipes = [context["object"]]
+            # Load only the favorited ids that appear on this page into a set
+            context["favorite_ids"] = favorite_ids(
+                self.request.user, [recipe.id for recipe in recipes]
+            )
+        return context
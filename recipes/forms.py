@@ -1,4 +1,7 @@
-from django.forms import ModelForm
+import re
+
+from django import forms
+from django.forms import BaseInlineFormSet, ModelForm, inlineformset_factory
 
 from .models import Ingredient, Instruction, Recipe
 
@@ -38,6 +41,95 @@ class InstructionForm(ModelForm):
             {"class": "textarea", "rows": "10"}
         )
 
+    def clean_step_number(self):
+        step_number = self.cleaned_data["step_number"]
+        # The recipe isn't a form field, so the unique constraint isn't checked
+        if self.instance.recipe_id is not None:
+            steps = Instruction.objects.filter(
+                recipe_id=self.instance.recipe_id, step_number=step_number
+            )
+            if steps.exclude(pk=self.instance.pk).exists():
+                raise forms.ValidationError(
+                    "This recipe already has a step %d." % step_number
+                )
+        return step_number
+
     class Meta:
         model = Instruction
         fields = ["step_number", "description"]
+
+
+class BaseInstructionFormSet(BaseInlineFormSet):
+    def clean(self):
+        # Catch repeated step numbers here rather than one form at a time, before
+        # the formset's own unique check reports them less helpfully
+        seen = set()
+        for form in self.forms:
+            if not form.has_changed() or self._should_delete_form(form):
+                continue
+            step_number = form.cleaned_data.get("step_number")
+            if step_number is None:
+                # Missing or invalid, which the field has already reported
+                continue
+            if step_number in seen:
+                form.add_error(
+                    "step_number", "Step %d is used more than once." % step_number
+                )
+            seen.add(step_number)
+        super().clean()
+
+
+# Blank rows shown on the single page recipe form, enough for most recipes
+IngredientFormSet = inlineformset_factory(
+    Recipe, Ingredient, form=IngredientForm, extra=15, can_delete=False
+)
+InstructionFormSet = inlineformset_factory(
+    Recipe,
+    Instruction,
+    form=InstructionForm,
+    formset=BaseInstructionFormSet,
+    extra=10,
+    can_delete=False,
+)
+
+
+class PantryForm(forms.Form):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["ingredients"].widget.attrs.update(
+            {"class": "textarea", "rows": "4"}
+        )
+        self.fields["required"].widget.attrs.update({"class": "input"})
+        self.fields["max_missing"].widget.attrs.update({"class": "input"})
+
+    ingredients = forms.CharField(
+        max_length=2000,
+        widget=forms.Textarea,
+        help_text="Enter the ingredients you have, separated by commas or new lines",
+    )
+    required = forms.CharField(
+        max_length=500,
+        required=False,
+        label="Must use",
+        help_text="Enter any ingredients the recipe has to use",
+    )
+    max_missing = forms.IntegerField(
+        min_value=0,
+        max_value=10,
+        required=False,
+        label="Missing ingredients allowed",
+        help_text="Enter how many ingredients you're willing to go out and buy",
+    )
+
+    @staticmethod
+    def split(value):
+        return [name.strip() for name in re.split(r"[,\n]", value) if name.strip()]
+
+    def clean_ingredients(self):
+        return self.split(self.cleaned_data["ingredients"])
+
+    def clean_required(self):
+        return self.split(self.cleaned_data["required"])
+
+    def clean_max_missing(self):
+        return self.cleaned_data["max_missing"] or 0
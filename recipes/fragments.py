@@ -0,0 +1,87 @@
+"""
+Rendered HTML fragments of recipes, cached per recipe and shared across users.
+
+Fragments are keyed by a per-recipe version that changes whenever the recipe or
+one of its ingredients or instructions is saved or deleted, so stale fragments are
+never looked up again and simply age out of the cache.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "recipes:version:%d"
+CATALOGUE_VERSION_KEY = "recipes:catalogue:version"
+
+
+def new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def recipe_versions(recipe_ids):
+    """ Return a {recipe id: version} dict, starting versions for new recipes. """
+    keys = {VERSION_KEY % recipe_id: recipe_id for recipe_id in recipe_ids}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    missing = {key: new_version() for key in keys.keys() - found.keys()}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update((keys[key], version) for key, version in missing.items())
+    return versions
+
+
+def catalogue_version():
+    """ Return a token that changes whenever a recipe card could have changed. """
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, new_version(), timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return version
+
+
+def bump_catalogue_version(using=None):
+    """ Change the catalogue version, now and once the transaction commits. """
+    cache.set(CATALOGUE_VERSION_KEY, new_version(), timeout=None)
+    # A page built before the commit mustn't be kept under the new version
+    transaction.on_commit(
+        lambda: cache.set(CATALOGUE_VERSION_KEY, new_version(), timeout=None),
+        using=using,
+    )
+
+
+def bump_version(recipe_id):
+    """ Make the recipe's cached fragments unreachable. """
+    cache.set(VERSION_KEY % recipe_id, new_version(), timeout=None)
+
+
+def bump_versions(recipe_ids, using=None):
+    """ Make the recipes' cached fragments unreachable, now and once committed. """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    def bump():
+        versions = {VERSION_KEY % recipe_id: new_version() for recipe_id in recipe_ids}
+        cache.set_many(versions, timeout=None)
+
+    bump()
+    # A fragment rendered before the commit mustn't be kept under the new versions
+    transaction.on_commit(bump, using=using)
+
+
+class FragmentCacheMixin:
+    """ Custom mixin that sets the fragment cache version on displayed recipes. """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # List views display a page of recipes, detail views a single recipe
+        if "object_list" in context:
+            recipes = context["object_list"]
+        else:
+            recipes = [context["object"]]
+        versions = recipe_versions([recipe.id for recipe in recipes])
+        for recipe in recipes:
+            recipe.cache_version = versions[recipe.id]
+        context["fragment_timeout"] = settings.RECIPE_FRAGMENT_TIMEOUT
+        return context
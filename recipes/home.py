@@ -0,0 +1,66 @@
+"""
+The home page's arrangement of the newest recipes.
+
+The layout only changes when a recipe is created, edited or deleted, so it is
+built once and kept in the cache under a version that those writes replace.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .favorites import CARD_FIELDS
+from .fragments import new_version
+from .models import Recipe
+
+NEWEST_COUNT = 10
+VERSION_KEY = "recipes:home:version"
+LAYOUT_KEY = "recipes:home:layout:%s"
+
+
+def arrange(recipes):
+    """ Order recipes the way the home page grid expects to lay them out. """
+    # Use variable for last index in case there are less than 10 recipes
+    max_index = len(recipes) - 1
+
+    if recipes and max_index >= 5:
+        # Sort the recipes by description length
+        recipes.sort(key=lambda r: len(r.description))
+        # The template expects the longest description to be loaded 5th
+        recipes[max_index], recipes[4] = recipes[4], recipes[max_index]
+        # Ignore the longest description recipe
+        temp = recipes[:4] + recipes[5:]
+        # Get the recipe with the longest title and where it occurs in the list
+        longest_title = max(temp, key=lambda r: len(r.name))
+        index = recipes.index(longest_title)
+        # The template expects the longest title to be loaded 3rd
+        recipes[index], recipes[2] = recipes[2], recipes[index]
+    return recipes
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Another process may have started a version first, in which case use theirs
+        cache.add(VERSION_KEY, new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def newest_layout():
+    """ Return (version, time built, newest recipes arranged for the home page). """
+    # Read the version before the database, so a layout built from rows that
+    # change meanwhile is stored under a version that is already out of date
+    version = current_version()
+    layout = cache.get(LAYOUT_KEY % version)
+    if layout is None:
+        recipes = Recipe.objects.select_related("author").only(*CARD_FIELDS)
+        recipes = arrange(list(recipes.order_by("-pk")[:NEWEST_COUNT]))
+        layout = (version, timezone.now(), recipes)
+        # Layouts left behind by later versions age out of the cache
+        cache.set(LAYOUT_KEY % version, layout, settings.RECIPE_FRAGMENT_TIMEOUT)
+    return layout
+
+
+def invalidate():
+    """ Make the next request build the layout again. """
+    cache.set(VERSION_KEY, new_version(), timeout=None)
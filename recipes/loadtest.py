@@ -0,0 +1,103 @@
+"""
+Load tests of a running deployment, to compare servers and worker classes.
+
+Each simulated client keeps one HTTP/1.1 connection open and sends its requests
+one after another, as a browser would, so the concurrency is the number of
+requests the server has in flight at once. Only the standard library is used, so
+it can be pointed at any server, including one started elsewhere.
+"""
+import http.client
+import itertools
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+class Client:
+    """ A keep-alive connection to the server, reopened after errors. """
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.connection_class = (
+            http.client.HTTPSConnection
+            if parts.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.connection = None
+
+    def get(self, path):
+        """ GET path and return the response status, or None if it failed. """
+        if self.connection is None:
+            self.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        try:
+            self.connection.request("GET", self.prefix + path)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return None
+        if response.will_close:
+            self.close()
+        return response.status
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def load_test(url, paths, concurrency, requests, timeout=30):
+    """
+    Send requests GETs of paths, taken in turn, from concurrency clients, and
+    return the throughput and latency percentiles. Requests that fail or get an
+    error status are counted as errors, and left out of the latencies.
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    timings, errors = [], []
+
+    def client():
+        session = Client(url, timeout)
+        try:
+            while True:
+                number = next(counter)
+                if number >= requests:
+                    return
+                start = time.perf_counter()
+                status = session.get(paths[number % len(paths)])
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if status is None or status >= 500:
+                        errors.append(status)
+                    else:
+                        timings.append(elapsed)
+        finally:
+            session.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(client) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+
+    if len(timings) > 1:
+        # Inclusive, so no percentile is put above the slowest request
+        quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+    else:
+        p50 = p95 = p99 = timings[0] if timings else 0.0
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "rps": round(len(timings) / elapsed, 1),
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+        "max_ms": round(max(timings, default=0.0) * 1000, 2),
+    }
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings, setup_databases
+
+from recipes import benchmark
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every named route in-process against a synthetic catalogue, "
+        "writing p50/p95/p99 latency, queries per request and peak memory to "
+        "JSON, and flag regressions against a saved baseline. Catalogues are "
+        "seeded into their own database, which is kept for the next run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            choices=list(benchmark.SIZES),
+            default="1k",
+            help="Number of recipes in the synthetic catalogue.",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=1, help="Seed the catalogue is built from."
+        )
+        parser.add_argument(
+            "--runs", type=int, default=50, help="Timed requests per route."
+        )
+        parser.add_argument(
+            "--output", help="JSON file to write. Defaults to bench-<size>.json."
+        )
+        parser.add_argument("--baseline", help="Earlier results to compare with.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Fraction latency or memory may grow before it is a regression.",
+        )
+        parser.add_argument(
+            "--fresh",
+            action="store_true",
+            help="Seed the catalogue again, even if its database already exists.",
+        )
+
+    def handle(self, *args, **options):
+        size = benchmark.SIZES[options["size"]]
+        name = "bench_%s_%d" % (options["size"], options["seed"])
+        directory = settings.BASE_DIR / "bench"
+        os.makedirs(directory, exist_ok=True)
+        if options["baseline"]:
+            try:
+                with open(options["baseline"]) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError("Can't read the baseline: %s" % e)
+
+        # Keep the catalogue in its own database, created like a test database
+        connection = connections["default"]
+        if connection.vendor == "sqlite":
+            connection.settings_dict["TEST"]["NAME"] = str(directory / (name + ".db"))
+        else:
+            connection.settings_dict["TEST"]["NAME"] = name
+        self.stdout.write("Setting up the %s database..." % name)
+        setup_databases(0, interactive=False, keepdb=not options["fresh"])
+
+        with override_settings(
+            # Served like a deployment rather than a development server
+            DEBUG=False,
+            ALLOWED_HOSTS=["testserver"],
+            EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+            SEARCH_INDEX_DIR=directory / (name + "_search"),
+            # The benchmark doesn't depend on collectstatic having been run
+            STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+        ):
+            self.seed(size, options["seed"])
+            missing = benchmark.named_routes() - {
+                route.name for route in benchmark.routes()
+            }
+            for route_name in sorted(missing):
+                self.stderr.write("No benchmark for the %s route." % route_name)
+            self.stdout.write(
+                f"{'route':<24}{'status':>7}{'p50 ms':>9}{'p95 ms':>9}"
+                f"{'p99 ms':>9}{'queries':>9}{'peak KB':>10}"
+            )
+            # Timings are reported per route, rather than logged per request
+            timing_logger = logging.getLogger("cookery_bookery.timing")
+            level = timing_logger.level
+            timing_logger.setLevel(logging.WARNING)
+            try:
+                results = benchmark.run(options["runs"], progress=self.report)
+            finally:
+                timing_logger.setLevel(level)
+
+        output = options["output"] or "bench-%s.json" % options["size"]
+        with open(output, "w") as f:
+            json.dump(
+                {
+                    "size": options["size"],
+                    "seed": options["seed"],
+                    "runs": options["runs"],
+                    "routes": results,
+                },
+                f,
+                indent=2,
+            )
+        self.stdout.write(self.style.SUCCESS("Wrote %s." % output))
+
+        if options["baseline"]:
+            regressions = benchmark.compare(
+                results, baseline["routes"], options["threshold"]
+            )
+            for route_name, metric, before, after in regressions:
+                self.stderr.write(
+                    f"{route_name}: {metric} went from {before} to {after}",
+                    style_func=self.style.ERROR,
+                )
+            if regressions:
+                raise CommandError(
+                    "%d regressions against %s."
+                    % (len(regressions), options["baseline"])
+                )
+            self.stdout.write(
+                self.style.SUCCESS("No regressions against %s." % options["baseline"])
+            )
+
+    def seed(self, size, seed):
+        count = Recipe.objects.count()
+        if count == size:
+            return
+        if count:
+            raise CommandError(
+                "The benchmark database has %d recipes rather than %d. Run again "
+                "with --fresh to seed it from scratch." % (count, size)
+            )
+        start = time.monotonic()
+
+        def progress(done):
+            rate = done / max(time.monotonic() - start, 1e-6)
+            self.stdout.write(f"Seeded {done} recipes ({rate:.0f} per second).")
+
+        benchmark.seed_catalogue(size, seed, progress=progress)
+        elapsed = time.monotonic() - start
+        self.stdout.write(f"Seeded {size} recipes in {elapsed:.1f} seconds.")
+
+    def report(self, route_name, result):
+        self.stdout.write(
+            f"{route_name:<24}{result['status']:>7}{result['p50_ms']:>9.2f}"
+            f"{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+            f"{result['queries'] if result['queries'] is not None else '-':>9}"
+            f"{result['peak_kb']:>10.1f}"
+        )
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipes import search
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the full-text recipe search index, merging in the changes made "
+        "since it was last built. Run it periodically, or keep it running with "
+        "--every, to keep the delta each process reads small."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-delta",
+            type=int,
+            default=0,
+            help="Only rebuild once at least this many recipes have changed.",
+        )
+        parser.add_argument(
+            "--every",
+            type=int,
+            metavar="SECONDS",
+            help="Keep running, checking whether to rebuild this often.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            self.build(options["min_delta"])
+            if not options["every"]:
+                return
+            # Don't hold a connection while waiting
+            connections.close_all()
+            time.sleep(options["every"])
+
+    def build(self, min_delta):
+        index = search.get_index()
+        pending = index.delta_size()
+        # None when the index hasn't been built, or the changes can't be counted
+        if pending is not None and pending < min_delta:
+            self.stdout.write(f"Only {pending} recipes changed, skipping rebuild.")
+            return
+
+        start = time.monotonic()
+        count = index.rebuild()
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(f"Indexed {count} recipes in {elapsed:.1f} seconds.")
+        )
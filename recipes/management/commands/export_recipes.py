@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes import catalogue
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every recipe, with its ingredients and instructions, as JSON lines "
+        "(which import_recipes reads back) or CSV. Recipes are read a chunk at a "
+        "time, so memory use stays flat however many there are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            choices=sorted(catalogue.EXPORT_FORMATS),
+            default="ndjson",
+            help="Output format.",
+        )
+        parser.add_argument(
+            "--output", help="File to write to. Defaults to standard output."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of recipes loaded at a time.",
+        )
+
+    def handle(self, *args, **options):
+        lines, content_type, extension = catalogue.EXPORT_FORMATS[options["format"]]
+        start = time.monotonic()
+        count = 0
+
+        def counted(recipes):
+            nonlocal count
+            for count, recipe in enumerate(recipes, 1):
+                yield recipe
+
+        recipes = counted(catalogue.iter_recipes(options["chunk_size"]))
+        if options["output"]:
+            with open(options["output"], "w", newline="") as f:
+                f.writelines(lines(recipes))
+        else:
+            for line in lines(recipes):
+                self.stdout.write(line, ending="")
+
+        elapsed = time.monotonic() - start
+        # Report on stderr so that it doesn't end up in an export to stdout
+        self.stderr.write(
+            f"Exported {count} recipes in {elapsed:.1f} seconds.",
+            style_func=self.style.SUCCESS,
+        )
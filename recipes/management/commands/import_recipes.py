@@ -0,0 +1,107 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import catalogue
+
+
+class Command(BaseCommand):
+    help = (
+        "Import recipes, with their ingredients and instructions, from a JSON lines "
+        "file. Each batch is committed on its own and recorded in a checkpoint "
+        "file, so an interrupted import carries on where it stopped when run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="JSON lines file, one recipe per line.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of recipes written per transaction.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore any checkpoint and import the file from the start.",
+        )
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"offset": 0, "line": 0, "imported": 0}
+
+    def write_checkpoint(self, path, checkpoint):
+        # Swap the new checkpoint in so that a crash never leaves half of one
+        with open(path + ".tmp", "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(path + ".tmp", path)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        checkpoint_path = path + ".checkpoint"
+        if options["restart"] and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        checkpoint = self.read_checkpoint(checkpoint_path)
+        if checkpoint["line"]:
+            self.stdout.write(
+                f"Resuming after line {checkpoint['line']} "
+                f"({checkpoint['imported']} recipes already imported)."
+            )
+
+        start = time.monotonic()
+        imported = 0
+        try:
+            f = open(path, "rb")
+        except OSError as e:
+            raise CommandError(e)
+        with f:
+            f.seek(checkpoint["offset"])
+            number = checkpoint["line"]
+            while True:
+                # Read the file a batch at a time so memory use stays flat
+                lines = []
+                while len(lines) < options["batch_size"]:
+                    line = f.readline()
+                    if not line:
+                        break
+                    number += 1
+                    if not line.strip():
+                        continue
+                    try:
+                        lines.append((number, json.loads(line)))
+                    except ValueError as e:
+                        raise CommandError(f"Line {number} is not valid JSON: {e}")
+                if not lines:
+                    break
+
+                try:
+                    imported += catalogue.import_batch(lines)
+                except catalogue.InvalidRecipe as e:
+                    raise CommandError(e)
+                checkpoint = {
+                    "offset": f.tell(),
+                    "line": number,
+                    "imported": checkpoint["imported"] + len(lines),
+                }
+                self.write_checkpoint(checkpoint_path, checkpoint)
+                rate = imported / max(time.monotonic() - start, 1e-6)
+                self.stdout.write(
+                    f"Imported {checkpoint['imported']} recipes "
+                    f"({rate:.0f} per second)."
+                )
+
+        self.stdout.write("Updating the search index...")
+        catalogue.refresh_derived_data()
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {checkpoint['imported']} recipes in {elapsed:.1f} seconds."
+            )
+        )
@@ -0,0 +1,96 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test running deployments with many concurrent clients, writing the "
+        "throughput and p50/p95/p99 latency at each concurrency to JSON. To "
+        "compare the WSGI and ASGI deployments, start both against the same "
+        "database, for example with "
+        "'gunicorn cookery_bookery.wsgi -b 127.0.0.1:8000' and "
+        "'gunicorn cookery_bookery.asgi -b 127.0.0.1:8001 "
+        "-k uvicorn.workers.UvicornWorker', then run "
+        "'manage.py loadtest --url wsgi=http://127.0.0.1:8000 "
+        "--url asgi=http://127.0.0.1:8001'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            action="append",
+            metavar="NAME=URL",
+            help="Deployment to load test. Repeat it to compare several.",
+        )
+        parser.add_argument(
+            "--path",
+            action="append",
+            help=(
+                "Path to request, taken in turn with the others. Defaults to the "
+                "home page, the recipe list and the first recipe."
+            ),
+        )
+        parser.add_argument(
+            "--concurrency",
+            default="1,10,50",
+            help="Comma-separated numbers of concurrent clients to try.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Requests at each concurrency.",
+        )
+        parser.add_argument(
+            "--output", default="loadtest.json", help="JSON file to write."
+        )
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["url"] or ["wsgi=http://127.0.0.1:8000"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url.startswith(("http://", "https://")):
+                raise CommandError("Give each --url as NAME=http://host:port.")
+            targets.append((name, url))
+        paths = options["path"] or ["/recipes/", "/recipes/all/", "/recipes/1"]
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency takes numbers separated by commas.")
+        if min(levels) < 1 or options["requests"] < 1:
+            raise CommandError("Concurrency and requests must be at least 1.")
+
+        self.stdout.write(
+            f"{'server':<12}{'clients':>8}{'req/s':>9}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}"
+        )
+        results = {}
+        for name, url in targets:
+            results[name] = []
+            for concurrency in levels:
+                result = loadtest.load_test(
+                    url, paths, concurrency, options["requests"]
+                )
+                results[name].append(result)
+                self.stdout.write(
+                    f"{name:<12}{concurrency:>8}{result['rps']:>9.1f}"
+                    f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                    f"{result['p99_ms']:>9.2f}{result['max_ms']:>9.2f}"
+                    f"{result['errors']:>8}"
+                )
+
+        with open(options["output"], "w") as f:
+            json.dump(
+                {
+                    "paths": paths,
+                    "requests": options["requests"],
+                    "servers": {name: url for name, url in targets},
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        self.stdout.write(self.style.SUCCESS("Wrote %s." % options["output"]))
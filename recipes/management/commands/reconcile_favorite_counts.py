@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+
+from recipes.favorites import reconcile_favorite_counts
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount every recipe's favorites from the favorites table and correct "
+        "the stored counts that have drifted. Recipes are checked a batch at a "
+        "time, each in its own short transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of recipes checked per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        recipes = Recipe.objects.order_by("id").values_list("id", flat=True)
+        checked = corrected = 0
+        last_id = 0
+        while True:
+            # Seek past the previous batch, so every batch costs the same
+            recipe_ids = list(recipes.filter(id__gt=last_id)[: options["batch_size"]])
+            if not recipe_ids:
+                break
+            with transaction.atomic(using=router.db_for_write(Recipe)):
+                corrected += reconcile_favorite_counts(recipe_ids)
+            checked += len(recipe_ids)
+            last_id = recipe_ids[-1]
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} recipes and corrected {corrected} "
+                f"in {elapsed:.1f} seconds."
+            )
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.7 on 2026-10-18 11:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_auto_20210312_1906'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='recipe',
+            options={'ordering': ['name', 'id']},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.7 on 2026-10-18 11:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_auto_20261018_0710'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='instruction',
+            options={'ordering': ['recipe_id', 'step_number']},
+        ),
+    ]
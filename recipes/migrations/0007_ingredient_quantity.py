@@ -0,0 +1,118 @@
+# Generated by Django 3.1.7 on 2026-10-18 12:40
+
+import re
+from fractions import Fraction
+
+from django.db import migrations, models
+
+# A copy of recipes.quantities.parse_amount as it was when this migration was
+# written, so later changes to the parser don't change what the migration does
+
+VULGAR_FRACTIONS = {
+    "½": Fraction(1, 2),
+    "⅓": Fraction(1, 3),
+    "⅔": Fraction(2, 3),
+    "¼": Fraction(1, 4),
+    "¾": Fraction(3, 4),
+    "⅕": Fraction(1, 5),
+    "⅖": Fraction(2, 5),
+    "⅗": Fraction(3, 5),
+    "⅘": Fraction(4, 5),
+    "⅙": Fraction(1, 6),
+    "⅚": Fraction(5, 6),
+    "⅛": Fraction(1, 8),
+    "⅜": Fraction(3, 8),
+    "⅝": Fraction(5, 8),
+    "⅞": Fraction(7, 8),
+}
+VULGAR = "[%s]" % "".join(VULGAR_FRACTIONS)
+NUMBER = r"""
+    (?P<{0}_whole>\d+(?![\d.]|\s*/))?(?:-(?=\d+\s*/|{1})|\s*)(?:
+        (?P<{0}_numerator>\d+)\s*/\s*(?P<{0}_denominator>\d+)
+        | (?P<{0}_vulgar>{1})
+        | (?P<{0}_decimal>\d*\.\d+)
+    )?
+"""
+AMOUNT_RE = re.compile(
+    r"""
+    ^\s*{low}
+    (?:\s*(?:-|–|to\b)\s*(?=\d|\.\d|{vulgar}){high})?
+    \s*(?P<unit>.*?)\s*$
+    """.format(
+        low=NUMBER.format("low", VULGAR),
+        high=NUMBER.format("high", VULGAR),
+        vulgar=VULGAR,
+    ),
+    re.VERBOSE | re.IGNORECASE,
+)
+
+
+def match_number(match, prefix):
+    whole, numerator, denominator, vulgar, decimal = (
+        match.group("%s_%s" % (prefix, part))
+        for part in ("whole", "numerator", "denominator", "vulgar", "decimal")
+    )
+    if whole is None and numerator is None and vulgar is None and decimal is None:
+        return None
+    value = Fraction(int(whole or 0))
+    if numerator is not None:
+        if int(denominator) == 0:
+            return None
+        value += Fraction(int(numerator), int(denominator))
+    elif vulgar is not None:
+        value += VULGAR_FRACTIONS[vulgar]
+    elif decimal is not None:
+        if whole is not None:
+            return None
+        value = Fraction(decimal)
+    return value
+
+
+def parse_amount(text):
+    match = AMOUNT_RE.match(text)
+    quantity = match_number(match, "low")
+    if quantity is None:
+        return None
+    quantity_max = match_number(match, "high")
+    if quantity_max is not None and quantity_max <= quantity:
+        quantity_max = None
+    return quantity, quantity_max, match.group("unit")
+
+
+def populate_quantities(apps, schema_editor):
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    ingredients = Ingredient.objects.only("amount")
+    for ingredient in ingredients.iterator():
+        amount = parse_amount(ingredient.amount)
+        if amount is not None:
+            quantity, quantity_max, ingredient.unit = amount
+            ingredient.quantity = float(quantity)
+            if quantity_max is not None:
+                ingredient.quantity_max = float(quantity_max)
+            ingredient.save(update_fields=["quantity", "quantity_max", "unit"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='quantity',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='quantity_max',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='unit',
+            field=models.CharField(blank=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(populate_quantities, migrations.RunPython.noop),
+    ]
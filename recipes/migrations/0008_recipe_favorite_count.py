@@ -0,0 +1,39 @@
+# Generated by Django 3.1.7 on 2026-10-18 13:15
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_favorites(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    User = apps.get_model("accounts", "User")
+    favorites = (
+        User.favorite_recipes.through.objects.filter(recipe_id=OuterRef("pk"))
+        .order_by()
+        .values("recipe_id")
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    Recipe.objects.update(favorite_count=Coalesce(Subquery(favorites), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_auto_20210227_1426'),
+        ('recipes', '0007_ingredient_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorite_count', 'id'], name='recipe_favorites_idx'),
+        ),
+        migrations.RunPython(count_favorites, migrations.RunPython.noop),
+    ]
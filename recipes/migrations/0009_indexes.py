@@ -0,0 +1,43 @@
+# Generated by Django 3.1.7 on 2026-10-18 13:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def renumber_repeated_steps(apps, schema_editor):
+    # Number the steps of recipes that repeat a step number 1, 2, 3... in order
+    Instruction = apps.get_model("recipes", "Instruction")
+    repeated = (
+        Instruction.objects.values("recipe_id", "step_number")
+        .annotate(count=Count("id"))
+        .filter(count__gt=1)
+        .values_list("recipe_id", flat=True)
+    )
+    for recipe_id in set(repeated):
+        steps = Instruction.objects.filter(recipe_id=recipe_id)
+        for number, step in enumerate(steps.order_by("step_number", "id"), 1):
+            step.step_number = number
+            step.save(update_fields=["step_number"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_favorite_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['name', 'id'], name='recipe_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', 'name', 'id'], name='recipe_author_name_idx'),
+        ),
+        migrations.RunPython(renumber_repeated_steps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='instruction',
+            constraint=models.UniqueConstraint(fields=('recipe', 'step_number'), name='instruction_unique_step'),
+        ),
+    ]
@@ -3,6 +3,8 @@ from django.core.validators import MinValueValidator
 from django.db import models
 from django.urls import reverse
 
+from .quantities import format_amount, parse_amount
+
 
 class Recipe(models.Model):
     """Model representing a complete recipe."""
@@ -30,9 +32,22 @@ class Recipe(models.Model):
     author = models.ForeignKey(
         "accounts.User", on_delete=models.SET_NULL, null=True, blank=True
     )
+    # Also advanced when the recipe's ingredients or instructions change
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Number of users who have favorited the recipe, kept up to date by signals
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
-        ordering = ["name"]
+        # Order by id as well so that pages of recipes with the same name are stable
+        ordering = ["name", "id"]
+        indexes = [
+            # Serves the list of all recipes, a page at a time in name order
+            models.Index(fields=["name", "id"], name="recipe_name_idx"),
+            # Serves each user's own recipes in name order
+            models.Index(fields=["author", "name", "id"], name="recipe_author_name_idx"),
+            # Serves the most favorited recipes list, best first
+            models.Index(fields=["-favorite_count", "id"], name="recipe_favorites_idx"),
+        ]
 
     def get_absolute_url(self):
         return reverse("recipe-detail", args=[str(self.id)])
@@ -61,10 +76,40 @@ class Ingredient(models.Model):
         null=True,
         blank=True,
     )
+    # The amount parsed into numbers and a unit, or null quantities if it can't be
+    quantity = models.FloatField(null=True, blank=True, editable=False)
+    quantity_max = models.FloatField(null=True, blank=True, editable=False)
+    unit = models.CharField(max_length=20, blank=True, editable=False)
+
+    def populate_quantity(self):
+        """ Set the structured quantity columns from the amount. """
+        amount = parse_amount(self.amount)
+        if amount is None:
+            self.quantity = self.quantity_max = None
+            self.unit = ""
+        else:
+            self.quantity = float(amount.quantity)
+            self.quantity_max = amount.quantity_max and float(amount.quantity_max)
+            self.unit = amount.unit
+
+    def save(self, *args, **kwargs):
+        self.populate_quantity()
+        super().save(*args, **kwargs)
+
+    def scaled_amount(self, factor):
+        """ Return the amount multiplied by factor, or as written if it can't be. """
+        if factor == 1 or self.quantity is None:
+            return self.amount
+        quantity_max = self.quantity_max and self.quantity_max * factor
+        return format_amount(self.quantity * factor, quantity_max, self.unit)
+
+    def scaled(self, factor):
+        """ Return the ingredient as a string with its amount scaled by factor. """
+        prep = ", " + self.preparation if self.preparation else ""
+        return "{0} {1}{2}".format(self.scaled_amount(factor), self.name, prep)
 
     def __str__(self):
-        prep = ", " + self.preparation if self.preparation else ""
-        return "{0} {1}{2}".format(self.amount, self.name, prep)
+        return self.scaled(1)
 
 
 class Instruction(models.Model):
@@ -89,7 +134,14 @@ class Instruction(models.Model):
     )
 
     class Meta:
-        ordering = ["recipe", "step_number"]
+        # Order on the recipe_id column itself so no join to Recipe is needed
+        ordering = ["recipe_id", "step_number"]
+        constraints = [
+            # Also the index instructions are looked up and ordered by
+            models.UniqueConstraint(
+                fields=["recipe", "step_number"], name="instruction_unique_step"
+            )
+        ]
 
     def __str__(self):
         return "{0}: Step {1}".format(self.recipe.name, self.step_number)
@@ -0,0 +1,215 @@
+from django.core import signing
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.http import Http404
+from django.utils.translation import gettext as _
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPage:
+    """ A single page of results from a KeysetPaginator. """
+
+    def __init__(self, object_list, number, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return "<Keyset page %s>" % self.number
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by seeking past the last row of the previous page on the
+    queryset's ordering (e.g. the (name, id) ordering of Recipe.Meta), instead of
+    counting rows and using OFFSET. Every page costs the same single query.
+    """
+
+    is_keyset = True
+    salt = "recipes.pagination"
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(
+            ordering or object_list.query.order_by or object_list.model._meta.ordering
+        )
+
+    def encode_cursor(self, obj, direction, number):
+        """ Return an opaque token pointing before/after obj on the given page. """
+        names = [field.lstrip("-") for field in self.ordering]
+        # Rows may be model instances or dicts from values()
+        if isinstance(obj, dict):
+            key = [obj[name] for name in names]
+        else:
+            key = [getattr(obj, name) for name in names]
+        return signing.dumps([direction, number, key], salt=self.salt)
+
+    def decode_cursor(self, cursor):
+        try:
+            direction, number, key = signing.loads(cursor, salt=self.salt)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidCursor(_("That page cursor is not valid"))
+        if direction not in ("next", "previous") or len(key) != len(self.ordering):
+            raise InvalidCursor(_("That page cursor is not valid"))
+        return direction, number, key
+
+    def seek(self, key, forward):
+        """ Return a filter selecting the rows after (or before) key in ordering. """
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            # Descending fields flip the comparison
+            ascending = (field[0] != "-") == forward
+            lookup = "%s__%s" % (name, "gt" if ascending else "lt")
+            equal = {
+                f.lstrip("-"): value for f, value in zip(self.ordering, key[:index])
+            }
+            condition |= Q(**equal, **{lookup: key[index]})
+        return condition
+
+    def reversed_ordering(self):
+        return [
+            field[1:] if field[0] == "-" else "-" + field for field in self.ordering
+        ]
+
+    def page(self, cursor=None):
+        """ Return the KeysetPage the cursor points at (the first page when None). """
+        queryset = self.object_list
+        if not cursor:
+            direction, number = "next", 1
+            rows = list(queryset.order_by(*self.ordering)[: self.per_page + 1])
+        else:
+            direction, number, key = self.decode_cursor(cursor)
+            forward = direction == "next"
+            ordering = self.ordering if forward else self.reversed_ordering()
+            queryset = queryset.filter(self.seek(key, forward)).order_by(*ordering)
+            rows = list(queryset[: self.per_page + 1])
+
+        # The extra row only tells us whether there is anything further along
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if direction == "next":
+            has_next, has_previous = more, number > 1
+        else:
+            rows.reverse()
+            has_next, has_previous = True, more
+            if not more:
+                number = 1
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], "next", number + 1)
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], "previous", number - 1)
+        return KeysetPage(rows, number, self, next_cursor, previous_cursor)
+
+
+class PageNavMixin:
+    """ Custom mixin used by paginated list views to build a windowed page nav. """
+
+    cursor_kwarg = "cursor"
+    # Number of page links shown either side of the current page
+    page_window = 2
+
+    def get_page_url(self, **params):
+        query = self.request.GET.copy()
+        for key in (self.page_kwarg, self.cursor_kwarg):
+            query.pop(key, None)
+        # A page that came back empty has no cursor to link on from
+        query.update({key: value for key, value in params.items() if value is not None})
+        return "%s?%s" % (self.request.path, query.urlencode())
+
+    def get_page_nav(self, page):
+        """ Return the previous/next links and a window of page links around page. """
+        if getattr(page.paginator, "is_keyset", False):
+            cursors = {
+                page.number - 1: page.previous_cursor,
+                page.number + 1: page.next_cursor,
+            }
+            numbers = [1, page.number - 1, page.number, page.number + 1]
+            last = page.number + 1 if page.has_next() else page.number
+
+            def url(number):
+                if number == page.number:
+                    return self.request.get_full_path()
+                if number == 1:
+                    return self.get_page_url()
+                return self.get_page_url(**{self.cursor_kwarg: cursors[number]})
+
+        else:
+            last = page.paginator.num_pages
+            window = range(
+                page.number - self.page_window, page.number + self.page_window + 1
+            )
+            numbers = [1, *window, last]
+
+            def url(number):
+                return self.get_page_url(**{self.page_kwarg: number})
+
+        links = []
+        for number in sorted({n for n in numbers if 1 <= n <= last}):
+            if links and number - links[-1]["number"] > 1:
+                links.append({"ellipsis": True, "number": number - 1})
+            links.append(
+                {"number": number, "url": url(number), "current": number == page.number}
+            )
+        return {
+            "previous": url(page.number - 1) if page.has_previous() else None,
+            "next": url(page.number + 1) if page.has_next() else None,
+            "links": links,
+        }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if context.get("is_paginated"):
+            context["page_nav"] = self.get_page_nav(context["page_obj"])
+        return context
+
+
+class KeysetPaginationMixin(PageNavMixin):
+    """
+    Custom mixin used by list views to paginate with opaque ?cursor= tokens.
+
+    Old ?page=N links are still served by Django's paginator.
+    """
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.page_kwarg in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(_("Invalid page: %(message)s") % {"message": str(e)})
+        return (paginator, page, page.object_list, page.has_other_pages())
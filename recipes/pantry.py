@@ -0,0 +1,246 @@
+"""
+"What can I cook?" matching of a user's pantry against recipe ingredients.
+
+Each process keeps an in-memory posting index from normalized ingredient name to
+the recipes that use it, stored as compressed bitmaps, so a query is a handful of
+bitmap unions and intersections rather than SQL joins.
+"""
+import threading
+from collections import Counter, defaultdict
+
+from . import changes
+from .models import Ingredient
+from .text import normalize_ingredient
+
+# Containers holding more members than this are stored as bitsets
+ARRAY_LIMIT = 4096
+
+
+def container_or(a, b):
+    if isinstance(a, int) or isinstance(b, int):
+        return as_bits(a) | as_bits(b)
+    return a | b
+
+
+def container_and(a, b):
+    if isinstance(a, int) and isinstance(b, int):
+        return a & b
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        return {low for low in a if b >> low & 1}
+    return a & b
+
+
+def as_bits(container):
+    if isinstance(container, int):
+        return container
+    bits = 0
+    for low in container:
+        bits |= 1 << low
+    return bits
+
+
+def container_members(container):
+    if not isinstance(container, int):
+        return sorted(container)
+    members = []
+    while container:
+        # Peel off the lowest set bit
+        lowest = container & -container
+        members.append(lowest.bit_length() - 1)
+        container ^= lowest
+    return members
+
+
+def compact(container):
+    """ Store the container as a set or a bitset, whichever is smaller. """
+    if isinstance(container, int):
+        count = bin(container).count("1")
+        if count <= ARRAY_LIMIT:
+            return set(container_members(container))
+    elif len(container) > ARRAY_LIMIT:
+        return as_bits(container)
+    return container
+
+
+class Bitmap:
+    """
+    A compressed bitmap of recipe ids, split like a roaring bitmap into 64K-wide
+    chunks that are stored as small sets when sparse and as bitsets when dense.
+    """
+
+    def __init__(self, values=()):
+        self.chunks = {}
+        for value in values:
+            self.add(value)
+
+    def add(self, value):
+        high, low = divmod(value, 1 << 16)
+        chunk = self.chunks.setdefault(high, set())
+        if isinstance(chunk, int):
+            self.chunks[high] = chunk | 1 << low
+        else:
+            chunk.add(low)
+            if len(chunk) > ARRAY_LIMIT:
+                self.chunks[high] = as_bits(chunk)
+
+    def discard(self, value):
+        high, low = divmod(value, 1 << 16)
+        chunk = self.chunks.get(high)
+        if chunk is None:
+            return
+        if isinstance(chunk, int):
+            chunk &= ~(1 << low)
+        else:
+            chunk.discard(low)
+        chunk = compact(chunk)
+        if chunk:
+            self.chunks[high] = chunk
+        else:
+            del self.chunks[high]
+
+    def __contains__(self, value):
+        high, low = divmod(value, 1 << 16)
+        chunk = self.chunks.get(high)
+        if isinstance(chunk, int):
+            return bool(chunk >> low & 1)
+        return chunk is not None and low in chunk
+
+    def __and__(self, other):
+        result = Bitmap()
+        for high in self.chunks.keys() & other.chunks.keys():
+            chunk = compact(container_and(self.chunks[high], other.chunks[high]))
+            if chunk:
+                result.chunks[high] = chunk
+        return result
+
+    def __or__(self, other):
+        result = Bitmap()
+        for high in self.chunks.keys() | other.chunks.keys():
+            a, b = self.chunks.get(high), other.chunks.get(high)
+            if a is not None and b is not None:
+                result.chunks[high] = compact(container_or(a, b))
+            else:
+                # Copy sets so that the result doesn't share them with its inputs
+                chunk = b if a is None else a
+                result.chunks[high] = chunk if isinstance(chunk, int) else set(chunk)
+        return result
+
+    def __iter__(self):
+        for high in sorted(self.chunks):
+            for low in container_members(self.chunks[high]):
+                yield (high << 16) + low
+
+    def __len__(self):
+        return sum(
+            bin(chunk).count("1") if isinstance(chunk, int) else len(chunk)
+            for chunk in self.chunks.values()
+        )
+
+    def __bool__(self):
+        return bool(self.chunks)
+
+
+class PantryIndex:
+    """ Maps normalized ingredient names to bitmaps of the recipes using them. """
+
+    def __init__(self):
+        self.postings = defaultdict(Bitmap)
+        # Recipe id -> set of the recipe's normalized ingredient names
+        self.recipes = {}
+        self.generation = None
+
+    def set_recipe(self, recipe_id, names):
+        """ Replace the recipe's ingredients in the index (deleting it if empty). """
+        for name in self.recipes.pop(recipe_id, ()):
+            self.postings[name].discard(recipe_id)
+            if not self.postings[name]:
+                del self.postings[name]
+        if names:
+            self.recipes[recipe_id] = names
+            for name in names:
+                self.postings[name].add(recipe_id)
+
+    def load(self, recipe_ids=None):
+        """ Load ingredient names from the database (for just recipe_ids if given). """
+        ingredients = Ingredient.objects.order_by()
+        if recipe_ids is not None:
+            ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        names = defaultdict(set)
+        for recipe_id, name in ingredients.values_list("recipe_id", "name").iterator():
+            names[recipe_id].add(normalize_ingredient(name))
+        for recipe_id in names.keys() | set(recipe_ids or ()):
+            self.set_recipe(recipe_id, names.get(recipe_id))
+
+    def match(self, pantry, required=(), max_missing=0, limit=50):
+        """
+        Return (recipe id, missing ingredient names) for recipes that use at least
+        one pantry ingredient, all of the required ones and need at most
+        max_missing more, ranked by how many ingredients are missing.
+        """
+        pantry = {normalize_ingredient(name) for name in pantry} - {""}
+        required = {normalize_ingredient(name) for name in required} - {""}
+        if any(name not in self.postings for name in required):
+            return []
+        pantry |= required
+
+        # Recipes using any pantry ingredient...
+        candidates = Bitmap()
+        for name in pantry & self.postings.keys():
+            candidates |= self.postings[name]
+        # ...and every required ingredient
+        for name in required:
+            candidates &= self.postings[name]
+
+        # Count how many of each candidate's ingredients the pantry covers
+        covered = Counter()
+        for name in pantry & self.postings.keys():
+            for recipe_id in self.postings[name] & candidates:
+                covered[recipe_id] += 1
+
+        results = []
+        for recipe_id, count in covered.items():
+            names = self.recipes[recipe_id]
+            if len(names) - count <= max_missing:
+                results.append((len(names) - count, -count, recipe_id))
+        results.sort()
+        return [
+            (recipe_id, sorted(self.recipes[recipe_id] - pantry))
+            for missing, count, recipe_id in results[:limit]
+        ]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def catch_up():
+    # Only called holding _lock
+    global _index
+    generation, changed = changes.changes_since(_index and _index.generation)
+    if _index is None or changed is None:
+        _index = PantryIndex()
+        _index.load()
+    elif changed:
+        _index.load(changed)
+    _index.generation = generation
+    return _index
+
+
+def get_index():
+    """
+    Return this process's PantryIndex, caught up with changes made anywhere. Other
+    threads may change it once returned, so look recipes up with match() instead.
+    """
+    with _lock:
+        return catch_up()
+
+
+def match(*args, **kwargs):
+    """
+    Return PantryIndex.match() of this process's index, caught up with changes
+    made anywhere, holding the lock that other threads change the index under.
+    """
+    with _lock:
+        return catch_up().match(*args, **kwargs)
@@ -0,0 +1,119 @@
+"""
+Parsing and scaling of free-text ingredient amounts like "1 1/2 cups" or "2-3 cloves".
+"""
+import re
+from collections import namedtuple
+from fractions import Fraction
+from functools import lru_cache
+
+VULGAR_FRACTIONS = {
+    "½": Fraction(1, 2),
+    "⅓": Fraction(1, 3),
+    "⅔": Fraction(2, 3),
+    "¼": Fraction(1, 4),
+    "¾": Fraction(3, 4),
+    "⅕": Fraction(1, 5),
+    "⅖": Fraction(2, 5),
+    "⅗": Fraction(3, 5),
+    "⅘": Fraction(4, 5),
+    "⅙": Fraction(1, 6),
+    "⅚": Fraction(5, 6),
+    "⅛": Fraction(1, 8),
+    "⅜": Fraction(3, 8),
+    "⅝": Fraction(5, 8),
+    "⅞": Fraction(7, 8),
+}
+VULGAR = "[%s]" % "".join(VULGAR_FRACTIONS)
+
+# A whole number, decimal, fraction or mixed number (1, 1.5, 1/2, 1 1/2, 1-1/2,
+# 1½). A hyphen before a fraction joins it to the whole number rather than
+# starting a range, which couldn't end below where it starts.
+NUMBER = r"""
+    (?P<{0}_whole>\d+(?![\d.]|\s*/))?(?:-(?=\d+\s*/|{1})|\s*)(?:
+        (?P<{0}_numerator>\d+)\s*/\s*(?P<{0}_denominator>\d+)
+        | (?P<{0}_vulgar>{1})
+        | (?P<{0}_decimal>\d*\.\d+)
+    )?
+"""
+AMOUNT_RE = re.compile(
+    r"""
+    ^\s*{low}
+    (?:\s*(?:-|–|to\b)\s*(?=\d|\.\d|{vulgar}){high})?
+    \s*(?P<unit>.*?)\s*$
+    """.format(
+        low=NUMBER.format("low", VULGAR),
+        high=NUMBER.format("high", VULGAR),
+        vulgar=VULGAR,
+    ),
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# (value, text) of the fractions that amounts are rounded to when they are shown
+NICE_FRACTIONS = sorted(
+    {(n / d, str(Fraction(n, d))) for d in (2, 3, 4, 8) for n in range(d + 1)}
+)
+
+Amount = namedtuple("Amount", "quantity quantity_max unit")
+
+
+def match_number(match, prefix):
+    whole, numerator, denominator, vulgar, decimal = (
+        match.group("%s_%s" % (prefix, part))
+        for part in ("whole", "numerator", "denominator", "vulgar", "decimal")
+    )
+    if whole is None and numerator is None and vulgar is None and decimal is None:
+        return None
+    value = Fraction(int(whole or 0))
+    if numerator is not None:
+        if int(denominator) == 0:
+            return None
+        value += Fraction(int(numerator), int(denominator))
+    elif vulgar is not None:
+        value += VULGAR_FRACTIONS[vulgar]
+    elif decimal is not None:
+        if whole is not None:
+            # "1 .5" isn't a number
+            return None
+        value = Fraction(decimal)
+    return value
+
+
+@lru_cache(maxsize=4096)
+def parse_amount(text):
+    """
+    Return the Amount that text describes, with Fraction quantities, or None if
+    it doesn't start with a number (e.g. "a pinch").
+    """
+    match = AMOUNT_RE.match(text)
+    quantity = match_number(match, "low")
+    if quantity is None:
+        return None
+    quantity_max = match_number(match, "high")
+    if quantity_max is not None and quantity_max <= quantity:
+        quantity_max = None
+    return Amount(quantity, quantity_max, match.group("unit"))
+
+
+def format_quantity(value):
+    """ Write value as a whole or mixed number, rounded to a kitchen fraction. """
+    whole = int(value)
+    fraction, text = min(NICE_FRACTIONS, key=lambda nice: abs(value - whole - nice[0]))
+    if fraction == 1:
+        whole, fraction = whole + 1, 0
+    if not whole and not fraction:
+        # Too small to round to a fraction anyone measures with
+        return str(Fraction(value).limit_denominator(64))
+    if not fraction:
+        return str(whole)
+    if not whole:
+        return text
+    return "%d %s" % (whole, text)
+
+
+@lru_cache(maxsize=4096)
+def format_amount(quantity, quantity_max, unit):
+    """ Write a (possibly scaled) amount, e.g. "1 1/2-2 cups". """
+    text = format_quantity(quantity)
+    if quantity_max is not None:
+        text += "-" + format_quantity(quantity_max)
+    return "%s %s" % (text, unit) if unit else text
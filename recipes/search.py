@@ -0,0 +1,361 @@
+"""
+Full-text search over recipe names, descriptions, ingredients and instructions.
+
+The index is made of two segments:
+
+* recipes.idx in settings.SEARCH_INDEX_DIR, an inverted index written by the
+  build_search_index command. Every worker on a host memory-maps the same file, so
+  they share one copy through the page cache.
+* A delta of the recipes changed since recipes.idx was built, which each process
+  keeps in memory. The recipes are found through the feed of changed recipes
+  (see changes.py), so edits made through any process on any host show up, and
+  read again from the database. Each one replaces (or deletes) the recipe's entry
+  in the main segment.
+
+Rebuilding the main segment merges the delta back into it. gunicorn.conf.py runs
+build_search_index --every in the background on each host, to build the main
+segment and then rebuild it once enough has changed. Until the first build,
+searches find nothing.
+"""
+import fcntl
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+from . import changes
+from .models import Ingredient, Instruction, Recipe
+from .text import tokenize
+
+SEGMENT_NAME = "recipes.idx"
+LOCK_NAME = "recipes.lock"
+
+MAGIC = b"CBSEARCH"
+VERSION = 2
+# Magic, version, document count, term count, total document length, the offsets
+# of the document table, term table, term bytes and postings, and the generation
+# of the changed recipes feed and the time the segment was built from
+HEADER = struct.Struct("<8sIIIQQQQQQd")
+# Recipe id, document length
+DOCUMENT = struct.Struct("<II")
+# Offset into the term bytes, term length, padding, first posting, posting count
+TERM = struct.Struct("<IHHQI")
+# Recipe id, term frequency, document length
+POSTING = struct.Struct("<III")
+
+# Words in a recipe's name count this many times over the rest of its text
+NAME_WEIGHT = 3
+# Okapi BM25 parameters
+K1 = 1.2
+B = 0.75
+# How far apart the clocks setting updated_at may be, for when the delta is read
+# from the recipes updated since the main segment was built
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+def document_terms(name, description, texts):
+    """ Return the term frequencies of a recipe's searchable text. """
+    terms = Counter()
+    for term in tokenize(name):
+        terms[term] += NAME_WEIGHT
+    for text in (description, *texts):
+        terms.update(tokenize(text))
+    return terms
+
+
+def recipe_documents(recipe_ids=None, chunk_size=1000):
+    """ Yield (recipe id, terms) for recipes in id order, loading them in chunks. """
+    recipes = Recipe.objects.order_by("id").values_list("id", "name", "description")
+    if recipe_ids is not None:
+        recipes = recipes.filter(id__in=recipe_ids)
+    last_id = 0
+    while True:
+        chunk = list(recipes.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        ids = [recipe_id for recipe_id, name, description in chunk]
+        texts = defaultdict(list)
+        ingredients = Ingredient.objects.filter(recipe_id__in=ids).order_by()
+        for recipe_id, text in ingredients.values_list("recipe_id", "name"):
+            texts[recipe_id].append(text)
+        instructions = Instruction.objects.filter(recipe_id__in=ids).order_by()
+        for recipe_id, text in instructions.values_list("recipe_id", "description"):
+            texts[recipe_id].append(text)
+        for recipe_id, name, description in chunk:
+            yield recipe_id, document_terms(name, description, texts[recipe_id])
+        last_id = ids[-1]
+
+
+def little_endian(values):
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_segment(path, documents, generation=0, built_at=0.0):
+    """
+    Write (recipe id, terms) pairs, in id order, to a main segment at path, built
+    from the database as of the feed's generation and built_at (a POSIX time).
+    """
+    document_table = array("I")
+    postings = defaultdict(lambda: array("I"))
+    total_length = 0
+    for recipe_id, terms in documents:
+        length = sum(terms.values())
+        total_length += length
+        document_table.extend((recipe_id, length))
+        for term, frequency in terms.items():
+            postings[term].extend((recipe_id, frequency, length))
+
+    term_table, term_bytes, posting_data = bytearray(), bytearray(), array("I")
+    # The term table is binary searched on the encoded terms
+    encoded_terms = sorted((term.encode(), term) for term in postings)
+    for encoded, term in encoded_terms:
+        first, count = len(posting_data) // 3, len(postings[term]) // 3
+        term_table += TERM.pack(len(term_bytes), len(encoded), 0, first, count)
+        term_bytes += encoded
+        posting_data.extend(postings.pop(term))
+
+    documents_offset = HEADER.size
+    terms_offset = documents_offset + len(document_table) * 4
+    term_bytes_offset = terms_offset + len(term_table)
+    postings_offset = term_bytes_offset + len(term_bytes)
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(document_table) // 2,
+        len(term_table) // TERM.size,
+        total_length,
+        documents_offset,
+        terms_offset,
+        term_bytes_offset,
+        postings_offset,
+        generation,
+        built_at,
+    )
+    # Write a new file and swap it in so that readers never see a partial segment
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(header)
+        f.write(little_endian(document_table))
+        f.write(term_table)
+        f.write(term_bytes)
+        f.write(little_endian(posting_data))
+    os.replace(temp_path, path)
+    return len(document_table) // 2
+
+
+class Segment:
+    """ A read-only, memory-mapped main segment. """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.document_count,
+            self.term_count,
+            self.total_length,
+            self.documents_offset,
+            self.terms_offset,
+            self.term_bytes_offset,
+            self.postings_offset,
+            self.generation,
+            built_at,
+        ) = HEADER.unpack_from(self.map)
+        self.built_at = datetime.fromtimestamp(built_at, timezone.utc)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a recipe search index" % path)
+
+    def document_length(self, recipe_id):
+        """ Return the length of the recipe's document, or None if it isn't here. """
+        low, high = 0, self.document_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.documents_offset + middle * DOCUMENT.size
+            found_id, length = DOCUMENT.unpack_from(self.map, offset)
+            if found_id < recipe_id:
+                low = middle + 1
+            elif found_id > recipe_id:
+                high = middle
+            else:
+                return length
+        return None
+
+    def postings(self, term):
+        """ Return the (recipe id, term frequency, length) postings for term. """
+        key = term.encode()
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length, _, first, count = TERM.unpack_from(
+                self.map, self.terms_offset + middle * TERM.size
+            )
+            start = self.term_bytes_offset + offset
+            found = self.map[start : start + length]
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                start = self.postings_offset + first * POSTING.size
+                end = start + count * POSTING.size
+                return POSTING.iter_unpack(self.map[start:end])
+        return ()
+
+
+class SearchIndex:
+    """ Ranks recipes against a query using the main segment and the delta. """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.segment_path = os.path.join(self.directory, SEGMENT_NAME)
+        self.segment = None
+        self.segment_key = None
+        # Recipe id -> (terms, length, generation it was read at), with None terms
+        # for deleted recipes. Replaced rather than changed, so readers can use it
+        # outside the lock.
+        self.delta = {}
+        # The generation of the feed the delta is up to date with
+        self.generation = None
+        self.refresh_lock = threading.Lock()
+
+    @contextmanager
+    def write_lock(self):
+        """ Serialise builders of the main segment across processes. """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_NAME), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def read_segment(self):
+        """ Return the current main segment, or None if it hasn't been built. """
+        try:
+            return Segment(self.segment_path)
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """ Pick up a rebuilt main segment and catch the delta up with the feed. """
+        try:
+            stat = os.stat(self.segment_path)
+        except FileNotFoundError:
+            self.segment = self.segment_key = None
+            return
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if key != self.segment_key:
+            self.segment, self.segment_key = Segment(self.segment_path), key
+            # Changes published before the segment was built are in it already
+            self.delta = {
+                recipe_id: document
+                for recipe_id, document in self.delta.items()
+                if document[2] > self.segment.generation
+            }
+            if self.generation is None:
+                self.generation = self.segment.generation
+
+        generation, changed = changes.changes_since(self.generation)
+        if changed is None:
+            # The feed can't tell what changed, so read every recipe written since
+            # the segment was built, and those already in the delta, which may
+            # have been deleted
+            since = self.segment.built_at - CLOCK_SKEW
+            updated = Recipe.objects.filter(updated_at__gte=since)
+            changed = set(updated.values_list("id", flat=True)) | set(self.delta)
+        if changed:
+            delta = dict(self.delta)
+            delta.update(dict.fromkeys(changed, (None, 0, generation)))
+            for recipe_id, terms in recipe_documents(changed):
+                delta[recipe_id] = (terms, sum(terms.values()), generation)
+            self.delta = delta
+        self.generation = generation
+
+    def search(self, query, limit):
+        """ Return the ids of the recipes best matching query, best first. """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self.refresh_lock:
+            self.refresh()
+            segment, delta = self.segment, self.delta
+        if segment is None:
+            return []
+
+        # Collection statistics, adjusted for the recipes replaced by the delta
+        document_count, total_length = segment.document_count, segment.total_length
+        for recipe_id, (document_terms, length, generation) in delta.items():
+            old_length = segment.document_length(recipe_id)
+            if old_length is not None:
+                document_count -= 1
+                total_length -= old_length
+            if document_terms is not None:
+                document_count += 1
+                total_length += length
+        if document_count <= 0:
+            return []
+        average_length = total_length / document_count
+
+        scores = defaultdict(float)
+        for term in terms:
+            matches = [p for p in segment.postings(term) if p[0] not in delta]
+            for recipe_id, (document_terms, length, generation) in delta.items():
+                if document_terms is not None and term in document_terms:
+                    matches.append((recipe_id, document_terms[term], length))
+            frequency = len(matches)
+            idf = math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5))
+            for recipe_id, tf, length in matches:
+                norm = K1 * (1 - B + B * length / average_length)
+                scores[recipe_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda s: (s[1], -s[0]))
+        return [recipe_id for recipe_id, score in best]
+
+    def delta_size(self):
+        """
+        Return how many recipes have changed since the main segment was built, or
+        None if it hasn't been or the feed can't tell.
+        """
+        segment = self.read_segment()
+        if segment is None:
+            return None
+        generation, changed = changes.changes_since(segment.generation)
+        return None if changed is None else len(changed)
+
+    def rebuild(self):
+        """ Write a new main segment from the database, merging in the delta. """
+        with self.write_lock():
+            # Read first, so that changes published from here on are replayed
+            generation = changes.current_generation() or 0
+            built_at = time.time()
+            return write_segment(
+                self.segment_path, recipe_documents(), generation, built_at
+            )
+
+
+_index = None
+
+
+def get_index():
+    """ Return this process's SearchIndex over settings.SEARCH_INDEX_DIR. """
+    global _index
+    if _index is None or _index.directory != str(settings.SEARCH_INDEX_DIR):
+        _index = SearchIndex(settings.SEARCH_INDEX_DIR)
+    return _index
+
+
+def search(query, limit=None):
+    return get_index().search(query, limit or settings.SEARCH_RESULT_LIMIT)
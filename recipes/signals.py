@@ -0,0 +1,165 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import User
+
+from . import changes, fragments, home
+from .favorites import adjust_favorite_counts, bump_favorites_version, favorite_pairs
+from .models import Ingredient, Instruction, Recipe
+
+_local = threading.local()
+
+
+@contextmanager
+def content_hooks_disabled():
+    """
+    Skip the per-recipe updates for writes made inside the block, for bulk writers
+    that bring everything derived from recipes up to date themselves afterwards.
+    """
+    _local.disabled = True
+    try:
+        yield
+    finally:
+        _local.disabled = False
+
+
+def hooks_enabled():
+    return not getattr(_local, "disabled", False)
+
+
+class ContentChanges:
+    """
+    The recipes whose content a transaction changed, brought up to date together
+    once it commits, however many of their ingredients and instructions it wrote.
+    """
+
+    def __init__(self):
+        self.recipe_ids = set()
+        # Recipe id -> the savepoints open when its updated_at was last advanced
+        self.touched = {}
+        self.home = False
+
+    def flush(self):
+        recipe_ids = sorted(self.recipe_ids)
+        for recipe_id in recipe_ids:
+            fragments.bump_version(recipe_id)
+        # Let every process's in-memory indexes, and search deltas, know to reload
+        # the recipes
+        for recipe_id in recipe_ids:
+            changes.publish(recipe_id)
+        if self.home:
+            home.invalidate()
+
+
+def content_changes(using):
+    """ Return the ContentChanges of the transaction open on using, if any. """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return None
+    batch = getattr(connection, "_content_changes", None)
+    # Rolling back drops the batch's callback, along with anything it collected
+    if batch is None or all(
+        callback != batch.flush for sids, callback in connection.run_on_commit
+    ):
+        batch = connection._content_changes = ContentChanges()
+        transaction.on_commit(batch.flush, using=using)
+    return batch
+
+
+def recipe_content_changed(recipe_id, using, touch=False, home=False):
+    """
+    Bring everything derived from a recipe's content up to date once committed,
+    first advancing its updated_at if touch is set.
+    """
+    if not hooks_enabled():
+        if touch:
+            touch_recipe(recipe_id, using)
+        return
+    batch = content_changes(using)
+    committed = batch is None
+    if committed:
+        # Not in a transaction, so the write has committed already
+        batch = ContentChanges()
+    batch.recipe_ids.add(recipe_id)
+    batch.home |= home
+    if touch:
+        # Once per transaction, unless a savepoint the update ran in has gone
+        savepoint_ids = transaction.get_connection(using).savepoint_ids
+        touched = batch.touched.get(recipe_id)
+        if touched is None or not set(touched) <= set(savepoint_ids):
+            batch.touched[recipe_id] = list(savepoint_ids)
+            touch_recipe(recipe_id, using)
+    if committed:
+        batch.flush()
+
+
+def touch_recipe(recipe_id, using):
+    # Advance the recipe's updated_at without sending its own signals
+    Recipe.objects.using(using).filter(pk=recipe_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+def recipe_saved_or_deleted(sender, instance, using, **kwargs):
+    recipe_content_changed(instance.id, using, home=True)
+    if hooks_enabled():
+        fragments.bump_catalogue_version(using)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Instruction)
+def recipe_child_saved_or_deleted(sender, instance, using, **kwargs):
+    recipe_content_changed(instance.recipe_id, using, touch=True)
+
+
+def author_recipes_changed(author, using):
+    # Recipe cards and pages show the author's name, cached under the recipe
+    recipe_ids = Recipe.objects.using(using).filter(author=author)
+    fragments.bump_versions(recipe_ids.values_list("id", flat=True), using)
+
+
+@receiver([post_save, post_delete], sender=User)
+def author_saved_or_deleted(
+    sender, instance, using, created=False, update_fields=None, **kwargs
+):
+    # Recipe cards show author names, but logging in only saves last_login
+    if update_fields is None or "username" in update_fields:
+        transaction.on_commit(home.invalidate)
+        fragments.bump_catalogue_version(using)
+        if kwargs["signal"] is post_save and not created:
+            author_recipes_changed(instance, using)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(sender, instance, using, **kwargs):
+    # The user's favorites are deleted along with them, without m2m_changed
+    adjust_favorite_counts(favorite_pairs(instance, False, None), -1)
+    # Their recipes lose their author without sending signals of their own
+    author_recipes_changed(instance, using)
+
+
+@receiver(m2m_changed, sender=User.favorite_recipes.through)
+def favorites_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        # Removing a favorite that doesn't exist changes nothing, so note which do
+        instance._removed_favorites = favorite_pairs(instance, reverse, pk_set)
+        return
+    if action == "post_add":
+        # Only favorites that didn't exist already are in pk_set
+        if reverse:
+            pairs = [(user_id, instance.pk) for user_id in pk_set]
+        else:
+            pairs = [(instance.pk, recipe_id) for recipe_id in pk_set]
+        adjust_favorite_counts(pairs, 1)
+    elif action in ("post_remove", "post_clear"):
+        pairs = getattr(instance, "_removed_favorites", [])
+        instance._removed_favorites = []
+        adjust_favorite_counts(pairs, -1)
+    else:
+        return
+    for user_id in {user_id for user_id, recipe_id in pairs}:
+        bump_favorites_version(user_id)
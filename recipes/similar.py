@@ -0,0 +1,206 @@
+"""
+"You might also like" recipes, found by how many ingredients they share.
+
+Comparing every pair of recipes is quadratic, so each process keeps a MinHash
+signature of every recipe's normalized ingredient names in a locality-sensitive
+hashing index. Signatures are cut into BANDS bands of ROWS hashes, and recipes
+with any band in common are the candidates, which are then ranked by their exact
+Jaccard similarity. Recipes sharing half their ingredients become candidates
+about two times in three, and those sharing 70% almost always.
+"""
+import hashlib
+import heapq
+import logging
+import random
+import threading
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+
+from . import changes
+from .models import Ingredient
+from .text import normalize_ingredient
+
+BANDS = 16
+ROWS = 4
+# Hashes are (a * x + b) mod PRIME, with a and b fixed so signatures are the
+# same in every process
+PRIME = (1 << 61) - 1
+_random = random.Random(7)
+COEFFICIENTS = [
+    (_random.randrange(1, PRIME), _random.randrange(PRIME))
+    for _ in range(BANDS * ROWS)
+]
+# Candidates taken from each band's bucket. Big buckets hold recipes with much
+# the same ingredients, so a few of them are as good as all of them.
+MAX_BUCKET_CANDIDATES = 32
+MIN_SIMILARITY = 0.2
+
+logger = logging.getLogger("recipes.similar")
+
+
+class SimilarityIndex:
+    """ MinHash LSH index of the recipes' ingredient sets. """
+
+    def __init__(self):
+        # One {band of a signature: recipe ids} dict per band
+        self.buckets = [defaultdict(set) for _ in range(BANDS)]
+        # Recipe id -> set of the recipe's normalized ingredient names
+        self.recipes = {}
+        self.recipe_names = {}
+        # Normalized ingredient name -> its hash under each of COEFFICIENTS
+        self.hashes = {}
+        self.generation = None
+
+    def name_hashes(self, name):
+        hashes = self.hashes.get(name)
+        if hashes is None:
+            digest = hashlib.blake2b(name.encode(), digest_size=8).digest()
+            x = int.from_bytes(digest, "big")
+            hashes = self.hashes[name] = tuple(
+                (a * x + b) % PRIME for a, b in COEFFICIENTS
+            )
+        return hashes
+
+    def band_keys(self, names):
+        """ Return the key of each band of the MinHash signature of names. """
+        signature = tuple(map(min, zip(*map(self.name_hashes, names))))
+        return [
+            hash(signature[start : start + ROWS])
+            for start in range(0, BANDS * ROWS, ROWS)
+        ]
+
+    def set_recipe(self, recipe_id, names, recipe_name=None):
+        """ Replace the recipe's ingredients in the index (deleting it if empty). """
+        old = self.recipes.pop(recipe_id, None)
+        self.recipe_names.pop(recipe_id, None)
+        if old:
+            for bucket, key in zip(self.buckets, self.band_keys(old)):
+                bucket[key].discard(recipe_id)
+                if not bucket[key]:
+                    del bucket[key]
+        if names:
+            self.recipes[recipe_id] = names
+            self.recipe_names[recipe_id] = recipe_name
+            for bucket, key in zip(self.buckets, self.band_keys(names)):
+                bucket[key].add(recipe_id)
+
+    def load(self, recipe_ids=None):
+        """ Load ingredient names from the database (for just recipe_ids if given). """
+        ingredients = Ingredient.objects.order_by()
+        if recipe_ids is not None:
+            ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        names = defaultdict(set)
+        recipe_names = {}
+        rows = ingredients.values_list("recipe_id", "recipe__name", "name")
+        for recipe_id, recipe_name, name in rows.iterator():
+            names[recipe_id].add(normalize_ingredient(name))
+            recipe_names[recipe_id] = recipe_name
+        for recipe_id in names.keys() | set(recipe_ids or ()):
+            self.set_recipe(
+                recipe_id, names.get(recipe_id), recipe_names.get(recipe_id)
+            )
+
+    def similar(self, recipe_id, limit=5):
+        """
+        Return (recipe id, recipe name) for up to limit recipes with at least
+        MIN_SIMILARITY of their ingredients in common with the recipe, most
+        similar first.
+        """
+        names = self.recipes.get(recipe_id)
+        if not names:
+            return []
+        candidates = set()
+        for bucket, key in zip(self.buckets, self.band_keys(names)):
+            candidates.update(islice(bucket[key], MAX_BUCKET_CANDIDATES))
+        candidates.discard(recipe_id)
+
+        scored = []
+        for other_id in candidates:
+            other = self.recipes[other_id]
+            shared = len(names & other)
+            similarity = shared / (len(names) + len(other) - shared)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((-similarity, other_id))
+        return [
+            (other_id, self.recipe_names[other_id])
+            for similarity, other_id in heapq.nsmallest(limit, scored)
+        ]
+
+
+_index = None
+_lock = threading.Lock()
+# The thread building a new index off the request path, while there is one
+_builder = None
+
+
+def catch_up():
+    # Only called holding _lock, with an index. Return whether it could be caught up.
+    generation, changed = changes.changes_since(_index.generation)
+    if changed is None:
+        return False
+    if changed:
+        _index.load(changed)
+    _index.generation = generation
+    return True
+
+
+def build_index():
+    """ Build a new SimilarityIndex without holding _lock, and swap it in. """
+    global _index
+    index = SimilarityIndex()
+    # Changes published while it loads are caught up with once it is swapped in
+    index.generation = changes.current_generation()
+    index.load()
+    with _lock:
+        _index = index
+        catch_up()
+        return index
+
+
+def build_in_background():
+    try:
+        build_index()
+    except Exception:
+        logger.exception("Couldn't build the similar recipes index")
+    finally:
+        # No request ends on this thread to close its connections
+        connections.close_all()
+
+
+def start_build():
+    # Only called holding _lock
+    global _builder
+    # A thread started before a fork isn't alive in the child
+    if _builder is None or not _builder.is_alive():
+        _builder = threading.Thread(
+            target=build_in_background, name="similar-index", daemon=True
+        )
+        _builder.start()
+
+
+def get_index():
+    """
+    Return this process's SimilarityIndex, caught up with changes made anywhere,
+    building it first if need be.
+    """
+    with _lock:
+        if _index is not None and catch_up():
+            return _index
+    return build_index()
+
+
+def similar(recipe_id, limit=5):
+    """
+    Return SimilarityIndex.similar() from this process's index, holding the lock
+    its updates are made under. Building the index is left to a background thread,
+    so until the first one is built there are no similar recipes.
+    """
+    with _lock:
+        if _index is None or not catch_up():
+            if settings.SIMILAR_RECIPES_BACKGROUND_BUILD:
+                start_build()
+        # The old index serves until the new one is swapped in
+        return [] if _index is None else _index.similar(recipe_id, limit)
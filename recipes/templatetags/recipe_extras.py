@@ -0,0 +1,9 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def scaled(ingredient, factor):
+    """ Render an ingredient with its amount scaled by factor. """
+    return ingredient.scaled(factor)
@@ -0,0 +1,79 @@
+from accounts.models import User
+from django.test import TestCase
+from django.urls import reverse
+from recipes.models import Ingredient, Instruction, Recipe
+
+
+class RecipeAPITest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        chef = User.objects.create_user(username="chef", password="1X<ISRUkw+tuK")
+        for number in range(25):
+            recipe = Recipe.objects.create(
+                name=f"Recipe {number:02}",
+                description="Tasty",
+                servings=2,
+                nota_bene="Secret",
+                author=chef if number % 2 else None,
+            )
+            Ingredient.objects.create(recipe=recipe, name="Flour", amount="1 1/2 cups")
+            Instruction.objects.create(recipe=recipe, step_number=2, description="Bake")
+            Instruction.objects.create(recipe=recipe, step_number=1, description="Mix")
+        cls.recipe = Recipe.objects.get(name="Recipe 01")
+
+    def test_list_uses_default_fields(self):
+        response = self.client.get(reverse("api-recipe-list"))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["results"]), 20)
+        first = data["results"][0]
+        self.assertEqual(
+            set(first), {"id", "name", "description", "servings", "author", "url"}
+        )
+        self.assertEqual(first["name"], "Recipe 00")
+        self.assertIsNone(first["author"])
+        self.assertEqual(data["results"][1]["author"], "chef")
+        self.assertIsNone(data["previous"])
+
+    def test_cursor_pages_walk_every_recipe(self):
+        url = reverse("api-recipe-list") + "?fields=name&limit=10"
+        names = []
+        while url:
+            # One query per page, however deep
+            with self.assertNumQueries(1):
+                data = self.client.get(url).json()
+            names += [result["name"] for result in data["results"]]
+            url = data["next"]
+        self.assertEqual(names, [f"Recipe {number:02}" for number in range(25)])
+
+    def test_sparse_fields_and_includes(self):
+        url = reverse("api-recipe-list") + "?fields=id&include=instructions&limit=5"
+        # The page and one query for all of its instructions
+        with self.assertNumQueries(2):
+            data = self.client.get(url).json()
+        self.assertEqual(
+            data["results"][0]["instructions"],
+            [
+                {"step_number": 1, "description": "Mix"},
+                {"step_number": 2, "description": "Bake"},
+            ],
+        )
+        self.assertEqual(set(data["results"][0]), {"id", "instructions"})
+
+    def test_detail_includes_everything(self):
+        url = reverse("api-recipe-detail", args=[self.recipe.id])
+        data = self.client.get(url).json()
+        self.assertEqual(data["nota_bene"], "Secret")
+        self.assertEqual(data["ingredients"][0]["quantity"], 1.5)
+        self.assertEqual(data["ingredients"][0]["unit"], "cups")
+        self.assertEqual(len(data["instructions"]), 2)
+        self.assertTrue(data["url"].endswith(url))
+
+    def test_errors(self):
+        response = self.client.get(reverse("api-recipe-list") + "?fields=secret")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Unknown fields: secret", response.json()["error"])
+        response = self.client.get(reverse("api-recipe-list") + "?cursor=garbage")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("api-recipe-detail", args=[999]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,100 @@
+from accounts.models import User
+from django.test import LiveServerTestCase, TestCase, override_settings
+from recipes import benchmark, loadtest
+from recipes.models import Ingredient, Recipe
+
+from .test_search import SearchIndexTestMixin
+
+
+class SeedCatalogueTest(SearchIndexTestMixin, TestCase):
+    def test_seed_is_deterministic(self):
+        benchmark.seed_catalogue(50, seed=7, batch_size=20)
+        first = list(Recipe.objects.values_list("name", "servings", "author_id"))
+        ingredients = list(Ingredient.objects.values_list("name", "amount"))
+        Recipe.objects.all().delete()
+        User.objects.all().delete()
+        benchmark.seed_catalogue(50, seed=7, batch_size=20)
+        self.assertEqual(
+            list(Recipe.objects.values_list("name", "servings", "author_id")), first
+        )
+        self.assertEqual(
+            list(Ingredient.objects.values_list("name", "amount")), ingredients
+        )
+
+    def test_favorite_counts_match_favorites(self):
+        benchmark.seed_catalogue(50)
+        through = User.favorite_recipes.through
+        for recipe in Recipe.objects.all():
+            self.assertEqual(
+                recipe.favorite_count,
+                through.objects.filter(recipe_id=recipe.id).count(),
+            )
+        # Favorites go mostly to the first few recipes
+        counts = Recipe.objects.order_by("id").values_list("favorite_count", flat=True)
+        self.assertGreater(sum(counts[:10]), sum(counts[40:]))
+
+    @override_settings(
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+    )
+    def test_every_named_route_is_benchmarked(self):
+        benchmark.seed_catalogue(20)
+        routes = benchmark.routes()
+        self.assertEqual({route.name for route in routes}, benchmark.named_routes())
+        results = benchmark.run(2)
+        for name, result in results.items():
+            self.assertLess(result["status"], 400, name)
+            self.assertIsNotNone(result["queries"], name)
+
+
+class CompareTest(TestCase):
+    def result(self, p50, queries=3, peak_kb=100):
+        return {
+            "p50_ms": p50,
+            "p95_ms": p50 + 1,
+            "p99_ms": p50 + 2,
+            "queries": queries,
+            "peak_kb": peak_kb,
+        }
+
+    def test_flags_regressions(self):
+        baseline = {"index": self.result(10), "search": self.result(10)}
+        results = {
+            "index": self.result(10.5, queries=4),
+            "search": self.result(20, peak_kb=200),
+            "new-route": self.result(100),
+        }
+        regressions = benchmark.compare(results, baseline, threshold=0.2)
+        self.assertEqual(
+            regressions,
+            [
+                ("index", "queries", 3, 4),
+                ("search", "p50_ms", 10, 20),
+                ("search", "p95_ms", 11, 21),
+                ("search", "p99_ms", 12, 22),
+                ("search", "peak_kb", 100, 200),
+            ],
+        )
+
+    def test_ignores_small_changes(self):
+        baseline = {"index": self.result(1)}
+        results = {"index": self.result(1.5)}
+        self.assertEqual(benchmark.compare(results, baseline, threshold=0.2), [])
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class LoadTestTest(SearchIndexTestMixin, LiveServerTestCase):
+    def test_load_test(self):
+        recipe = Recipe.objects.create(name="Pizza", servings=2)
+        paths = ["/recipes/", "/recipes/%d" % recipe.id, "/recipes/0"]
+        result = loadtest.load_test(self.live_server_url, paths, 3, 12)
+        self.assertEqual(result["errors"], 0)
+        self.assertGreater(result["rps"], 0)
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertLessEqual(result["p99_ms"], result["max_ms"])
+
+    def test_errors_are_counted(self):
+        result = loadtest.load_test("http://127.0.0.1:1", ["/"], 2, 4, timeout=1)
+        self.assertEqual(result["errors"], 4)
+        self.assertEqual(result["rps"], 0)
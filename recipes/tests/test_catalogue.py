@@ -0,0 +1,162 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from accounts.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from recipes import search
+from recipes.models import Ingredient, Instruction, Recipe
+
+from .test_search import SearchIndexTestMixin
+
+
+def catalogue_line(number, **fields):
+    entry = {
+        "name": f"Recipe {number}",
+        "description": "Description",
+        "servings": 4,
+        "ingredients": [
+            {"name": "Flour", "amount": "1 1/2 cups"},
+            {"name": "Salt", "amount": "a pinch", "preparation": "fine"},
+        ],
+        "instructions": ["Mix.", "Bake."],
+    }
+    entry.update(fields)
+    return json.dumps(entry) + "\n"
+
+
+class ImportRecipesTest(SearchIndexTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "recipes.jsonl")
+
+    def write(self, lines):
+        with open(self.path, "w") as f:
+            f.writelines(lines)
+
+    def import_recipes(self, *args):
+        call_command("import_recipes", self.path, *args, stdout=StringIO())
+
+    def test_imports_recipes_with_children(self):
+        User.objects.create_user(username="chef", password="1X<ISRUkw+tuK")
+        instructions = [{"step_number": 3, "description": "Serve."}]
+        self.write(
+            [
+                catalogue_line(1, author="chef"),
+                "\n",
+                catalogue_line(2, instructions=instructions),
+            ]
+        )
+        self.import_recipes("--batch-size", "1")
+
+        first, second = Recipe.objects.order_by("id")
+        self.assertEqual(first.author.username, "chef")
+        self.assertIsNone(second.author)
+        flour = first.ingredient_set.get(name="Flour")
+        self.assertEqual((flour.quantity, flour.unit), (1.5, "cups"))
+        self.assertEqual(
+            list(first.instruction_set.values_list("step_number", "description")),
+            [(1, "Mix."), (2, "Bake.")],
+        )
+        self.assertEqual(second.instruction_set.get().step_number, 3)
+        self.assertEqual(Ingredient.objects.count(), 4)
+        # The search index is rebuilt afterwards
+        self.assertEqual(search.search("recipe 2")[0], second.id)
+        self.assertFalse(os.path.exists(self.path + ".checkpoint"))
+
+    def test_resumes_after_failure(self):
+        lines = [catalogue_line(number) for number in range(1, 6)]
+        self.write(lines[:2] + [catalogue_line(3, servings=0)] + lines[3:])
+        with self.assertRaisesMessage(CommandError, "Line 3"):
+            self.import_recipes("--batch-size", "2")
+        # The first batch was committed before the bad line was reached
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        self.write(lines)
+        self.import_recipes("--batch-size", "2")
+        names = list(Recipe.objects.order_by("id").values_list("name", flat=True))
+        self.assertEqual(names, [f"Recipe {number}" for number in range(1, 6)])
+        self.assertEqual(Instruction.objects.count(), 10)
+
+    def test_invalid_json(self):
+        self.write([catalogue_line(1), "{not json\n"])
+        with self.assertRaisesMessage(CommandError, "Line 2 is not valid JSON"):
+            self.import_recipes()
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_duplicate_step_numbers(self):
+        instructions = ["Mix.", {"step_number": 1, "description": "Bake."}]
+        self.write([catalogue_line(1, instructions=instructions)])
+        with self.assertRaisesMessage(
+            CommandError, "Line 1: duplicate 'step_number' 1"
+        ):
+            self.import_recipes()
+        self.assertFalse(Recipe.objects.exists())
+
+
+class ExportRecipesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        chef = User.objects.create_user(username="chef", password="1X<ISRUkw+tuK")
+        User.objects.create_user(
+            username="staff", password="1X<ISRUkw+tuK", is_staff=True
+        )
+        for number in range(1, 6):
+            recipe = Recipe.objects.create(
+                name=f"Recipe {number}", description="Tasty", servings=2, author=chef
+            )
+            Ingredient.objects.create(recipe=recipe, name="Flour", amount="1 cup")
+            for step_number, description in ((2, "Bake."), (1, "Mix.")):
+                Instruction.objects.create(
+                    recipe=recipe, step_number=step_number, description=description
+                )
+
+    def test_ndjson_export_matches_import_format(self):
+        out = StringIO()
+        # Children are loaded once per chunk rather than once per recipe
+        with self.assertNumQueries(3 * 3 + 1):
+            call_command(
+                "export_recipes", "--chunk-size", "2", stdout=out, stderr=StringIO()
+            )
+        entries = [json.loads(line) for line in out.getvalue().splitlines()]
+        names = [entry["name"] for entry in entries]
+        self.assertEqual(names, [f"Recipe {number}" for number in range(1, 6)])
+        self.assertEqual(entries[0]["author"], "chef")
+        self.assertEqual(
+            entries[0]["ingredients"],
+            [{"name": "Flour", "amount": "1 cup", "preparation": None}],
+        )
+        steps = [step["step_number"] for step in entries[0]["instructions"]]
+        self.assertEqual(steps, [1, 2])
+
+    def test_csv_export(self):
+        out = StringIO()
+        call_command(
+            "export_recipes", "--format", "csv", stdout=out, stderr=StringIO()
+        )
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(rows[0][:2], ["id", "name"])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][6:], ["1 cup Flour", "1. Mix.\n2. Bake."])
+
+    def test_view_is_staff_only(self):
+        url = reverse("export-recipes")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.login(username="chef", password="1X<ISRUkw+tuK")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(username="staff", password="1X<ISRUkw+tuK")
+        response = self.client.get(url + "?format=csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        content = b"".join(response.streaming_content).decode()
+        self.assertEqual(len(list(csv.reader(StringIO(content)))), 6)
@@ -0,0 +1,111 @@
+from io import StringIO
+
+from accounts.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from recipes.favorites import change_favorites, toggle_favorite
+from recipes.models import Recipe
+
+
+class FavoriteCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username="cook%d" % i, password="1X<ISRUkw+tuK")
+            for i in range(3)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(name="Recipe %d" % i, servings=2) for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def counts(self):
+        return [
+            Recipe.objects.get(pk=recipe.pk).favorite_count for recipe in self.recipes
+        ]
+
+    def test_add_and_remove(self):
+        user = self.users[0]
+        user.favorite_recipes.add(*self.recipes[:2])
+        # Adding a favorite twice only counts it once
+        user.favorite_recipes.add(self.recipes[0])
+        self.assertEqual(self.counts(), [1, 1, 0])
+        # Removing something that isn't a favorite changes nothing
+        user.favorite_recipes.remove(self.recipes[0], self.recipes[2])
+        self.assertEqual(self.counts(), [0, 1, 0])
+        user.favorite_recipes.clear()
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+    def test_changed_from_recipe(self):
+        recipe = self.recipes[0]
+        recipe.user_set.add(*self.users)
+        self.assertEqual(self.counts(), [3, 0, 0])
+        recipe.user_set.remove(self.users[0])
+        self.assertEqual(self.counts(), [2, 0, 0])
+        recipe.user_set.clear()
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+    def test_favorites_endpoint_helpers(self):
+        change_favorites(self.users[0], [r.pk for r in self.recipes], add=True)
+        toggle_favorite(self.users[1], self.recipes[0].pk)
+        self.assertEqual(self.counts(), [2, 1, 1])
+        change_favorites(self.users[0], [self.recipes[0].pk], add=False)
+        self.assertEqual(self.counts(), [1, 1, 1])
+
+    def test_deleting_user(self):
+        for user in self.users[:2]:
+            user.favorite_recipes.add(self.recipes[0])
+        User.objects.get(pk=self.users[0].pk).delete()
+        self.assertEqual(self.counts(), [1, 0, 0])
+
+    def test_reconcile_command(self):
+        self.users[0].favorite_recipes.add(*self.recipes)
+        # Counts drift if favorites are written without the signals
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(favorite_count=7)
+        User.favorite_recipes.through.objects.filter(
+            recipe_id=self.recipes[1].pk
+        ).delete()
+        out = StringIO()
+        call_command("reconcile_favorite_counts", "--batch-size=2", stdout=out)
+        self.assertIn("Checked 3 recipes and corrected 2", out.getvalue())
+        self.assertEqual(self.counts(), [1, 0, 1])
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class MostFavoritedListViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            User.objects.create_user(username="cook%d" % i, password="1X<ISRUkw+tuK")
+            for i in range(3)
+        ]
+        for i in range(16):
+            recipe = Recipe.objects.create(name="Recipe %02d" % i, servings=2)
+            for user in users[: i % 4]:
+                user.favorite_recipes.add(recipe)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_most_favorited_first(self):
+        response = self.client.get(reverse("most-favorited"))
+        self.assertEqual(response.status_code, 200)
+        counts = [recipe.favorite_count for recipe in response.context["recipe_list"]]
+        self.assertEqual(counts, [3, 3, 3, 3, 2, 2, 2, 2, 1, 1])
+        self.assertContains(response, "Favorited by 3 cooks")
+
+        # Recipes nobody has favorited are left out
+        response = self.client.get(response.context["page_nav"]["next"])
+        counts = [recipe.favorite_count for recipe in response.context["recipe_list"]]
+        self.assertEqual(counts, [1, 1])
+
+    def test_queries(self):
+        # Only the page, which seeks along the favorite count index
+        with self.assertNumQueries(1):
+            self.client.get(reverse("most-favorited"))
@@ -83,6 +83,17 @@ class IngredientModelTest(TestCase):
         ingredient = Ingredient.objects.get(id=1)
         self.assertEqual(str(ingredient), "2 to 3 cloves Garlic, finely minced")
 
+    def test_quantity_is_parsed_on_save(self):
+        ingredient = Ingredient.objects.get(id=1)
+        self.assertEqual(
+            (ingredient.quantity, ingredient.quantity_max, ingredient.unit),
+            (2, 3, "cloves"),
+        )
+
+    def test_scaled(self):
+        ingredient = Ingredient.objects.get(id=1)
+        self.assertEqual(ingredient.scaled(2), "4-6 cloves Garlic, finely minced")
+
 
 class InstructionModelTest(TestCase):
     @classmethod
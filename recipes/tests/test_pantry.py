@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes import changes, pantry
+from recipes.models import Ingredient, Recipe
+from recipes.pantry import Bitmap
+
+
+class BitmapTest(SimpleTestCase):
+    def test_set_operations_across_sparse_and_dense_chunks(self):
+        evens = Bitmap(range(0, 200000, 2))
+        threes = Bitmap(range(0, 200000, 3))
+        sparse = Bitmap([6, 70000, 150000])
+        self.assertEqual(list(evens & threes), list(range(0, 200000, 6)))
+        both = set(range(0, 200000, 2)) | set(range(0, 200000, 3))
+        self.assertEqual(list(evens | threes), sorted(both))
+        self.assertEqual(list(sparse & evens), [6, 70000, 150000])
+        self.assertEqual(list(sparse & threes), [6, 150000])
+        self.assertIn(70000, evens)
+        self.assertNotIn(70001, evens)
+
+    def test_discard_empties_chunks(self):
+        bitmap = Bitmap([1, 70000])
+        bitmap.discard(70000)
+        bitmap.discard(1)
+        self.assertFalse(bitmap)
+        self.assertEqual(list(bitmap), [])
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class PantryIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def recipe(name, *ingredients):
+            recipe = Recipe.objects.create(name=name, servings=2)
+            for ingredient in ingredients:
+                Ingredient.objects.create(recipe=recipe, name=ingredient, amount="1")
+            return recipe
+
+        cls.omelette = recipe("Omelette", "Eggs", "Butter")
+        cls.pancakes = recipe("Pancakes", "Eggs", "Flour", "Milk", "Butter")
+        cls.toast = recipe("Toast", "Bread", "Butter")
+
+    def setUp(self):
+        cache.clear()
+        pantry._index = None
+
+    def match(self, *args, **kwargs):
+        return pantry.match(*args, **kwargs)
+
+    def test_ranks_by_missing_ingredients(self):
+        self.assertEqual(self.match(["egg", "butter"]), [(self.omelette.id, [])])
+        self.assertEqual(
+            self.match(["eggs", "Butter"], max_missing=2),
+            [
+                (self.omelette.id, []),
+                (self.toast.id, ["bread"]),
+                (self.pancakes.id, ["flour", "milk"]),
+            ],
+        )
+
+    def test_required_ingredients_are_intersected(self):
+        self.assertEqual(
+            self.match(["butter"], required=["bread"], max_missing=2),
+            [(self.toast.id, [])],
+        )
+        self.assertEqual(self.match(["butter"], required=["caviar"]), [])
+
+    def test_catches_up_with_published_changes(self):
+        index = pantry.get_index()
+        Ingredient.objects.filter(recipe=self.toast).delete()
+        Ingredient.objects.create(recipe=self.toast, name="Eggs", amount="2")
+        changes.publish(self.toast.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.match(["bread"]), [])
+        # Only the changed recipe is reloaded, into the same index
+        self.assertIs(pantry.get_index(), index)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('"recipe_id" IN (%d)' % self.toast.id, queries[0]["sql"])
+        self.assertEqual(self.match(["eggs"])[0], (self.toast.id, []))
+
+    def test_not_rebuilt_before_anything_changes(self):
+        # No recipe has been published since the cache was cleared
+        index = pantry.get_index()
+        with self.assertNumQueries(0):
+            self.assertIs(pantry.get_index(), index)
+
+    def test_matches_holding_the_lock(self):
+        # Other threads change the index's bitmaps holding the lock
+        locked = []
+
+        class RecordingIndex(pantry.PantryIndex):
+            def match(self, *args, **kwargs):
+                locked.append(pantry._lock.locked())
+                return super().match(*args, **kwargs)
+
+        pantry._index = RecordingIndex()
+        pantry._index.load()
+        pantry._index.generation = changes.current_generation()
+        self.assertEqual(self.match(["bread", "butter"]), [(self.toast.id, [])])
+        self.assertEqual(locked, [True])
+
+    def test_view_lists_matching_recipes(self):
+        response = self.client.get(
+            reverse("what-can-i-cook"), {"ingredients": "eggs, butter\nbread"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "recipes/what_can_i_cook.html")
+        self.assertEqual(
+            list(response.context["recipe_list"]), [self.omelette, self.toast]
+        )
@@ -0,0 +1,55 @@
+from fractions import Fraction
+
+from django.test import SimpleTestCase
+from recipes.quantities import Amount, format_amount, format_quantity, parse_amount
+
+
+class ParseAmountTest(SimpleTestCase):
+    def test_numbers(self):
+        self.assertEqual(parse_amount("2 eggs"), Amount(2, None, "eggs"))
+        self.assertEqual(parse_amount("1.5 lb"), Amount(Fraction(3, 2), None, "lb"))
+        self.assertEqual(parse_amount("400g"), Amount(400, None, "g"))
+
+    def test_fractions_and_mixed_numbers(self):
+        self.assertEqual(parse_amount("1/4 tsp"), Amount(Fraction(1, 4), None, "tsp"))
+        self.assertEqual(parse_amount("1 1/2 cup"), Amount(Fraction(3, 2), None, "cup"))
+        self.assertEqual(parse_amount("1½ cup"), Amount(Fraction(3, 2), None, "cup"))
+        self.assertEqual(
+            parse_amount("1-1/2 cups"), Amount(Fraction(3, 2), None, "cups")
+        )
+        self.assertEqual(
+            parse_amount("2-3/4-3 cups"), Amount(Fraction(11, 4), 3, "cups")
+        )
+        self.assertEqual(parse_amount("¾ cup"), Amount(Fraction(3, 4), None, "cup"))
+
+    def test_ranges(self):
+        self.assertEqual(parse_amount("2 to 3 cloves"), Amount(2, 3, "cloves"))
+        self.assertEqual(parse_amount("2-3"), Amount(2, 3, ""))
+        self.assertEqual(
+            parse_amount("1/2 – 3/4 cup"),
+            Amount(Fraction(1, 2), Fraction(3, 4), "cup"),
+        )
+        self.assertEqual(parse_amount("1 to ½ cup"), Amount(1, None, "cup"))
+
+    def test_units_starting_with_to(self):
+        self.assertEqual(parse_amount("2 tomatoes"), Amount(2, None, "tomatoes"))
+        self.assertEqual(parse_amount("2 tortillas"), Amount(2, None, "tortillas"))
+        self.assertEqual(parse_amount("1 to taste"), Amount(1, None, "to taste"))
+
+    def test_unparseable_amounts(self):
+        self.assertIsNone(parse_amount("a pinch"))
+        self.assertIsNone(parse_amount("1/0 cup"))
+        self.assertIsNone(parse_amount(""))
+
+
+class FormatAmountTest(SimpleTestCase):
+    def test_rounds_to_kitchen_fractions(self):
+        self.assertEqual(format_quantity(0.333333), "1/3")
+        self.assertEqual(format_quantity(2.5), "2 1/2")
+        self.assertEqual(format_quantity(1.99), "2")
+        self.assertEqual(format_quantity(Fraction(3, 16)), "1/8")
+
+    def test_format_amount(self):
+        self.assertEqual(format_amount(Fraction(3, 2), None, "cups"), "1 1/2 cups")
+        self.assertEqual(format_amount(4, 6, "cloves"), "4-6 cloves")
+        self.assertEqual(format_amount(3, None, ""), "3")
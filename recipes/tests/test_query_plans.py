@@ -0,0 +1,108 @@
+import re
+from unittest import skipUnless
+
+from accounts.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes.models import Ingredient, Instruction, Recipe
+
+# A plan step that reads a whole table or index, rather than seeking into one
+FULL_SCAN_RE = re.compile(r"^SCAN (?!CONSTANT ROW)")
+# A plan step that sorts the rows itself, because no index is in the right order
+SORT_RE = re.compile(r"^USE TEMP B-TREE FOR (ORDER|GROUP) BY")
+
+
+@skipUnless(connection.vendor == "sqlite", "Reads SQLite query plans")
+class QueryPlanTestMixin:
+    """
+    Mixin for tests that check the queries a view makes are all served by indexes,
+    by running EXPLAIN QUERY PLAN on every SELECT the view sends.
+    """
+
+    def query_plans(self, queries):
+        with connection.cursor() as cursor:
+            for query in queries:
+                if not query["sql"].startswith("SELECT"):
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                yield query["sql"], [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, method, url, data=None, scans=()):
+        """
+        Request url and fail if any of its queries scans or sorts a table, other
+        than with the plan steps in scans.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+        self.assertLess(response.status_code, 400)
+        for sql, plan in self.query_plans(queries.captured_queries):
+            for step in plan:
+                if step in scans:
+                    continue
+                if FULL_SCAN_RE.match(step) or SORT_RE.match(step):
+                    self.fail("%s\nis planned as:\n%s" % (sql, "\n".join(plan)))
+        return response
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class RecipeQueryPlanTest(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        other = User.objects.create_user(username="testuser2", password="2X<ISRUkw")
+        for number in range(30):
+            recipe = Recipe.objects.create(
+                name="Recipe %02d" % number,
+                description="A recipe.",
+                servings=4,
+                author=cls.user if number % 2 else other,
+            )
+            Ingredient.objects.create(recipe=recipe, name="Flour", amount="1 cup")
+            for step_number in (2, 1):
+                Instruction.objects.create(
+                    recipe=recipe, step_number=step_number, description="Stir."
+                )
+        cls.user.favorite_recipes.add(*Recipe.objects.all()[:5])
+        cls.recipe = Recipe.objects.first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+
+    def test_my_recipes(self):
+        response = self.assertIndexed("get", reverse("my-recipes"))
+        self.assertIndexed("get", response.context["page_nav"]["next"])
+
+    def test_all_recipes(self):
+        # The first page reads along the name index, stopping at the page's LIMIT
+        response = self.assertIndexed(
+            "get",
+            reverse("all-recipes"),
+            scans={"SCAN recipes_recipe USING INDEX recipe_name_idx"},
+        )
+        self.assertIndexed("get", response.context["page_nav"]["next"])
+
+    def test_most_favorited(self):
+        self.assertIndexed("get", reverse("most-favorited"))
+
+    def test_recipe_detail(self):
+        self.assertIndexed("get", reverse("recipe-detail", args=[self.recipe.id]))
+
+    def test_update_instruction(self):
+        instruction = self.recipe.instruction_set.get(step_number=1)
+        url = reverse("update-instruction", args=[instruction.id])
+        next_url = reverse("recipe-detail", args=[self.recipe.id])
+        Recipe.objects.filter(pk=self.recipe.pk).update(author=self.user)
+        # Checking that the step number is free looks up (recipe, step_number)
+        self.assertIndexed(
+            "post",
+            "%s?next=%s" % (url, next_url),
+            {"step_number": 3, "description": "Stir again."},
+        )
@@ -0,0 +1,175 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes import changes, search
+from recipes.models import Ingredient, Instruction, Recipe
+from recipes.text import tokenize
+
+
+class TokenizeTest(TestCase):
+    def test_lowercases_stems_and_drops_stop_words(self):
+        self.assertEqual(
+            tokenize("Roast the Tomatoes and Potatoes with BERRIES"),
+            ["roast", "tomato", "potato", "berry"],
+        )
+
+    def test_empty_text(self):
+        self.assertEqual(tokenize(None), [])
+        self.assertEqual(tokenize(""), [])
+
+
+class SearchIndexTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.index_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.index_dir)
+        settings_override = override_settings(SEARCH_INDEX_DIR=self.index_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class SearchIndexTest(SearchIndexTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pizza = Recipe.objects.create(
+            name="Pizza", description="A crisp, thin crust.", servings=8
+        )
+        Ingredient.objects.create(recipe=cls.pizza, name="Mozzarella", amount="1 lb.")
+        Instruction.objects.create(
+            recipe=cls.pizza, step_number=1, description="Stretch the dough."
+        )
+        cls.calzone = Recipe.objects.create(
+            name="Calzone", description="A folded pizza.", servings=2
+        )
+        Ingredient.objects.create(recipe=cls.calzone, name="Ricotta", amount="1 cup")
+        cls.salad = Recipe.objects.create(
+            name="Salad", description="Tomatoes and greens.", servings=4
+        )
+
+    def setUp(self):
+        super().setUp()
+        call_command("build_search_index", stdout=StringIO())
+
+    def test_matches_every_field(self):
+        self.assertEqual(search.search("mozzarella"), [self.pizza.id])
+        self.assertEqual(search.search("dough"), [self.pizza.id])
+        self.assertEqual(search.search("tomato"), [self.salad.id])
+        self.assertEqual(search.search("nothing like it"), [])
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(search.search("pizza"), [self.pizza.id, self.calzone.id])
+
+    def test_delta_replaces_and_deletes_documents(self):
+        index = search.get_index()
+        # Another process, which learns of the changes through the feed too
+        other = search.SearchIndex(self.index_dir)
+        Ingredient.objects.create(recipe=self.salad, name="Mozzarella", amount="4 oz.")
+        # Published on commit, which a TestCase's transaction never reaches
+        changes.publish(self.salad.id)
+        self.assertCountEqual(
+            search.search("mozzarella"), [self.pizza.id, self.salad.id]
+        )
+
+        Recipe.objects.filter(pk=self.pizza.id).delete()
+        changes.publish(self.pizza.id)
+        self.assertEqual(search.search("mozzarella"), [self.salad.id])
+        self.assertEqual(other.search("mozzarella", 10), [self.salad.id])
+        self.assertEqual(index.delta_size(), 2)
+
+        # Rebuilding merges the delta into the main segment
+        index.rebuild()
+        self.assertEqual(index.delta_size(), 0)
+        self.assertEqual(search.search("mozzarella"), [self.salad.id])
+        self.assertEqual(index.delta, {})
+
+    def test_reads_recent_recipes_when_feed_is_lost(self):
+        search.search("mozzarella")
+        Ingredient.objects.create(recipe=self.salad, name="Mozzarella", amount="4 oz.")
+        cache.clear()
+        self.assertCountEqual(
+            search.search("mozzarella"), [self.pizza.id, self.salad.id]
+        )
+
+    def test_rebuilds_once_enough_has_changed(self):
+        changes.publish(self.salad.id)
+        out = StringIO()
+        call_command("build_search_index", "--min-delta", "2", stdout=out)
+        self.assertIn("Only 1 recipes changed", out.getvalue())
+        changes.publish(self.pizza.id)
+        call_command("build_search_index", "--min-delta", "2", stdout=out)
+        self.assertIn("Indexed 3 recipes", out.getvalue())
+
+    def test_search_view(self):
+        response = self.client.get(reverse("search") + "?q=pizza")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "recipes/search_results.html")
+        self.assertEqual(
+            list(response.context["recipe_list"]), [self.pizza, self.calzone]
+        )
+
+
+class SearchSignalTest(SearchIndexTestMixin, TransactionTestCase):
+    def test_saves_and_deletes_update_the_delta(self):
+        call_command("build_search_index", stdout=StringIO())
+        recipe = Recipe.objects.create(name="Soup", description="Warm.", servings=2)
+        Ingredient.objects.create(recipe=recipe, name="Leeks", amount="2")
+        self.assertEqual(search.search("leek"), [recipe.id])
+
+        recipe.delete()
+        self.assertEqual(search.search("leek"), [])
+
+    def test_writes_are_brought_up_to_date_once_per_transaction(self):
+        call_command("build_search_index", stdout=StringIO())
+        recipe = Recipe.objects.create(name="Soup", description="Warm.", servings=2)
+        generation = changes.current_generation()
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                for number in range(5):
+                    Ingredient.objects.create(
+                        recipe=recipe, name="Leek %d" % number, amount="1"
+                    )
+                    Instruction.objects.create(
+                        recipe=recipe, step_number=number, description="Stir."
+                    )
+        updates = [q for q in queries.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(changes.current_generation(), generation + 1)
+        self.assertEqual(search.search("leek"), [recipe.id])
+        self.assertEqual(list(search.get_index().delta), [recipe.id])
+
+        # Deleting the recipe along with its ingredients and instructions
+        recipe.delete()
+        self.assertEqual(changes.current_generation(), generation + 2)
+        self.assertEqual(search.search("leek"), [])
+
+    def test_rolled_back_writes_are_forgotten(self):
+        recipe = Recipe.objects.create(name="Soup", servings=2)
+        updated_at = Recipe.objects.get(pk=recipe.pk).updated_at
+        generation = changes.current_generation()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                Ingredient.objects.create(recipe=recipe, name="Leeks", amount="2")
+                raise ValueError
+        self.assertEqual(changes.current_generation(), generation)
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    Ingredient.objects.create(recipe=recipe, name="Leeks", amount="2")
+                    raise ValueError
+            except ValueError:
+                pass
+            # The rolled back savepoint took the first update with it
+            Ingredient.objects.create(recipe=recipe, name="Onion", amount="1")
+        self.assertGreater(Recipe.objects.get(pk=recipe.pk).updated_at, updated_at)
+        self.assertEqual(changes.current_generation(), generation + 1)
@@ -0,0 +1,181 @@
+import random
+
+from django.core.cache import cache
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from recipes import changes, similar
+from recipes.models import Ingredient, Recipe
+from recipes.similar import SimilarityIndex
+
+
+class SimilarityIndexTest(SimpleTestCase):
+    def test_ranks_by_shared_ingredients(self):
+        index = SimilarityIndex()
+        index.set_recipe(1, {"egg", "butter", "flour", "milk"}, "Pancakes")
+        index.set_recipe(2, {"egg", "butter", "flour", "milk", "sugar"}, "Crepes")
+        index.set_recipe(3, {"egg", "butter", "flour", "milk"}, "Batter")
+        index.set_recipe(4, {"bread", "cheese"}, "Cheese on toast")
+        self.assertEqual(index.similar(1), [(3, "Batter"), (2, "Crepes")])
+        self.assertEqual(index.similar(4), [])
+        self.assertEqual(index.similar(5), [])
+
+    def test_signatures_are_stable(self):
+        names = {"egg", "butter", "flour"}
+        self.assertEqual(
+            SimilarityIndex().band_keys(names), SimilarityIndex().band_keys(names)
+        )
+
+    def test_finds_similar_recipes_among_many(self):
+        rng = random.Random(1)
+        vocabulary = ["ingredient %d" % number for number in range(500)]
+        index = SimilarityIndex()
+        pairs = []
+        for recipe_id in range(0, 2000, 2):
+            names = set(rng.sample(vocabulary, 10))
+            # A variant sharing 9 of its 10 ingredients, a Jaccard similarity of 0.82
+            variant = set(rng.sample(sorted(names), 9)) | {"extra %d" % recipe_id}
+            index.set_recipe(recipe_id, names, "Recipe")
+            index.set_recipe(recipe_id + 1, variant, "Variant")
+            pairs.append((recipe_id, recipe_id + 1))
+        found = sum(
+            (variant, "Variant") in index.similar(recipe_id)
+            for recipe_id, variant in pairs
+        )
+        self.assertGreater(found, 0.95 * len(pairs))
+
+    def test_removing_recipes_empties_buckets(self):
+        index = SimilarityIndex()
+        index.set_recipe(1, {"egg", "butter"}, "Omelette")
+        index.set_recipe(2, {"egg", "butter"}, "Scrambled eggs")
+        index.set_recipe(1, {"bread"}, "Toast")
+        self.assertEqual(index.similar(2), [])
+        index.set_recipe(1, None)
+        index.set_recipe(2, set())
+        self.assertEqual(index.recipes, {})
+        self.assertFalse(any(index.buckets))
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class SimilarRecipesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        def recipe(name, *ingredients):
+            recipe = Recipe.objects.create(name=name, servings=2)
+            for ingredient in ingredients:
+                Ingredient.objects.create(recipe=recipe, name=ingredient, amount="1")
+            return recipe
+
+        cls.omelette = recipe("Omelette", "Eggs", "Butter", "Salt")
+        cls.scrambled = recipe("Scrambled eggs", "Egg", "butter", "Salt", "Milk")
+        cls.toast = recipe("Toast", "Bread", "Butter")
+
+    def setUp(self):
+        cache.clear()
+        similar._index = None
+        self.addCleanup(setattr, similar, "_index", None)
+
+    def test_loads_normalized_ingredients(self):
+        index = similar.get_index()
+        self.assertEqual(
+            index.similar(self.omelette.id), [(self.scrambled.id, "Scrambled eggs")]
+        )
+        # The feed is started on first use, so the index isn't rebuilt again
+        with self.assertNumQueries(0):
+            similar.get_index()
+
+    def test_catches_up_with_published_changes(self):
+        similar.get_index()
+        Ingredient.objects.filter(recipe=self.toast).delete()
+        for name in ("Eggs", "Butter", "Salt"):
+            Ingredient.objects.create(recipe=self.toast, name=name, amount="1")
+        changes.publish(self.toast.id)
+        with self.assertNumQueries(1):
+            index = similar.get_index()
+        self.assertEqual(index.similar(self.omelette.id)[0], (self.toast.id, "Toast"))
+
+    def test_similar_holding_the_lock(self):
+        # Other threads change the index's buckets holding the lock
+        locked = []
+
+        class RecordingIndex(SimilarityIndex):
+            def similar(self, *args, **kwargs):
+                locked.append(similar._lock.locked())
+                return super().similar(*args, **kwargs)
+
+        similar._index = RecordingIndex()
+        similar._index.load()
+        similar._index.generation = changes.current_generation()
+        self.assertEqual(
+            similar.similar(self.omelette.id), [(self.scrambled.id, "Scrambled eggs")]
+        )
+        self.assertEqual(locked, [True])
+
+    @override_settings(SIMILAR_RECIPES_BACKGROUND_BUILD=False)
+    def test_detail_page_doesnt_build_on_the_request(self):
+        response = self.client.get(reverse("recipe-detail", args=[self.omelette.id]))
+        self.assertEqual(response.context["similar_recipes"], [])
+        self.assertNotContains(response, "You might also like")
+        self.assertIsNone(similar._index)
+
+    def test_detail_page_lists_similar_recipes(self):
+        similar.get_index()
+        url = reverse("recipe-detail", args=[self.omelette.id])
+        response = self.client.get(url)
+        self.assertEqual(
+            response.context["similar_recipes"],
+            [(self.scrambled.id, "Scrambled eggs")],
+        )
+        self.assertContains(response, "You might also like")
+        self.assertContains(response, self.scrambled.get_absolute_url())
+
+        # The page changes when which recipes are similar does
+        etag = response["ETag"]
+        Recipe.objects.filter(pk=self.scrambled.pk).update(name="Eggs")
+        changes.publish(self.scrambled.id)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, ">Eggs</a>")
+
+
+@override_settings(SIMILAR_RECIPES_BACKGROUND_BUILD=True)
+class SimilarBackgroundBuildTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        similar._index = None
+        self.addCleanup(setattr, similar, "_index", None)
+        self.omelette = Recipe.objects.create(name="Omelette", servings=2)
+        self.scrambled = Recipe.objects.create(name="Scrambled eggs", servings=2)
+        for recipe in (self.omelette, self.scrambled):
+            for name in ("Eggs", "Butter", "Salt"):
+                Ingredient.objects.create(recipe=recipe, name=name, amount="1")
+
+    def wait_for_build(self):
+        similar._builder.join(timeout=10)
+        self.assertFalse(similar._builder.is_alive())
+
+    def test_builds_in_the_background(self):
+        self.assertEqual(similar.similar(self.omelette.id), [])
+        self.wait_for_build()
+        self.assertEqual(
+            similar.similar(self.omelette.id), [(self.scrambled.id, "Scrambled eggs")]
+        )
+
+    def test_serves_the_old_index_while_rebuilding(self):
+        index = similar.get_index()
+        # Without the feed, the index can't tell what has changed
+        cache.clear()
+        self.assertEqual(
+            similar.similar(self.omelette.id), [(self.scrambled.id, "Scrambled eggs")]
+        )
+        self.wait_for_build()
+        self.assertIsNot(similar._index, index)
+        self.assertEqual(
+            similar.similar(self.omelette.id), [(self.scrambled.id, "Scrambled eggs")]
+        )
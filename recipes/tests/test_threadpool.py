@@ -0,0 +1,156 @@
+import asyncio
+import csv
+import threading
+from io import StringIO
+
+from accounts.models import User
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncRequestFactory, TransactionTestCase, override_settings
+from django.urls import include, path
+from recipes.models import Recipe
+from recipes.views import (
+    ExportRecipesView,
+    IndexView,
+    RecipeDetailView,
+    RecipeListView,
+)
+
+from cookery_bookery.tests.test_middleware import TIMING_RE
+
+from .test_search import SearchIndexTestMixin
+
+urlpatterns = [
+    path("async/", IndexView.as_async_view(), name="async-index"),
+    path("async/recipes/", RecipeListView.as_async_view(), name="async-all-recipes"),
+    path(
+        "async/recipes/<int:pk>",
+        RecipeDetailView.as_async_view(),
+        name="async-recipe-detail",
+    ),
+    path("async/export/", ExportRecipesView.as_async_view(), name="async-export"),
+    path("", include("cookery_bookery.urls")),
+]
+
+
+class ThreadNameView(RecipeDetailView):
+    """ Records the threads the view runs and renders on. """
+
+    def get_context_data(self, **kwargs):
+        self.request.threads.append(threading.current_thread().name)
+        context = super().get_context_data(**kwargs)
+        context["ingredients"] = self.record_thread(context["ingredients"])
+        return context
+
+    def record_thread(self, items):
+        # Evaluated while the template renders
+        self.request.threads.append(threading.current_thread().name)
+        yield from items
+
+
+# The views' queries run on the pool's own connections, which can't see the
+# uncommitted data of a TestCase
+@override_settings(
+    ROOT_URLCONF=__name__,
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class AsyncViewTest(SearchIndexTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        self.recipe = Recipe.objects.create(
+            name="Pizza", description="Cheesy.", servings=8, author=self.user
+        )
+
+    def test_as_view(self):
+        self.assertFalse(asyncio.iscoroutinefunction(RecipeListView.as_view()))
+        with self.settings(ASYNC_VIEWS=True):
+            view = RecipeListView.as_view()
+        self.assertTrue(asyncio.iscoroutinefunction(view))
+        self.assertIs(view.view_class, RecipeListView)
+
+    async def test_detail(self):
+        url = "/async/recipes/%d" % self.recipe.id
+        response = await self.async_client.get(url)
+        self.assertContains(response, "Pizza")
+        # Queries on the pool's threads are still counted, and rendering is timed
+        timing = response["Server-Timing"]
+        self.assertEqual(TIMING_RE.match(timing).group(1), "3")
+        self.assertIn("render;dur=", timing)
+
+        # The async client sends extra arguments as they are, as header names
+        response = await self.async_client.get(
+            url, **{"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_list_and_index(self):
+        for url in ("/async/", "/async/recipes/"):
+            response = await self.async_client.get(url)
+            self.assertContains(response, "Pizza")
+
+    async def test_runs_on_pool(self):
+        view = ThreadNameView.as_async_view()
+        request = AsyncRequestFactory().get("/")
+        request.user = AnonymousUser()
+        request.threads = []
+        response = await view(request, pk=self.recipe.id)
+        self.assertFalse(response.is_rendered)
+        await response.render()
+        self.assertContains(response, "Pizza")
+        self.assertEqual(len(request.threads), 2)
+        for name in request.threads:
+            self.assertTrue(name.startswith("views"))
+
+    async def asgi_get(self, path, query_string=b"", headers=()):
+        """
+        Send a GET request through Django's ASGI handler, which sends streamed
+        responses from the event loop, unlike the async test client.
+        """
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "query_string": query_string,
+            "headers": [(b"host", b"testserver"), *headers],
+        }
+        communicator = ApplicationCommunicator(ASGIHandler(), scope)
+        await communicator.send_input({"type": "http.request"})
+        start = await communicator.receive_output(timeout=5)
+        body = b""
+        while True:
+            message = await communicator.receive_output(timeout=5)
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await communicator.wait()
+        return start, body
+
+    def test_export_under_asgi(self):
+        User.objects.create_user(
+            username="staff", password="1X<ISRUkw+tuK", is_staff=True
+        )
+        self.client.login(username="staff", password="1X<ISRUkw+tuK")
+        cookie = "sessionid=%s" % self.client.cookies["sessionid"].value
+        with self.settings(ASYNC_VIEWS=True):
+            start, body = asyncio.run(
+                self.asgi_get(
+                    "/async/export/", b"format=csv", [(b"cookie", cookie.encode())]
+                )
+            )
+        self.assertEqual(start["status"], 200)
+        headers = dict(start["headers"])
+        self.assertEqual(headers[b"Content-Type"], b"text/csv")
+        self.assertEqual(
+            headers[b"Content-Disposition"], b'attachment; filename="recipes.csv"'
+        )
+        rows = list(csv.reader(StringIO(body.decode())))
+        self.assertEqual([row[1] for row in rows], ["name", "Pizza"])
@@ -1,8 +1,12 @@
 from accounts.models import User
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from recipes import fragments, home
 from recipes.models import Ingredient, Instruction, Recipe
+from recipes.pagination import KeysetPage, KeysetPaginator
+from recipes.views import RecipeListView
 
 
 class IndexViewTest(TestCase):
@@ -29,6 +33,10 @@ class IndexViewTest(TestCase):
             description="Description",
             servings=2
             )
+
+    def setUp(self):
+        # Build the home page layout from this test's recipes
+        cache.clear()
    
     def test_view_url_exists_at_desired_location(self):
         response = self.client.get("/recipes/")
@@ -66,6 +74,37 @@ class IndexViewTest(TestCase):
         longest_name = max(newest_recipes, key=lambda r : len(r.name))
         self.assertEqual(longest_name.name, "This is the Recipe with the Longest Name")
 
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class IndexLayoutCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for recipe_id in range(12):
+            Recipe.objects.create(
+                name=f"Recipe {recipe_id}", description="Description", servings=2
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_layout_needs_no_queries(self):
+        self.client.get(reverse("index"))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("index"))
+        self.assertEqual(len(response.context["newest_recipes"]), 10)
+
+    def test_invalidate_rebuilds_layout(self):
+        self.client.get(reverse("index"))
+        Recipe.objects.create(name="Brand New", description="Fresh", servings=2)
+        response = self.client.get(reverse("index"))
+        self.assertNotContains(response, "Brand New")
+        home.invalidate()
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, "Brand New")
+
+
 class RecipeListViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -103,6 +142,297 @@ class RecipeListViewTest(TestCase):
         self.assertTrue(len(response.context["recipe_list"]) == 5)
 
 
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class FavoritesContextTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Create a test user who has favorited many recipes
+        cls.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        number_of_recipes = 30
+        for recipe_id in range(number_of_recipes):
+            recipe = Recipe.objects.create(
+                name=f"Recipe {recipe_id:02}", servings=2, author=cls.user
+            )
+            if recipe_id % 2 == 0:
+                cls.user.favorite_recipes.add(recipe)
+
+    def setUp(self):
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+
+    def test_favorite_ids_only_include_recipes_on_page(self):
+        response = self.client.get(reverse("all-recipes"))
+        self.assertEqual(response.status_code, 200)
+        page_ids = {recipe.id for recipe in response.context["recipe_list"]}
+        favorite_ids = response.context["favorite_ids"]
+        self.assertTrue(favorite_ids <= page_ids)
+        self.assertEqual(len(favorite_ids), 5)
+
+    def test_list_query_count_is_fixed(self):
+        # Page and favorites on page, with the session, user and validators cached
+        with self.assertNumQueries(2):
+            self.client.get(reverse("all-recipes"))
+        # Page and favorites on page
+        with self.assertNumQueries(2):
+            self.client.get(reverse("my-recipes"))
+
+    def test_detail_favorite_state(self):
+        favorite = Recipe.objects.get(name="Recipe 00")
+        other = Recipe.objects.get(name="Recipe 01")
+        response = self.client.get(reverse("recipe-detail", args=[favorite.id]))
+        self.assertEqual(response.context["favorite_ids"], {favorite.id})
+        response = self.client.get(reverse("recipe-detail", args=[other.id]))
+        self.assertEqual(response.context["favorite_ids"], set())
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Create test recipes, some sharing a name to exercise the id tie-breaker
+        number_of_recipes = 35
+        for recipe_id in range(number_of_recipes):
+            Recipe.objects.create(name=f"Recipe {recipe_id % 20:02}", servings=2)
+
+    def walk(self, response, direction):
+        pages = [response.context["recipe_list"]]
+        while response.context["page_nav"][direction]:
+            response = self.client.get(response.context["page_nav"][direction])
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.context["recipe_list"])
+        return response, pages
+
+    def test_cursors_walk_every_recipe_in_order(self):
+        response = self.client.get(reverse("all-recipes"))
+        response, pages = self.walk(response, "next")
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 5])
+        self.assertEqual(response.context["page_obj"].number, 4)
+        recipes = [recipe.id for page in pages for recipe in page]
+        expected = list(Recipe.objects.values_list("id", flat=True))
+        self.assertEqual(recipes, expected)
+
+        # Walking back again ends on the first page
+        response, pages = self.walk(response, "previous")
+        self.assertEqual(response.context["page_obj"].number, 1)
+        recipes = [recipe.id for page in reversed(pages) for recipe in page]
+        self.assertEqual(recipes, expected)
+
+    def test_deep_pages_do_not_count_rows(self):
+        response = self.client.get(reverse("all-recipes"))
+        response = self.client.get(response.context["page_nav"]["next"])
+        next_url = response.context["page_nav"]["next"]
+        # Only the page itself, with the conditional GET validators cached
+        with self.assertNumQueries(1):
+            response = self.client.get(next_url)
+        self.assertEqual(response.context["page_obj"].number, 3)
+
+    def test_page_nav_omits_missing_cursors(self):
+        view = RecipeListView()
+        view.request = RequestFactory().get(reverse("all-recipes"))
+        # A page that came back empty, with nothing to point back from
+        paginator = KeysetPaginator(Recipe.objects.all(), 10)
+        page = KeysetPage([], 3, paginator, next_cursor="next", previous_cursor=None)
+        links = view.get_page_nav(page)["links"]
+        self.assertEqual(links[1]["url"], reverse("all-recipes") + "?")
+        self.assertEqual(links[3]["url"], reverse("all-recipes") + "?cursor=next")
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(reverse("all-recipes") + "?cursor=garbage")
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_nav_is_windowed(self):
+        response = self.client.get(reverse("all-recipes") + "?page=1")
+        numbers = [link["number"] for link in response.context["page_nav"]["links"]]
+        self.assertEqual(numbers, [1, 2, 3, 4])
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        cls.recipe = Recipe.objects.create(name="Pizza", servings=8)
+        Recipe.objects.create(name="Pasta", servings=4)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail_not_modified(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        response = self.client.get(url)
+        etag = response["ETag"]
+        # Only the recipe is looked up to check the validators
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_changes_when_favorited(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        response = self.client.get(url)
+        self.assertFalse(response.has_header("Last-Modified"))
+        etag = response["ETag"]
+        # Favoriting changes the count shown, but not the recipe's updated_at
+        self.user.favorite_recipes.add(self.recipe)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_changes_with_ingredients(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        etag = self.client.get(url)["ETag"]
+        Ingredient.objects.create(recipe=self.recipe, name="Flour", amount="1 cup")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_changes_when_recipe_deleted(self):
+        url = reverse("all-recipes")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Recipe.objects.filter(name="Pasta").delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_changes_when_author_renamed(self):
+        url = reverse("all-recipes")
+        Recipe.objects.filter(pk=self.recipe.pk).update(author=self.user)
+        etag = self.client.get(url)["ETag"]
+        user = User.objects.get(pk=self.user.pk)
+        user.username = "testuser2"
+        user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        # The recipe card is cached, but under a version the rename changed
+        self.assertContains(response, "By testuser2")
+        self.assertNotContains(response, "By testuser1")
+
+    def test_list_changes_when_author_deleted(self):
+        url = reverse("all-recipes")
+        Recipe.objects.filter(pk=self.recipe.pk).update(author=self.user)
+        self.assertContains(self.client.get(url), "By testuser1")
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertNotContains(self.client.get(url), "By testuser1")
+
+    def test_index_not_modified_without_queries(self):
+        etag = self.client.get(reverse("index"))["ETag"]
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("index"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_are_personal_to_users(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        anonymous_etag = self.client.get(url)["ETag"]
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Last-Modified"))
+        # Favoriting the recipe changes the heart on the page
+        self.user.favorite_recipes.add(self.recipe)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class FavoritesViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        cls.recipes = [
+            Recipe.objects.create(name="Recipe %d" % i, servings=2) for i in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+
+    def post_json(self, data):
+        return self.client.post(
+            reverse("favorites"), data, HTTP_ACCEPT="application/json"
+        )
+
+    def test_toggle(self):
+        recipe = self.recipes[0]
+        response = self.post_json({"recipe": recipe.id})
+        self.assertEqual(response.json(), {"recipe": recipe.id, "favorited": True})
+        self.assertTrue(self.user.favorite_recipes.filter(pk=recipe.id).exists())
+        response = self.post_json({"recipe": recipe.id})
+        self.assertEqual(response.json(), {"recipe": recipe.id, "favorited": False})
+        self.assertFalse(self.user.favorite_recipes.exists())
+
+    def test_toggle_queries(self):
+        # Savepoint, locking the user, state, insert, favorite count and release
+        with self.assertNumQueries(6):
+            self.post_json({"recipe": self.recipes[0].id})
+
+    def test_toggle_missing_recipe(self):
+        response = self.post_json({"recipe": 0})
+        self.assertEqual(response.status_code, 404)
+        response = self.post_json({"recipe": "pizza"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_add_and_remove(self):
+        self.user.favorite_recipes.add(self.recipes[0])
+        ids = ",".join(str(recipe.id) for recipe in self.recipes)
+        response = self.post_json({"action": "add", "recipes": ids + ",0"})
+        # Only recipes that exist and weren't favorites already change
+        self.assertEqual(
+            response.json(),
+            {"action": "add", "changed": [self.recipes[1].id, self.recipes[2].id]},
+        )
+        self.assertEqual(self.user.favorite_recipes.count(), 3)
+        response = self.post_json(
+            {"action": "remove", "recipes": [self.recipes[0].id, self.recipes[1].id]}
+        )
+        self.assertEqual(
+            response.json(),
+            {"action": "remove", "changed": [self.recipes[0].id, self.recipes[1].id]},
+        )
+        self.assertEqual(list(self.user.favorite_recipes.all()), [self.recipes[2]])
+
+    def test_bad_action(self):
+        response = self.post_json({"action": "shuffle", "recipes": "1"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_changes_detail_etag(self):
+        url = reverse("recipe-detail", args=[self.recipes[0].id])
+        etag = self.client.get(url)["ETag"]
+        self.post_json({"recipe": self.recipes[0].id})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["favorite_ids"], {self.recipes[0].id})
+
+    def test_redirects_without_json(self):
+        url = reverse("recipe-detail", args=[self.recipes[0].id])
+        response = self.client.post(
+            reverse("favorites"), {"recipe": self.recipes[0].id, "next": url}
+        )
+        self.assertRedirects(response, url)
+        response = self.client.post(
+            reverse("favorites"),
+            {"recipe": self.recipes[0].id, "next": "https://example.com/"},
+        )
+        self.assertRedirects(response, reverse("my-favorites"))
+
+    def test_login_and_post_required(self):
+        self.assertEqual(self.client.get(reverse("favorites")).status_code, 405)
+        self.client.logout()
+        response = self.post_json({"recipe": self.recipes[0].id})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.user.favorite_recipes.exists())
+
+
 class RecipeDetailViewTest(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -122,6 +452,115 @@ class RecipeDetailViewTest(TestCase):
         self.assertTemplateUsed(response, "recipes/recipe_detail.html")
 
 
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class RecipeContentsQueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Create a test recipe with several ingredients and instructions
+        test_user1 = User.objects.create_user(
+            username="testuser1", password="1X<ISRUkw+tuK"
+        )
+        cls.recipe = Recipe.objects.create(name="Pizza", servings=8, author=test_user1)
+        for number in range(1, 11):
+            Ingredient.objects.create(
+                recipe=cls.recipe, name=f"Ingredient {number}", amount="1 cup"
+            )
+            Instruction.objects.create(
+                recipe=cls.recipe, step_number=11 - number, description="Stir."
+            )
+
+    def setUp(self):
+        # Render the recipe's fragments from scratch
+        cache.clear()
+
+    def test_detail_query_count_is_fixed(self):
+        # Recipe with author, ingredients and instructions
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("recipe-detail", args=[self.recipe.id]))
+        self.assertEqual(response.status_code, 200)
+        instructions = response.context["recipe"].instruction_set.all()
+        self.assertEqual([i.step_number for i in instructions], list(range(1, 11)))
+
+    def test_form_pages_query_count_is_fixed(self):
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+        # Recipe with author and ingredients, with the session and user cached
+        with self.assertNumQueries(2):
+            self.client.get(reverse("add-ingredient", args=[self.recipe.id]))
+        # Recipe with author, ingredients and instructions
+        with self.assertNumQueries(3):
+            self.client.get(reverse("add-instruction", args=[self.recipe.id]))
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class ServingsScalingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(name="Pizza", servings=4)
+        Ingredient.objects.create(recipe=cls.recipe, name="Flour", amount="1 1/2 cups")
+        Ingredient.objects.create(recipe=cls.recipe, name="Salt", amount="a pinch")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ingredients_are_scaled(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        response = self.client.get(url + "?servings=6")
+        self.assertContains(response, "SERVES SIX")
+        self.assertContains(response, "2 1/4 cups Flour")
+        self.assertContains(response, "a pinch Salt")
+        # Each number of servings is cached separately
+        response = self.client.get(url)
+        self.assertContains(response, "1 1/2 cups Flour")
+
+    def test_invalid_servings_are_ignored(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        for servings in ("0", "many", "1000"):
+            response = self.client.get(url, {"servings": servings})
+            self.assertContains(response, "SERVES FOUR")
+
+
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            name="Pizza", description="Cheesy", servings=8
+        )
+        Ingredient.objects.create(recipe=cls.recipe, name="Flour", amount="1 cup")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail_body_is_served_from_cache(self):
+        url = reverse("recipe-detail", args=[self.recipe.id])
+        self.client.get(url)
+        # Only the recipe itself is loaded once its body is cached
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, "Flour")
+
+    def test_new_version_renders_fresh_fragments(self):
+        detail_url = reverse("recipe-detail", args=[self.recipe.id])
+        for url in (detail_url, reverse("all-recipes")):
+            self.client.get(url)
+        # Bypass the signals, so the cached fragments go stale...
+        Recipe.objects.filter(pk=self.recipe.pk).update(description="Crispy")
+        for url in (detail_url, reverse("all-recipes")):
+            self.assertContains(self.client.get(url), "Cheesy")
+        # ...until the recipe's version is bumped
+        fragments.bump_version(self.recipe.id)
+        for url in (detail_url, reverse("all-recipes")):
+            response = self.client.get(url)
+            self.assertContains(response, "Crispy")
+            self.assertNotContains(response, "Cheesy")
+
+
 class MyRecipesListViewTest(TestCase):
     def setUp(self):
         # Create test users
@@ -234,6 +673,85 @@ class RecipeCreateViewTest(TestCase):
         self.assertEqual(recipe.author, user)
 
 
+@override_settings(
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+)
+class FullRecipeCreateViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username="testuser1", password="1X<ISRUkw+tuK")
+
+    def setUp(self):
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+
+    def post_data(self, ingredients, instructions, **recipe):
+        data = {
+            "name": "pizza",
+            "description": "Cheesy",
+            "servings": "4",
+            "nota_bene": "",
+            "ingredients-TOTAL_FORMS": str(len(ingredients) + 1),
+            "ingredients-INITIAL_FORMS": "0",
+            "instructions-TOTAL_FORMS": str(len(instructions) + 1),
+            "instructions-INITIAL_FORMS": "0",
+        }
+        data.update(recipe)
+        # The trailing blank rows are ignored
+        for number, (amount, name) in enumerate(ingredients):
+            data[f"ingredients-{number}-amount"] = amount
+            data[f"ingredients-{number}-name"] = name
+        for number, (step_number, description) in enumerate(instructions):
+            data[f"instructions-{number}-step_number"] = step_number
+            data[f"instructions-{number}-description"] = description
+        return data
+
+    def test_form_has_blank_rows(self):
+        response = self.client.get(reverse("create-full-recipe"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["ingredient_formset"].forms), 15)
+        self.assertEqual(len(response.context["instruction_formset"].forms), 10)
+
+    def test_creates_recipe_with_contents(self):
+        data = self.post_data(
+            [("2 cups", "Flour"), ("1 tsp", "Salt")], [("1", "Mix"), ("2", "Bake")]
+        )
+        response = self.client.post(reverse("create-full-recipe"), data)
+        recipe = Recipe.objects.get()
+        self.assertRedirects(response, recipe.get_absolute_url())
+        self.assertEqual(recipe.name, "Pizza")
+        self.assertEqual(recipe.author.username, "testuser1")
+        flour = recipe.ingredient_set.get(name="Flour")
+        self.assertEqual((flour.quantity, flour.unit), (2, "cups"))
+        self.assertEqual(
+            list(recipe.instruction_set.values_list("step_number", flat=True)), [1, 2]
+        )
+
+    def test_reports_every_error_at_once(self):
+        data = self.post_data(
+            [("2 cups", "")], [("1", "Mix"), ("1", "Bake")], servings="0"
+        )
+        response = self.client.post(reverse("create-full-recipe"), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertTrue(response.context["form"].has_error("servings"))
+        ingredient_forms = response.context["ingredient_formset"].forms
+        self.assertTrue(ingredient_forms[0].has_error("name"))
+        instruction_forms = response.context["instruction_formset"].forms
+        self.assertIn(
+            "Step 1 is used more than once.",
+            instruction_forms[1].errors["step_number"],
+        )
+
+    def test_rows_missing_step_numbers_are_errors(self):
+        data = self.post_data([("2 cups", "Flour")], [("", "Mix"), ("", "Bake")])
+        response = self.client.post(reverse("create-full-recipe"), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Recipe.objects.exists())
+        instruction_forms = response.context["instruction_formset"].forms
+        self.assertTrue(instruction_forms[0].has_error("step_number", "required"))
+        self.assertTrue(instruction_forms[1].has_error("step_number", "required"))
+
+
 class IngredientCreateViewTest(TestCase):
     def setUp(self):
         # Create test user and recipe
@@ -319,6 +837,24 @@ class InstructionCreateViewTest(TestCase):
         self.assertEqual(instruction.step_number, 1)
         self.assertEqual(instruction.description, "Knead the dough.")
 
+    @override_settings(
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage"
+    )
+    def test_step_number_must_be_free(self):
+        recipe = Recipe.objects.get(name="Pizza")
+        Instruction.objects.create(recipe=recipe, step_number=1, description="Mix.")
+        self.client.login(username="testuser1", password="1X<ISRUkw+tuK")
+        response = self.client.post(
+            reverse("add-instruction", kwargs={"pk": recipe.pk}),
+            {"step_number": "1", "description": "Knead the dough."},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context["form"].errors["step_number"],
+            ["This recipe already has a step 1."],
+        )
+        self.assertEqual(recipe.instruction_set.count(), 1)
+
 
 class RecipeUpdateViewTest(TestCase):
     def setUp(self):
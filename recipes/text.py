@@ -0,0 +1,40 @@
+import re
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+# Longer "words" are almost always junk, so they are not worth indexing
+MAX_WORD_LENGTH = 40
+
+# Words too common in recipes to be worth indexing
+STOP_WORDS = frozenset(
+    """
+    a an and are as at be by for from in into is it of on or the then this to
+    until with your you
+    """.split()
+)
+
+
+def stem(word):
+    """ Strip plural endings so that e.g. "tomatoes" and "tomato" match. """
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 4 and word.endswith(("oes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """ Split text into lowercase, stemmed search terms. """
+    if not text:
+        return []
+    return [
+        stem(word)
+        for word in WORD_RE.findall(text.lower())
+        if word not in STOP_WORDS and len(word) <= MAX_WORD_LENGTH
+    ]
+
+
+def normalize_ingredient(name):
+    """ Reduce an ingredient name to its canonical form (Red Onions -> red onion). """
+    return " ".join(stem(word) for word in WORD_RE.findall(name.lower()))
@@ -0,0 +1,85 @@
+"""
+Async views whose blocking work runs in a bounded thread pool.
+
+Under ASGI, Django runs every sync view, and the rendering of every template
+response, on a single thread, so one slow query or SMTP call holds up every other
+request in the process. Views using ThreadPoolMixin are served as async views
+instead, and run on one of ASYNC_VIEW_THREADS threads. Each thread keeps its own
+database connection, so the size of the pool also caps the connections.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+
+
+def get_executor():
+    """ Return the thread pool, starting it the first time it is needed. """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_VIEW_THREADS, thread_name_prefix="views"
+        )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    # Only the thread of sync views has its connections closed at the end of each
+    # request, so drop ones past CONN_MAX_AGE or left broken, here, and hand
+    # pooled ones back as soon as the work is done
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """ Call func on the thread pool, in a copy of the current context. """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(), functools.partial(context.run, _call, func, args, kwargs)
+    )
+
+
+class ThreadPoolMixin:
+    """
+    Custom mixin that serves a view as an async view when ASYNC_VIEWS is on,
+    running the view and rendering its response on the thread pool.
+
+    ASYNC_VIEWS is only for ASGI, as Django's WSGI handler can't await the
+    render method these views give their responses.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        if settings.ASYNC_VIEWS:
+            return cls.as_async_view(**initkwargs)
+        return super().as_view(**initkwargs)
+
+    @classmethod
+    def as_async_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = await run_in_pool(view, request, *args, **kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                # Django awaits a coroutine render method, after the template
+                # response middleware, rather than calling it on its own thread
+                render = response.render
+
+                async def render_in_pool():
+                    return await run_in_pool(render)
+
+                response.render = render_in_pool
+            return response
+
+        # Keep view_class, view_initkwargs and csrf_exempt
+        functools.update_wrapper(async_view, view)
+        return async_view
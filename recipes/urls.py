@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 
 urlpatterns = [
@@ -9,7 +9,27 @@ urlpatterns = [
     path("<int:pk>", views.RecipeDetailView.as_view(), name="recipe-detail"),
     path("my-recipes/", views.MyRecipesListView.as_view(), name="my-recipes"),
     path("my-favorites/", views.MyFavoritesListView.as_view(), name="my-favorites"),
+    path("favorites/", views.FavoritesView.as_view(), name="favorites"),
+    path(
+        "most-favorited/",
+        views.MostFavoritedListView.as_view(),
+        name="most-favorited",
+    ),
+    path("search/", views.SearchView.as_view(), name="search"),
+    path(
+        "what-can-i-cook/", views.WhatCanICookView.as_view(), name="what-can-i-cook"
+    ),
+    path("export/", views.ExportRecipesView.as_view(), name="export-recipes"),
+    path(
+        "api/v1/recipes/", api.RecipeListAPIView.as_view(), name="api-recipe-list"
+    ),
+    path(
+        "api/v1/recipes/<int:pk>/",
+        api.RecipeDetailAPIView.as_view(),
+        name="api-recipe-detail",
+    ),
     path("submit/create/", views.RecipeCreate.as_view(), name="create-recipe"),
+    path("submit/new/", views.FullRecipeCreate.as_view(), name="create-full-recipe"),
     path(
         "submit/<int:pk>/add-ingredient",
         views.IngredientCreate.as_view(),
@@ -1,97 +1,162 @@
 import re
+from fractions import Fraction
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponseRedirect
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse, reverse_lazy
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.utils.translation import ugettext_lazy as _
 from django.views import generic
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from num2words import num2words
 
+from recipes import catalogue, favorites, fragments, home, pantry, similar
 from recipes.models import Ingredient, Instruction, Recipe
 
-from .forms import IngredientForm, InstructionForm, RecipeForm
-
-
-class IndexView(generic.TemplateView):
+from .conditional import ConditionalGetMixin
+from .favorites import CARD_FIELDS, FavoritesContextMixin
+from .forms import (
+    IngredientForm,
+    IngredientFormSet,
+    InstructionForm,
+    InstructionFormSet,
+    PantryForm,
+    RecipeForm,
+)
+from .fragments import FragmentCacheMixin
+from .pagination import KeysetPaginationMixin, PageNavMixin
+from .search import search
+from .threadpool import ThreadPoolMixin
+
+# Load a recipe's ingredients and instructions in one query each, in display order
+INGREDIENTS = Prefetch("ingredient_set", queryset=Ingredient.objects.order_by("id"))
+INSTRUCTIONS = Prefetch(
+    "instruction_set", queryset=Instruction.objects.order_by("step_number")
+)
+# Most servings a recipe can be scaled to
+MAX_SERVINGS = 100
+
+
+class IndexView(ThreadPoolMixin, ConditionalGetMixin, generic.TemplateView):
     """ View class for home page of site. """
 
     template_name = "index.html"
 
+    def get_layout(self):
+        if not hasattr(self, "layout"):
+            self.layout = home.newest_layout()
+        return self.layout
+
+    def get_validators(self):
+        # The layout is rebuilt, under a new version, whenever recipes change
+        version, built, recipes = self.get_layout()
+        return (version,), built
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Get 10 newest recipes
-        newest_recipes = list(Recipe.objects.order_by("-pk")[:10])
-        # Use variable for last index in case there are less than 10 recipes
-        max_index = len(newest_recipes) - 1
-
-        if newest_recipes and max_index >= 5:
-            # Sort the recipes by description length
-            newest_recipes.sort(key=lambda r: len(r.description))
-            # The template expects the longest description to be loaded 5th
-            newest_recipes[max_index], newest_recipes[4] = (
-                newest_recipes[4],
-                newest_recipes[max_index],
-            )
-            # Ignore the longest description recipe
-            temp = newest_recipes[:4] + newest_recipes[5:]
-            # Get the recipe with the longest title and where it occurs in the list
-            longest_title = max(temp, key=lambda r: len(r.name))
-            index = newest_recipes.index(longest_title)
-            # The template expects the longest title to be loaded 3rd
-            newest_recipes[index], newest_recipes[2] = (
-                newest_recipes[2],
-                newest_recipes[index],
-            )
-
-        context["newest_recipes"] = newest_recipes
+        # Get the 10 newest recipes, arranged for the grid
+        context["newest_recipes"] = self.get_layout()[2]
         return context
 
 
-class RecipeListView(generic.ListView):
+class RecipeListView(
+    ThreadPoolMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    FavoritesContextMixin,
+    FragmentCacheMixin,
+    generic.ListView,
+):
     """ Generic list view for displaying all recipes. """
 
     model = Recipe
     paginate_by = 10
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated:
-            # Get user's favorite recipes
-            context["favorites"] = self.request.user.favorite_recipes.all()
-        return context
+    def get_queryset(self):
+        return Recipe.objects.select_related("author").only(*CARD_FIELDS)
+
+    def get_validators(self):
+        # Any recipe may move onto a page, so any recipe or author written changes
+        # the version. It isn't a time, so there is no Last-Modified.
+        return (fragments.catalogue_version(),), None
 
 
-class RecipeDetailView(generic.DetailView):
+class RecipeDetailView(
+    ThreadPoolMixin,
+    ConditionalGetMixin,
+    FavoritesContextMixin,
+    FragmentCacheMixin,
+    generic.DetailView,
+):
     """ Generic detail view for displaying individual recipes. """
 
     model = Recipe
+    queryset = Recipe.objects.select_related("author")
 
-    def dispatch(self, request, *args, **kwargs):
+    def get_object(self, queryset=None):
+        # Both get_validators and DetailView.get need the recipe, so only load it once
+        if not hasattr(self, "object"):
+            self.object = super().get_object(queryset)
+        return self.object
+
+    def get_similar(self):
+        """ Return (id, name) of recipes with ingredients like this one's. """
+        if not hasattr(self, "similar"):
+            self.similar = similar.similar(self.get_object().pk)
+        return self.similar
+
+    def get_validators(self):
         recipe = self.get_object()
-        # Check if an add/remove action is being performed
-        action = request.GET.get("action")
-        if action == "favorite":
-            # Add the recipe to the user's favorites
-            self.request.user.favorite_recipes.add(recipe)
-        elif action == "remove":
-            # Remove the recipe from the user's favorites
-            request.user.favorite_recipes.remove(recipe)
-        return super().dispatch(request, *args, **kwargs)
+        # Favoriting changes the count shown without advancing updated_at, and
+        # other recipes changing can change which are similar, so updated_at
+        # isn't when the page last changed and there is no Last-Modified
+        parts = (recipe.pk, recipe.updated_at, recipe.favorite_count)
+        return (*parts, self.get_similar()), None
+
+    def get_servings(self):
+        """ Return the servings asked for with ?servings=, or the recipe's own. """
+        try:
+            servings = int(self.request.GET.get("servings", ""))
+        except ValueError:
+            return self.object.servings
+        if not 1 <= servings <= MAX_SERVINGS:
+            return self.object.servings
+        return servings
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        servings = self.get_servings()
+        context["servings"] = servings
+        context["max_servings"] = MAX_SERVINGS
+        # Ingredient amounts are multiplied by this
+        context["scale"] = Fraction(servings, self.object.servings or servings)
         # Convert servings (int) to uppercase english word (string)
-        context["servings_as_word"] = num2words(self.object.servings).upper()
-        if self.request.user.is_authenticated:
-            # Get user's favorite recipes
-            context["favorites"] = self.request.user.favorite_recipes.all()
+        context["servings_as_word"] = num2words(servings).upper()
+        # Only loaded when the cached detail body has to be rendered again
+        context["ingredients"] = self.object.ingredient_set.order_by("id")
+        context["instructions"] = self.object.instruction_set.order_by("step_number")
+        context["similar_recipes"] = self.get_similar()
         return context
 
 
-class MyRecipesListView(LoginRequiredMixin, generic.ListView):
+class MyRecipesListView(
+    LoginRequiredMixin,
+    KeysetPaginationMixin,
+    FavoritesContextMixin,
+    FragmentCacheMixin,
+    generic.ListView,
+):
     """ Generic list view for a user's submitted recipes. """
 
     model = Recipe
@@ -99,41 +164,203 @@ class MyRecipesListView(LoginRequiredMixin, generic.ListView):
     paginate_by = 10
 
     def get_queryset(self):
-        return Recipe.objects.filter(author=self.request.user)
+        return (
+            Recipe.objects.filter(author=self.request.user)
+            .select_related("author")
+            .only(*CARD_FIELDS)
+        )
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        if self.request.user.is_authenticated:
-            # Get user's favorite recipes
-            context["favorites"] = self.request.user.favorite_recipes.all()
-        return context
 
-
-class MyFavoritesListView(LoginRequiredMixin, generic.ListView):
+class MyFavoritesListView(
+    LoginRequiredMixin, KeysetPaginationMixin, FragmentCacheMixin, generic.ListView
+):
     """ Generic list view for viewing a user's favorite recipes. """
 
     model = Recipe
     template_name = "recipes/my_favorites_list.html"
     paginate_by = 10
 
-    def dispatch(self, request, *args, **kwargs):
-        # Check if a recipe needs to be removed from favorites
-        remove_action = request.GET.get("action")
-        if remove_action:
-            # Get the recipe and remove it
-            recipe_id = int(re.findall(r"[0-9]+", remove_action)[0])
-            recipe = Recipe.objects.get(id=recipe_id)
-            request.user.favorite_recipes.remove(recipe)
-        return super().dispatch(request, *args, **kwargs)
+    def get_queryset(self):
+        return self.request.user.favorite_recipes.select_related("author").only(
+            *CARD_FIELDS
+        )
+
+
+class MostFavoritedListView(
+    KeysetPaginationMixin, FavoritesContextMixin, FragmentCacheMixin, generic.ListView
+):
+    """ Generic list view for the most favorited recipes, most favorited first. """
+
+    template_name = "recipes/most_favorited_list.html"
+    context_object_name = "recipe_list"
+    paginate_by = 10
+
+    def get_queryset(self):
+        # Pages seek along the favorite count index rather than counting favorites
+        return (
+            Recipe.objects.filter(favorite_count__gt=0)
+            .select_related("author")
+            .only(*CARD_FIELDS, "favorite_count")
+            .order_by("-favorite_count", "id")
+        )
+
+
+class SearchView(
+    PageNavMixin, FavoritesContextMixin, FragmentCacheMixin, generic.ListView
+):
+    """ Generic list view for recipes matching a full-text search, best first. """
+
+    template_name = "recipes/search_results.html"
+    context_object_name = "recipe_list"
+    paginate_by = 10
 
     def get_queryset(self):
-        return self.request.user.favorite_recipes.all()
+        self.query = self.request.GET.get("q", "").strip()
+        recipe_ids = search(self.query) if self.query else []
+        # Load the ranked recipes in one query, then put them back in rank order
+        recipes = Recipe.objects.select_related("author").only(*CARD_FIELDS)
+        recipes = recipes.in_bulk(recipe_ids)
+        return [recipes[pk] for pk in recipe_ids if pk in recipes]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["query"] = self.query
+        return context
+
+
+class WhatCanICookView(FavoritesContextMixin, FragmentCacheMixin, generic.ListView):
+    """ Generic list view for recipes that can be made from the user's pantry. """
+
+    template_name = "recipes/what_can_i_cook.html"
+    context_object_name = "recipe_list"
+
+    def get_queryset(self):
+        self.form = PantryForm(self.request.GET or None)
+        if not self.form.is_valid():
+            return []
+        matches = pantry.match(
+            self.form.cleaned_data["ingredients"],
+            required=self.form.cleaned_data["required"],
+            max_missing=self.form.cleaned_data["max_missing"],
+        )
+        # Load the matching recipes in one query, then put them back in rank order
+        recipes = Recipe.objects.select_related("author").only(*CARD_FIELDS)
+        recipes = recipes.in_bulk([recipe_id for recipe_id, missing in matches])
+        results = []
+        for recipe_id, missing in matches:
+            if recipe_id in recipes:
+                recipes[recipe_id].missing_ingredients = missing
+                results.append(recipes[recipe_id])
+        return results
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["form"] = self.form
+        return context
+
+
+class ExportRecipesView(
+    ThreadPoolMixin, LoginRequiredMixin, UserPassesTestMixin, generic.View
+):
+    """ View sending the whole recipe catalogue to staff as JSON lines or CSV. """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format", "ndjson")
+        if export_format not in catalogue.EXPORT_FORMATS:
+            export_format = "ndjson"
+        lines, content_type, extension = catalogue.EXPORT_FORMATS[export_format]
+        if settings.ASYNC_VIEWS:
+            # The ASGI handler sends streamed responses from the event loop, where
+            # queries can't run, so write the export out here, on the thread pool
+            return FileResponse(
+                catalogue.spool_export(lines),
+                as_attachment=True,
+                filename="recipes.%s" % extension,
+                content_type=content_type,
+            )
+        # Recipes are loaded a chunk at a time as the response is sent
+        response = StreamingHttpResponse(
+            lines(catalogue.iter_recipes()), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="recipes.%s"' % extension
+        )
+        return response
+
+
+class FavoritesView(LoginRequiredMixin, generic.View):
+    """
+    View that changes the user's favorites. Posting recipe=<id> toggles one
+    recipe; posting action=add|remove with recipes=<id>,<id>,... changes several.
+    Answers with JSON when asked for it, otherwise redirects back to ?next=.
+    """
+
+    raise_exception = True
+    http_method_names = ["post"]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            if "recipe" in request.POST:
+                recipe_id = int(request.POST["recipe"])
+                data = {
+                    "recipe": recipe_id,
+                    "favorited": favorites.toggle_favorite(request.user, recipe_id),
+                }
+            else:
+                action = request.POST.get("action")
+                if action not in ("add", "remove"):
+                    return self.error("action must be add or remove.", 400)
+                recipe_ids = [
+                    int(pk)
+                    for value in request.POST.getlist("recipes")
+                    for pk in value.split(",")
+                    if pk.strip()
+                ]
+                changed = favorites.change_favorites(
+                    request.user, recipe_ids, add=action == "add"
+                )
+                data = {"action": action, "changed": sorted(changed)}
+        except ValueError:
+            return self.error("Recipe ids must be whole numbers.", 400)
+        except Recipe.DoesNotExist as e:
+            return self.error(str(e), 404)
+
+        if "application/json" in request.headers.get("Accept", ""):
+            return JsonResponse(data)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def error(self, message, status):
+        if "application/json" in self.request.headers.get("Accept", ""):
+            return JsonResponse({"error": message}, status=status)
+        return HttpResponse(message, status=status, content_type="text/plain")
+
+    def get_success_url(self):
+        url = self.request.POST.get("next")
+        if url and url_has_allowed_host_and_scheme(
+            url, {self.request.get_host()}, self.request.is_secure()
+        ):
+            return url
+        return reverse("my-favorites")
 
 
 """ ********************* CUSTOM MIXINS *************************** """
 
 
-class CustomCreateMixin:
+class RecipeContentsMixin:
+    """ Base class for views that display a recipe along with its contents. """
+
+    # Child rows of the recipe that the view's template lists
+    recipe_prefetch = ()
+
+    def get_recipe(self, pk):
+        recipes = Recipe.objects.select_related("author")
+        return get_object_or_404(recipes.prefetch_related(*self.recipe_prefetch), pk=pk)
+
+
+class CustomCreateMixin(RecipeContentsMixin):
     """ Custom mixin used by Recipe, Ingredient and Instruction create views. """
 
     def dispatch(self, request, *args, **kwargs):
@@ -142,7 +369,7 @@ class CustomCreateMixin:
         self.is_recipe = True
         if "ingredient" in path or "instruction" in path:
             # This is an ingredient or instruction view, so get the recipe
-            self.recipe = get_object_or_404(Recipe, pk=kwargs["pk"])
+            self.recipe = self.get_recipe(kwargs["pk"])
             self.is_recipe = False
         return super().dispatch(request, *args, **kwargs)
 
@@ -156,6 +383,14 @@ class CustomCreateMixin:
             context["servings_as_word"] = num2words(self.recipe.servings).upper()
         return context
 
+    def get_form(self, form_class=None):
+        form = super().get_form(form_class)
+        if not self.is_recipe:
+            # Set the recipe field on the ingredient/instruction form before it is
+            # validated, so that step numbers can be checked against the recipe's
+            form.instance.recipe = self.recipe
+        return form
+
     def form_valid(self, form):
         if self.is_recipe:
             # Set the owner field on the recipe form
@@ -163,9 +398,6 @@ class CustomCreateMixin:
             # Guarantee the name starts in uppercase (for proper ordering)
             uppercase_name = form.instance.name[0].upper() + form.instance.name[1:]
             form.instance.name = uppercase_name
-        else:
-            # Set the recipe field on the ingredient/instruction form
-            form.instance.recipe = self.recipe
 
         self.object = form.save()
         return HttpResponseRedirect(self.get_success_url())
@@ -194,14 +426,14 @@ class CustomUpdateOrDeleteMixin:
         return self.next
 
 
-class CustomUpdateMixin(CustomUpdateOrDeleteMixin):
+class CustomUpdateMixin(RecipeContentsMixin, CustomUpdateOrDeleteMixin):
     """ Custom mixin used by Recipe, Ingredient and Instruction update views. """
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Extract recipe id from query parameter
         recipe_id = re.findall(r"[0-9]+", self.next)[0]
-        context["recipe"] = Recipe.objects.get(id=recipe_id)
+        context["recipe"] = self.get_recipe(recipe_id)
         context["pk"] = self.object.id
         # Used by template to render update-specific messages and formatting
         context["update"] = True
@@ -228,6 +460,64 @@ class RecipeCreate(LoginRequiredMixin, CustomCreateMixin, CreateView):
     form_class = RecipeForm
 
 
+class FullRecipeCreate(LoginRequiredMixin, CreateView):
+    """ Create view for a recipe with all of its ingredients and instructions. """
+
+    model = Recipe
+    form_class = RecipeForm
+    template_name = "recipes/full_recipe_form.html"
+
+    def get_formsets(self):
+        data = self.request.POST if self.request.method == "POST" else None
+        return (
+            IngredientFormSet(data, prefix="ingredients"),
+            InstructionFormSet(data, prefix="instructions"),
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if "ingredient_formset" not in kwargs:
+            ingredients, instructions = self.get_formsets()
+            context["ingredient_formset"] = ingredients
+            context["instruction_formset"] = instructions
+        return context
+
+    def post(self, request, *args, **kwargs):
+        self.object = None
+        form = self.get_form()
+        ingredients, instructions = self.get_formsets()
+        # Validate everything, so every mistake is shown at once
+        if not all([form.is_valid(), ingredients.is_valid(), instructions.is_valid()]):
+            return self.render_to_response(
+                self.get_context_data(
+                    form=form,
+                    ingredient_formset=ingredients,
+                    instruction_formset=instructions,
+                )
+            )
+
+        with transaction.atomic():
+            recipe = form.save(commit=False)
+            recipe.author = request.user
+            # Guarantee the name starts in uppercase (for proper ordering)
+            recipe.name = recipe.name[0].upper() + recipe.name[1:]
+            # Saving the recipe brings its derived data up to date on commit, by
+            # when its ingredients and instructions are in place too
+            recipe.save()
+            children = {Ingredient: [], Instruction: []}
+            for formset in (ingredients, instructions):
+                for child in formset.save(commit=False):
+                    child.recipe = recipe
+                    children[type(child)].append(child)
+            for ingredient in children[Ingredient]:
+                # bulk_create skips Ingredient.save
+                ingredient.populate_quantity()
+            Ingredient.objects.bulk_create(children[Ingredient])
+            Instruction.objects.bulk_create(children[Instruction])
+        self.object = recipe
+        return HttpResponseRedirect(recipe.get_absolute_url())
+
+
 class RecipeUpdate(LoginRequiredMixin, CustomUpdateMixin, UpdateView):
     model = Recipe
     form_class = RecipeForm
@@ -241,11 +531,13 @@ class RecipeDeleteView(LoginRequiredMixin, DeleteView):
 class IngredientCreate(LoginRequiredMixin, CustomCreateMixin, CreateView):
     model = Ingredient
     form_class = IngredientForm
+    recipe_prefetch = [INGREDIENTS]
 
 
 class IngredientUpdate(LoginRequiredMixin, CustomUpdateMixin, UpdateView):
     model = Ingredient
     form_class = IngredientForm
+    recipe_prefetch = [INGREDIENTS]
 
 
 class IngredientDelete(LoginRequiredMixin, CustomDeleteMixin, DeleteView):
@@ -255,11 +547,13 @@ class IngredientDelete(LoginRequiredMixin, CustomDeleteMixin, DeleteView):
 class InstructionCreate(LoginRequiredMixin, CustomCreateMixin, CreateView):
     model = Instruction
     form_class = InstructionForm
+    recipe_prefetch = [INGREDIENTS, INSTRUCTIONS]
 
 
 class InstructionUpdate(LoginRequiredMixin, CustomUpdateMixin, UpdateView):
     model = Instruction
     form_class = InstructionForm
+    recipe_prefetch = [INGREDIENTS, INSTRUCTIONS]
 
 
 class InstructionDelete(LoginRequiredMixin, CustomDeleteMixin, DeleteView):